@@ -26,6 +26,7 @@
 from django.contrib import admin
 
 from assistant.models import reviewer, manager, settings, academic_assistant, assistant_mandate
+from assistant.models import mandate_import_fingerprint, mandate_import_job, outbox_item, pdf_export_job
 from assistant.models.assistant_document_file import AssistantDocumentFile
 from assistant.models.mandate_entity import MandateEntity
 from assistant.models.review import Review
@@ -40,3 +41,8 @@ admin.site.register(TutoringLearningUnitYear)
 admin.site.register(reviewer.Reviewer, reviewer.ReviewerAdmin)
 admin.site.register(manager.Manager, manager.ManagerAdmin)
 admin.site.register(settings.Settings, settings.SettingsAdmin)
+admin.site.register(mandate_import_job.MandateImportJob, mandate_import_job.MandateImportJobAdmin)
+admin.site.register(mandate_import_fingerprint.MandateImportFingerprint,
+                    mandate_import_fingerprint.MandateImportFingerprintAdmin)
+admin.site.register(pdf_export_job.PdfExportJob, pdf_export_job.PdfExportJobAdmin)
+admin.site.register(outbox_item.OutboxItem, outbox_item.OutboxItemAdmin)
@@ -0,0 +1,90 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from base.models.entity_version import EntityVersion
+
+
+class EntityResolver:
+    """Resolve entities by (acronym, entity type) and give the type of an entity at a date.
+
+    Every lookup is cached, including the acronyms that are not found, so that the acronyms repeated on thousands
+    of rows of an import are resolved once. preload() resolves a whole set of acronyms in two queries.
+    """
+
+    def __init__(self, date=None):
+        self.date = date or timezone.now()
+        self.entities = {}
+        self.entities_types = {}
+
+    def preload(self, acronyms_types):
+        missing = {
+            (acronym.upper(), type) for acronym, type in acronyms_types
+            if acronym and (acronym.upper(), type) not in self.entities
+        }
+        if missing:
+            versions = EntityVersion.objects.annotate(
+                upper_acronym=Upper('acronym')
+            ).filter(
+                upper_acronym__in={acronym for acronym, _ in missing},
+                entity_type__in={type for _, type in missing}
+            ).select_related('entity').order_by('pk')
+            found = {}
+            for version in versions:
+                key = (version.upper_acronym, version.entity_type)
+                if key in missing:
+                    found.setdefault(key, version.entity)
+            for key in missing:
+                self.entities[key] = found.get(key)
+            self.preload_types(found.values())
+
+    def preload_types(self, entities):
+        missing = {entity.pk for entity in entities if entity.pk not in self.entities_types}
+        if missing:
+            current_versions = EntityVersion.objects.filter(
+                entity__in=missing,
+                start_date__lte=self.date
+            ).filter(
+                Q(end_date__isnull=True) | Q(end_date__gte=self.date)
+            ).order_by('pk').values_list('entity_id', 'entity_type')
+            types = {}
+            for entity_id, type in current_versions:
+                types.setdefault(entity_id, type)
+            for entity_id in missing:
+                self.entities_types[entity_id] = types.get(entity_id)
+
+    def find_entity(self, acronym, type):
+        if not acronym:
+            return None
+        self.preload([(acronym, type)])
+        return self.entities[(acronym.upper(), type)]
+
+    def get_entity_type(self, entity, default=None):
+        self.preload_types([entity])
+        type = self.entities_types[entity.pk]
+        return default if type is None else type
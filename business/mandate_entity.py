@@ -26,6 +26,7 @@
 from base.models import academic_year
 from base.models import entity_version
 from base.models.entity import find_versions_from_entites
+from base.models.entity_version import EntityVersion
 
 
 def get_entities_for_mandate(mandate):
@@ -45,3 +46,13 @@ def add_entities_version_to_mandates_list(context):
         entities_id = mandate.mandateentity_set.all().order_by('id').values_list('entity', flat=True)
         mandate.entities = find_versions_from_entites(entities_id, None)
     return context
+
+
+def get_last_acronyms(entities_ids):
+    """Map each entity to the acronym of its last version, with a single query."""
+    acronyms = {}
+    for entity_id, acronym in EntityVersion.objects.filter(
+            entity_id__in=entities_ids
+    ).order_by('start_date').values_list('entity_id', 'acronym'):
+        acronyms[entity_id] = acronym
+    return acronyms
@@ -0,0 +1,117 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from assistant.business.entity_resolver import EntityResolver
+from assistant.business.mandates_import import ImportRun, MandatesImporter, report_disappeared_rows
+from assistant.models.enums import job_state
+from assistant.models.mandate_import_job import MandateImportJob, get_progress_cache_key
+from assistant.utils.import_xls_file_data import read_mandates_rows
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_JOB_TIMEOUT = datetime.timedelta(minutes=getattr(settings, 'ASSISTANT_IMPORT_JOB_TIMEOUT_MINUTES', 60))
+
+logger = logging.getLogger(settings.DEFAULT_LOGGER)
+
+
+def claim_next_job():
+    """Claim the oldest pending job, or a job left running by a worker which stopped.
+
+    A running job is only claimed again once it started more than IMPORT_JOB_TIMEOUT ago and its import does not
+    hold its lock anymore. As the import of a job is committed at once, such a job imported nothing.
+    """
+    with transaction.atomic():
+        job = MandateImportJob.objects.select_for_update(skip_locked=True).filter(
+            Q(state=job_state.PENDING) |
+            Q(state=job_state.RUNNING, started__lt=timezone.now() - IMPORT_JOB_TIMEOUT)
+        ).order_by('created').first()
+        if job:
+            job.state = job_state.RUNNING
+            job.started = timezone.now()
+            job.rows_processed = 0
+            job.save(update_fields=['state', 'started', 'rows_processed'])
+        return job
+
+
+def run_job(job, processes=None):
+    """Import the file of a claimed job and store its result with the job."""
+    import_run = ImportRun(dry_run=job.dry_run)
+    rows = []
+    try:
+        with job.file.open('rb') as file:
+            with import_run.phase('read'):
+                rows = read_mandates_rows(None, file, import_run, processes)
+        MandateImportJob.objects.filter(pk=job.pk).update(rows_total=len(rows))
+        if not import_run.has_errors:
+            import_rows(job, rows, import_run)
+    except Exception as e:
+        logger.exception("Mandates import job %s failed", job.pk)
+        import_run.add_error(e)
+    cache.delete(get_progress_cache_key(job.pk))
+    job.state = job_state.FAILED if import_run.has_errors else job_state.DONE
+    job.finished = timezone.now()
+    job.rows_processed = 0 if import_run.has_errors else len(rows)
+    job.result = import_run.to_dict()
+    job.save(update_fields=['state', 'finished', 'rows_processed', 'result'])
+    return import_run
+
+
+def import_rows(job, rows, import_run):
+    """Import the rows of a job in a single transaction, so that nothing is imported when any of them fails.
+
+    Each chunk of rows is saved in a savepoint, after which the progress is published in the cache since the job
+    itself is only saved once the transaction is committed. The job stays locked until then. A dry run compares
+    the whole file at once so that rows repeated across chunks are reported consistently.
+    """
+    chunk_size = max(len(rows), 1) if job.dry_run else IMPORT_CHUNK_SIZE
+    entity_resolver = EntityResolver()
+    with transaction.atomic():
+        MandateImportJob.objects.select_for_update().get(pk=job.pk)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            MandatesImporter(
+                job.academic_year, import_run, dry_run=job.dry_run, entity_resolver=entity_resolver
+            ).import_rows(chunk)
+            cache.set(get_progress_cache_key(job.pk), start + len(chunk), IMPORT_JOB_TIMEOUT.total_seconds())
+        with import_run.phase('disappeared'):
+            report_disappeared_rows(job.academic_year, rows, import_run)
+
+
+def process_pending_jobs(processes=None):
+    processed = 0
+    job = claim_next_job()
+    while job:
+        run_job(job, processes)
+        processed += 1
+        job = claim_next_job()
+    return processed
@@ -0,0 +1,160 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import glob
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from assistant.models.assistant_mandate import AssistantMandate
+from assistant.models.enums import assistant_mandate_state
+from assistant.models.mandate_entity import MandateEntity
+from assistant.models.review import Review
+from assistant.models.tutoring_learning_unit_year import TutoringLearningUnitYear
+
+CACHE_VERSION = '3'
+CACHED_MANDATE_STATES = (assistant_mandate_state.DONE, assistant_mandate_state.DECLINED)
+# The cache is off unless a directory is configured, which must not be shared with another database
+PDF_CACHE_DIR = getattr(settings, 'ASSISTANT_PDF_CACHE_DIR', None)
+PDF_CACHE_MAX_SIZE = getattr(settings, 'ASSISTANT_PDF_CACHE_MAX_SIZE', 200 * 1024 * 1024)
+# Rows shown in the document of a mandate, with the field linking them to it and the fields of their last change
+VERSIONED_ROWS = (
+    (Review, 'mandate_id', ('changed', 'reviewer__person__changed', 'reviewer__entity__entityversion__changed')),
+    (TutoringLearningUnitYear, 'mandate_id', ('changed', 'learning_unit_year__changed')),
+    (MandateEntity, 'assistant_mandate_id', ('changed', 'entity__entityversion__changed')),
+)
+
+
+class MandatePdfCache:
+    """Cache on local disk of the PDF documents of mandates which are not reviewed anymore.
+
+    A document is stored under the id of its mandate and a digest of the roles of the viewer, the language and the
+    version of the content of the document, so that it is found before any of that content is loaded. The version
+    is made of the time of the last change to each row shown in the document and of the number of related rows,
+    so that a document is never read again once one of its rows was saved, whichever process saved it. The footer
+    of a cached document shows the date it was rendered. The least recently read documents are evicted once the
+    size of the cache, kept up to date as documents are written, exceeds max_size.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.size = None
+
+    def accepts(self, mandate, states=CACHED_MANDATE_STATES):
+        return bool(self.directory) and self.max_size > 0 and mandate.state in states
+
+    @staticmethod
+    def load_versions(mandates_ids):
+        """Map each mandate to the version of the content of its document, with a query per kind of rows."""
+        versions = {
+            row[0]: {'mandate': row[1:]} for row in AssistantMandate.objects.filter(pk__in=mandates_ids).values_list(
+                'pk', 'changed', 'assistant__changed', 'assistant__person__changed', 'assistant__supervisor__changed'
+            )
+        }
+        for model, mandate_field, changed_fields in VERSIONED_ROWS:
+            aggregates = {'rows': Count('id', distinct=True)}
+            aggregates.update(('last_%s' % field, Max(field)) for field in changed_fields)
+            for row in model.objects.filter(**{mandate_field + '__in': mandates_ids}).values(
+                    mandate_field
+            ).annotate(**aggregates).order_by():
+                mandate_id = row.pop(mandate_field)
+                versions.setdefault(mandate_id, {})[model.__name__] = tuple(sorted(row.items()))
+        return versions
+
+    @staticmethod
+    def get_key(mandate, roles, language, version):
+        content = repr((CACHE_VERSION, sorted(roles), language, mandate.state, sorted((version or {}).items())))
+        return '%s-%s' % (mandate.pk, hashlib.sha1(content.encode('utf-8')).hexdigest())
+    def get_path(self, key):
+        return os.path.join(self.directory, key + '.pdf')
+
+    def get(self, key):
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as file:
+                pdf = file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return pdf
+
+    def set(self, key, pdf):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.scan())
+        path = self.get_path(key)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(pdf)
+        self.size += len(pdf) - self.get_size(path)
+        os.replace(temporary_path, path)
+        if self.size > self.max_size:
+            self.evict()
+
+    def scan(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.pdf')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove the least recently read documents until the cache fits in max_size.
+
+        The directory is only scanned here, which also corrects the size for the documents written by other
+        processes.
+        """
+        entries = self.scan()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self.size <= self.max_size:
+                break
+            self.remove(path)
+
+    def remove(self, path):
+        size = self.get_size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        if self.size is not None:
+            self.size -= size
+
+    @staticmethod
+    def get_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+
+pdf_cache = MandatePdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_SIZE)
@@ -0,0 +1,105 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import itertools
+
+from assistant.models import review
+from assistant.models.enums import reviewer_role
+from assistant.models.mandate_entity import MandateEntity
+from base.models.entity import find_versions_from_entites
+from base.models.enums import entity_type
+
+EXPORT_CHUNK_SIZE = 500
+EXPORTED_ENTITY_TYPES = [entity_type.SECTOR, entity_type.FACULTY, entity_type.LOGISTICS_ENTITY, entity_type.INSTITUTE]
+
+
+class MandatesExportData:
+    """Data of the lines of the mandates export, loaded for a list of mandates with a fixed number of queries.
+
+    The entities are loaded with one query per academic year of the mandates, the review of the vice-rector with a
+    single query. The assistant and person of the mandates are expected to be selected with them.
+    """
+
+    def __init__(self, mandates):
+        self.mandates = list(mandates)
+        mandates_ids = [mandate.pk for mandate in self.mandates]
+        self.entities = self.load_entities(self.mandates)
+        self.vice_rector_reviews = self.load_vice_rector_reviews(mandates_ids)
+
+    @staticmethod
+    def load_entities(mandates):
+        """Map each mandate to the versions of its exported entities at the start of its academic year."""
+        mandates_entities = {}
+        for mandate_id, entity_id in MandateEntity.objects.filter(
+                assistant_mandate_id__in=[mandate.pk for mandate in mandates]
+        ).order_by('id').values_list('assistant_mandate_id', 'entity_id'):
+            mandates_entities.setdefault(mandate_id, []).append(entity_id)
+        entities = {}
+        mandates_by_date = itertools.groupby(
+            sorted(mandates, key=lambda mandate: mandate.academic_year.start_date),
+            key=lambda mandate: mandate.academic_year.start_date
+        )
+        for start_date, year_mandates in mandates_by_date:
+            year_mandates = list(year_mandates)
+            entities_ids = {
+                entity_id for mandate in year_mandates for entity_id in mandates_entities.get(mandate.pk, [])
+            }
+            if not entities_ids:
+                continue
+            versions = {
+                version.pk: version for version in find_versions_from_entites(entities_ids, start_date)
+                if version.entity_type in EXPORTED_ENTITY_TYPES
+            }
+            for mandate in year_mandates:
+                entities[mandate.pk] = [
+                    versions[entity_id] for entity_id in mandates_entities.get(mandate.pk, []) if entity_id in versions
+                ]
+        return entities
+
+    @staticmethod
+    def load_vice_rector_reviews(mandates_ids):
+        reviews = {}
+        for rev in review.find_by_mandates_and_role(mandates_ids, reviewer_role.VICE_RECTOR):
+            reviews.setdefault(rev.mandate_id, rev)
+        return reviews
+
+    def get_entities(self, mandate):
+        return self.entities.get(mandate.pk, [])
+
+    def get_vice_rector_review(self, mandate):
+        return self.vice_rector_reviews.get(mandate.pk)
+
+
+def iter_mandates_export_data(mandates, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield each mandate of the queryset with the export data of its chunk.
+
+    The mandates are read with a server-side cursor and their data is loaded chunk by chunk, so the memory used and
+    the number of queries per mandate do not grow with the number of mandates.
+    """
+    mandates = mandates.select_related('academic_year', 'assistant__person').iterator(chunk_size=chunk_size)
+    for chunk in iter(lambda: list(itertools.islice(mandates, chunk_size)), []):
+        data = MandatesExportData(chunk)
+        for mandate in data.mandates:
+            yield mandate, data
@@ -0,0 +1,485 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import hashlib
+import time
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from assistant.business.entity_resolver import EntityResolver
+from assistant.business.tutoring_carry_over import carry_over_tutoring_learning_units
+from assistant.models import mandate_import_fingerprint
+from assistant.models.academic_assistant import AcademicAssistant
+from assistant.models.assistant_mandate import AssistantMandate
+from assistant.models.enums import assistant_mandate_state, assistant_mandate_renewal
+from assistant.models.enums import assistant_type, assistant_phd_inscription, import_action
+from assistant.models.mandate_entity import MandateEntity
+from assistant.models.mandate_import_fingerprint import MandateImportFingerprint
+from base.models.enums import entity_type
+from base.models.person import Person
+
+BATCH_SIZE = 500
+ASSISTANT_TYPES_ALIASES = {
+    'ST': assistant_type.ASSISTANT,
+    'AS': assistant_type.TEACHING_ASSISTANT
+}
+ENTITY_COLUMNS = (
+    ('SECTOR', entity_type.SECTOR),
+    ('LOGISTICS_ENTITY', entity_type.LOGISTICS_ENTITY),
+    ('FACULTY', entity_type.FACULTY),
+    ('SCHOOL', entity_type.SCHOOL),
+    ('INSTITUTE', entity_type.INSTITUTE),
+    ('POLE', entity_type.POLE),
+)
+MANDATE_IMPORTED_FIELDS = [
+    'assistant', 'academic_year', 'end_date', 'entry_date', 'fulltime_equivalent', 'sap_id', 'contract_duration',
+    'contract_duration_fte', 'renewal_type', 'absences', 'comment', 'other_status', 'assistant_type', 'scale'
+]
+MANDATE_COMPARED_FIELDS = [field for field in MANDATE_IMPORTED_FIELDS if field not in ('assistant', 'academic_year')]
+FINGERPRINT_VERSION = '1'
+FINGERPRINT_TEXT_COLUMNS = ['SAP_ID', 'FGS', 'SCALE', 'CONTRACT_DURATION', 'CONTRACT_DURATION_FTE', 'ABSENCES',
+                            'COMMENT', 'OTHER_STATUS']
+
+ImportRow = namedtuple('ImportRow', ['line', 'record', 'entry_date', 'end_date'])
+RowChange = namedtuple('RowChange', ['line', 'sap_id', 'assistant', 'mandate', 'entities'])
+
+
+def is_teaching_assistant(record):
+    return ASSISTANT_TYPES_ALIASES.get(record.get('ASSISTANT_TYPE_CODE')) == assistant_type.TEACHING_ASSISTANT
+
+
+def get_renewal_type(record):
+    renewal_type = record.get('RENEWAL_TYPE').lower()
+    if renewal_type == 'exceptional' or renewal_type == 'exceptionnel':
+        return assistant_mandate_renewal.EXCEPTIONAL
+    elif renewal_type == 'normal':
+        return assistant_mandate_renewal.NORMAL
+    return assistant_mandate_renewal.SPECIAL
+
+
+def fill_mandate(mandate, record, assistant, academic_year, entry_date, end_date):
+    mandate.assistant = assistant
+    mandate.academic_year = academic_year
+    mandate.end_date = end_date
+    mandate.entry_date = entry_date
+    mandate.fulltime_equivalent = record.get('FULLTIME_EQUIVALENT')
+    mandate.sap_id = record.get('SAP_ID')
+    mandate.contract_duration = record.get('CONTRACT_DURATION')
+    mandate.contract_duration_fte = record.get('CONTRACT_DURATION_FTE')
+    mandate.renewal_type = get_renewal_type(record)
+    mandate.absences = record.get('ABSENCES')
+    mandate.comment = record.get('COMMENT')
+    mandate.other_status = record.get('OTHER_STATUS')
+    if is_teaching_assistant(record):
+        mandate.assistant_type = assistant_type.TEACHING_ASSISTANT
+    else:
+        mandate.assistant_type = assistant_type.ASSISTANT
+    mandate.scale = record.get('SCALE')
+    return mandate
+
+
+def normalize_mandate_value(field, value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if field == 'fulltime_equivalent' and value is not None:
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            return value
+    return value
+
+
+def get_mandate_changes(mandate, record, entry_date, end_date):
+    """Return the imported fields whose value in the record differs from the one of the mandate."""
+    imported = fill_mandate(AssistantMandate(), record, None, None, entry_date, end_date)
+    return [
+        field for field in MANDATE_COMPARED_FIELDS
+        if normalize_mandate_value(field, getattr(mandate, field)) !=
+        normalize_mandate_value(field, getattr(imported, field))
+    ]
+
+
+def get_row_fingerprint(row):
+    """Hash the imported content of a row once normalised, so that formatting differences do not count as changes.
+
+    FINGERPRINT_VERSION must be increased whenever the normalisation or the imported columns change.
+    """
+    record = row.record
+    fulltime_equivalent = normalize_mandate_value('fulltime_equivalent', record.get('FULLTIME_EQUIVALENT'))
+    values = [FINGERPRINT_VERSION]
+    values += [(record.get(column) or '').strip().upper() for column, _ in ENTITY_COLUMNS]
+    values += [str(record.get(column) or '').strip() for column in FINGERPRINT_TEXT_COLUMNS]
+    values += [
+        str(fulltime_equivalent.normalize() if isinstance(fulltime_equivalent, Decimal) else fulltime_equivalent),
+        get_renewal_type(record),
+        str(is_teaching_assistant(record)),
+        normalize_mandate_value('entry_date', row.entry_date).isoformat(),
+        normalize_mandate_value('end_date', row.end_date).isoformat(),
+    ]
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def report_disappeared_rows(academic_year, rows, import_run):
+    """Report the mandates imported earlier in the academic year whose row is not in the imported file anymore."""
+    keys = {(row.record.get('FGS'), row.record.get('SAP_ID')) for row in rows}
+    fingerprints = mandate_import_fingerprint.find_by_academic_year(academic_year).values_list(
+        'mandate__sap_id', 'mandate__assistant__person__global_id', 'mandate__assistant__person__last_name',
+        'mandate__assistant__person__first_name'
+    ).order_by('mandate__sap_id')
+    import_run.disappeared = [
+        fingerprint for fingerprint in fingerprints if (fingerprint[1], fingerprint[0]) not in keys
+    ]
+    return import_run.disappeared
+
+
+class ImportRun:
+    """Outcome of one mandates import: counters, errors by line and time spent in each phase.
+
+    A new instance is created for every import so concurrent imports never share their results. In a dry run the
+    counters and the changes by row describe what the import would do, nothing being written.
+    """
+
+    COUNTERS = ('assistants_imported', 'assistants_updated', 'assistants_unchanged', 'mandates_imported',
+                'mandates_updated', 'mandates_unchanged', 'rows_unchanged', 'persons_not_found')
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+        self.errors = []
+        self.changes = []
+        self.disappeared = []
+        self.timings = OrderedDict()
+
+    def add_error(self, message, line=None):
+        self.errors.append((line, str(message)))
+
+    @property
+    def has_errors(self):
+        return len(self.errors) > 0
+
+    def add_row_actions(self, line, sap_id, assistant_action, mandate_action, entities_action):
+        if assistant_action == mandate_action == entities_action == import_action.UNCHANGED:
+            self.rows_unchanged += 1
+        else:
+            self.changes.append(RowChange(line, sap_id, assistant_action, mandate_action, entities_action))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - start
+
+    def to_dict(self):
+        data = {counter: getattr(self, counter) for counter in self.COUNTERS}
+        data.update({
+            'dry_run': self.dry_run,
+            'errors': self.errors,
+            'changes': self.changes,
+            'disappeared': self.disappeared,
+            'timings': self.timings,
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        import_run = cls(dry_run=data.get('dry_run', False))
+        for counter in cls.COUNTERS:
+            setattr(import_run, counter, data.get(counter, 0))
+        import_run.errors = [tuple(error) for error in data.get('errors', [])]
+        import_run.changes = [RowChange(*change) for change in data.get('changes', [])]
+        import_run.disappeared = [tuple(row) for row in data.get('disappeared', [])]
+        import_run.timings = OrderedDict(data.get('timings', {}))
+        return import_run
+
+    def as_context(self):
+        actions = dict(import_action.IMPORT_ACTIONS)
+        return {
+            'import_dry_run': self.dry_run,
+            'imported_assistants': self.assistants_imported,
+            'imported_mandates': self.mandates_imported,
+            'updated_mandates': self.mandates_updated,
+            'updated_assistants': self.assistants_updated,
+            'unchanged_assistants': self.assistants_unchanged,
+            'unchanged_mandates': self.mandates_unchanged,
+            'unchanged_rows': self.rows_unchanged,
+            'persons_not_found': self.persons_not_found,
+            'import_errors': self.errors,
+            'import_changes': [
+                change._replace(
+                    assistant=actions[change.assistant], mandate=actions[change.mandate],
+                    entities=actions[change.entities]
+                ) for change in self.changes
+            ],
+            'import_disappeared': self.disappeared,
+            'import_timings': self.timings,
+        }
+
+
+class MandatesImporter:
+    """Import the mandates of an academic year with a number of queries independent of the number of rows.
+
+    Rows whose fingerprint is the one stored at their previous import are skipped first. Persons, assistants,
+    mandates, their entities and entity versions are then preloaded for the other rows in dictionaries keyed by FGS,
+    SAP_ID and (acronym, entity type), the entities being resolved by an EntityResolver that can be shared by
+    the successive chunks of an import. Every row is compared with the preloaded records to decide whether it
+    creates, updates or leaves unchanged the assistant, the mandate and its entities. Only the created and updated
+    records are then written, with bulk operations in one transaction, unless it is a dry run.
+    """
+
+    def __init__(self, academic_year, import_run=None, dry_run=False, use_fingerprints=True, entity_resolver=None):
+        self.academic_year = academic_year
+        self.import_run = import_run or ImportRun(dry_run=dry_run)
+        self.dry_run = dry_run
+        self.use_fingerprints = use_fingerprints
+        self.fingerprints = {}
+        self.rows_fingerprints = {}
+        self.imported_mandates = {}
+        self.persons = {}
+        self.assistants = {}
+        self.mandates = {}
+        self.mandates_entities = {}
+        self.mandates_entities_ids = {}
+        self.entity_resolver = entity_resolver or EntityResolver()
+        self.new_assistants = []
+        self.updated_assistants = {}
+        self.new_mandates = []
+        self.updated_mandates = {}
+        self.new_links = OrderedDict()
+        self.replaced_links = set()
+
+    def import_rows(self, rows):
+        rows = list(rows)
+        run = self.import_run
+        with run.phase('fingerprints'):
+            rows = self.skip_unchanged_rows(rows)
+        with run.phase('preload'):
+            self.preload(rows)
+        with run.phase('diff'):
+            self.plan(rows)
+        if self.dry_run:
+            return run
+        with transaction.atomic():
+            with run.phase('assistants'):
+                self.save_assistants()
+            with run.phase('mandates'):
+                self.save_mandates()
+            with run.phase('entities'):
+                self.save_mandates_entities()
+            with run.phase('learning_units'):
+                self.retrieve_learning_units_year_from_previous_mandates()
+            with run.phase('fingerprints'):
+                self.save_fingerprints()
+        return run
+
+    def skip_unchanged_rows(self, rows):
+        self.preload_fingerprints(rows)
+        changed_rows = []
+        for row in rows:
+            key = (row.record.get('FGS'), row.record.get('SAP_ID'))
+            self.rows_fingerprints[key] = get_row_fingerprint(row)
+            fingerprint = self.fingerprints.get(key)
+            if self.use_fingerprints and fingerprint and fingerprint.fingerprint == self.rows_fingerprints[key]:
+                self.import_run.rows_unchanged += 1
+            else:
+                changed_rows.append(row)
+        return changed_rows
+
+    def preload_fingerprints(self, rows):
+        fingerprints = MandateImportFingerprint.objects.filter(
+            mandate__academic_year=self.academic_year,
+            mandate__sap_id__in={row.record.get('SAP_ID') for row in rows}
+        ).annotate(
+            global_id=F('mandate__assistant__person__global_id'),
+            sap_id=F('mandate__sap_id')
+        )
+        self.fingerprints = {(fingerprint.global_id, fingerprint.sap_id): fingerprint for fingerprint in fingerprints}
+
+    def preload(self, rows):
+        global_ids = {row.record.get('FGS') for row in rows}
+        self.persons = {person.global_id: person for person in Person.objects.filter(global_id__in=global_ids)}
+        for assistant in AcademicAssistant.objects.filter(person__in=self.persons.values()).order_by('pk'):
+            self.assistants.setdefault(assistant.person_id, assistant)
+        persons_by_assistant = {assistant.pk: person_id for person_id, assistant in self.assistants.items()}
+        mandates = AssistantMandate.objects.filter(
+            academic_year=self.academic_year,
+            assistant__in=self.assistants.values(),
+            sap_id__in={row.record.get('SAP_ID') for row in rows}
+        ).order_by('pk')
+        for mandate in mandates:
+            self.mandates.setdefault((persons_by_assistant[mandate.assistant_id], mandate.sap_id), mandate)
+        self.preload_mandates_entities()
+        self.preload_entities(rows)
+
+    def preload_mandates_entities(self):
+        keys_by_mandate = {mandate.pk: key for key, mandate in self.mandates.items()}
+        links = MandateEntity.objects.filter(
+            assistant_mandate_id__in=keys_by_mandate,
+            entity__entityversion__entity_type__isnull=False
+        ).values_list('id', 'assistant_mandate_id', 'entity_id', 'entity__entityversion__entity_type')
+        for link_id, mandate_id, entity_id, type in links:
+            key = keys_by_mandate[mandate_id]
+            self.mandates_entities.setdefault(key, {}).setdefault(type, set()).add(entity_id)
+            self.mandates_entities_ids.setdefault((key, type), set()).add(link_id)
+
+    def preload_entities(self, rows):
+        self.entity_resolver.preload(
+            (row.record.get(column), type) for row in rows for column, type in ENTITY_COLUMNS
+        )
+
+    def plan(self, rows):
+        for row in rows:
+            person = self.persons.get(row.record.get('FGS'))
+            if person is None:
+                self.import_run.persons_not_found += 1
+                continue
+            key = (person.pk, row.record.get('SAP_ID'))
+            assistant, assistant_action = self.plan_assistant(person, row)
+            mandate, mandate_action = self.plan_mandate(key, assistant, row)
+            self.imported_mandates[(row.record.get('FGS'), row.record.get('SAP_ID'))] = mandate
+            entities_action = self.plan_mandate_entities(key, mandate, row)
+            self.import_run.add_row_actions(
+                row.line, row.record.get('SAP_ID'), assistant_action, mandate_action, entities_action
+            )
+
+    def plan_assistant(self, person, row):
+        assistant = self.assistants.get(person.pk)
+        action = import_action.UNCHANGED
+        if assistant is None:
+            assistant = AcademicAssistant(person=person)
+            self.assistants[person.pk] = assistant
+            self.new_assistants.append(assistant)
+            action = import_action.CREATED
+        if is_teaching_assistant(row.record) and assistant.inscription != assistant_phd_inscription.NO:
+            assistant.inscription = assistant_phd_inscription.NO
+            if assistant.pk:
+                self.updated_assistants[assistant.pk] = assistant
+                action = import_action.UPDATED
+        self.count_action('assistants', action)
+        return assistant, action
+
+    def plan_mandate(self, key, assistant, row):
+        mandate = self.mandates.get(key)
+        action = import_action.UNCHANGED
+        if mandate is None:
+            mandate = AssistantMandate(state=assistant_mandate_state.TO_DO)
+            self.mandates[key] = mandate
+            self.new_mandates.append(mandate)
+            action = import_action.CREATED
+        elif get_mandate_changes(mandate, row.record, row.entry_date, row.end_date):
+            action = import_action.UPDATED
+            if mandate.pk:
+                self.updated_mandates[mandate.pk] = mandate
+        if action != import_action.UNCHANGED:
+            fill_mandate(mandate, row.record, assistant, self.academic_year, row.entry_date, row.end_date)
+        self.count_action('mandates', action)
+        return mandate, action
+
+    def plan_mandate_entities(self, key, mandate, row):
+        links = {}
+        for column, type in ENTITY_COLUMNS:
+            entity = self.entity_resolver.find_entity(row.record.get(column), type)
+            if entity:
+                links[self.entity_resolver.get_entity_type(entity, type)] = entity
+        current_links = self.mandates_entities.setdefault(key, {})
+        replaced_types = [type for type, entity in links.items() if current_links.get(type) != {entity.pk}]
+        if not replaced_types:
+            return import_action.UNCHANGED
+        for type in replaced_types:
+            self.replaced_links.update(self.mandates_entities_ids.pop((key, type), ()))
+            current_links[type] = {links[type].pk}
+            self.new_links[(key, type)] = (mandate, links[type])
+        return import_action.UPDATED if mandate.pk else import_action.CREATED
+
+    def count_action(self, records, action):
+        counter = {
+            import_action.CREATED: '{}_imported',
+            import_action.UPDATED: '{}_updated',
+            import_action.UNCHANGED: '{}_unchanged',
+        }[action].format(records)
+        setattr(self.import_run, counter, getattr(self.import_run, counter) + 1)
+
+    def save_assistants(self):
+        AcademicAssistant.objects.bulk_create(self.new_assistants, batch_size=BATCH_SIZE)
+        now = timezone.now()
+        for assistant in self.updated_assistants.values():
+            # bulk_update does not set the auto_now fields, which version the PDF documents of the mandates
+            assistant.changed = now
+        AcademicAssistant.objects.bulk_update(
+            self.updated_assistants.values(), ['inscription', 'changed'], batch_size=BATCH_SIZE
+        )
+
+    def save_mandates(self):
+        for mandate in self.new_mandates:
+            # The assistant may have been created after being assigned to the mandate
+            mandate.assistant_id = mandate.assistant.pk
+        AssistantMandate.objects.bulk_create(self.new_mandates, batch_size=BATCH_SIZE)
+        now = timezone.now()
+        for mandate in self.updated_mandates.values():
+            mandate.changed = now
+        AssistantMandate.objects.bulk_update(
+            self.updated_mandates.values(), MANDATE_IMPORTED_FIELDS + ['changed'], batch_size=BATCH_SIZE
+        )
+
+    def save_mandates_entities(self):
+        if self.replaced_links:
+            MandateEntity.objects.filter(id__in=self.replaced_links).delete()
+        MandateEntity.objects.bulk_create(
+            [
+                MandateEntity(assistant_mandate_id=mandate.pk, entity=entity)
+                for mandate, entity in self.new_links.values()
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+    def retrieve_learning_units_year_from_previous_mandates(self):
+        carry_over_tutoring_learning_units(self.new_mandates)
+
+    def save_fingerprints(self):
+        now = timezone.now()
+        new_fingerprints = []
+        updated_fingerprints = []
+        for key, mandate in self.imported_mandates.items():
+            fingerprint = self.fingerprints.get(key)
+            if fingerprint is None:
+                new_fingerprints.append(MandateImportFingerprint(
+                    mandate_id=mandate.pk, fingerprint=self.rows_fingerprints[key], imported=now
+                ))
+            elif fingerprint.fingerprint != self.rows_fingerprints[key]:
+                fingerprint.fingerprint = self.rows_fingerprints[key]
+                fingerprint.imported = now
+                updated_fingerprints.append(fingerprint)
+        MandateImportFingerprint.objects.bulk_create(new_fingerprints, batch_size=BATCH_SIZE)
+        MandateImportFingerprint.objects.bulk_update(
+            updated_fingerprints, ['fingerprint', 'imported'], batch_size=BATCH_SIZE
+        )
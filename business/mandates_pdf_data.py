@@ -0,0 +1,109 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.db.models import prefetch_related_objects
+
+from assistant.business.mandate_entity import get_last_acronyms
+from assistant.models import review, tutoring_learning_unit_year
+from assistant.models.enums import user_role
+from assistant.models.mandate_entity import MandateEntity
+from base.models import academic_year
+from base.models.entity import find_versions_from_entites
+
+
+class MandatesPdfData:
+    """Data shown in the PDF documents of a list of mandates, loaded with a fixed number of queries.
+
+    The section builders of the export receive the structures assembled here instead of querying the database for
+    each mandate: the entities, tutoring learning units and reviews of every mandate, the last acronym of the entity
+    of every reviewer, and the assistant, person and supervisor of every mandate.
+    """
+
+    def __init__(self, mandates, current_user_roles):
+        self.mandates = list(mandates)
+        prefetch_related_objects(self.mandates, 'academic_year', 'assistant__person', 'assistant__supervisor')
+        mandates_ids = [mandate.pk for mandate in self.mandates]
+        self.entities = self.load_entities(mandates_ids)
+        self.tutoring_learning_units_year = self.load_tutoring_learning_units_year(mandates_ids)
+        self.reviews = self.load_reviews(mandates_ids, current_user_roles)
+        self.reviewers_entities_acronyms = self.load_reviewers_entities_acronyms(
+            {rev.reviewer.entity_id for reviews in self.reviews.values() for rev in reviews if rev.reviewer}
+        )
+
+    @staticmethod
+    def load_entities(mandates_ids):
+        """Map each mandate to the versions of its entities at the start of the current academic year."""
+        mandates_entities = {}
+        for mandate_id, entity_id in MandateEntity.objects.filter(
+                assistant_mandate_id__in=mandates_ids
+        ).values_list('assistant_mandate_id', 'entity_id'):
+            mandates_entities.setdefault(mandate_id, set()).add(entity_id)
+        if not mandates_entities:
+            return {}
+        entities_ids = set().union(*mandates_entities.values())
+        versions = list(
+            find_versions_from_entites(entities_ids, academic_year.starting_academic_year().start_date)
+        )
+        return {
+            mandate_id: [version for version in versions if version.pk in mandate_entities]
+            for mandate_id, mandate_entities in mandates_entities.items()
+        }
+
+    @staticmethod
+    def load_tutoring_learning_units_year(mandates_ids):
+        tutoring_by_mandate = {}
+        for tutoring in tutoring_learning_unit_year.find_by_mandates(mandates_ids):
+            tutoring_by_mandate.setdefault(tutoring.mandate_id, []).append(tutoring)
+        return tutoring_by_mandate
+
+    @staticmethod
+    def load_reviews(mandates_ids, current_user_roles):
+        """Map each mandate to the reviews the user may read, in the order they are shown."""
+        if user_role.ASSISTANT in current_user_roles:
+            return {}
+        if user_role.ADMINISTRATOR in current_user_roles:
+            reviews = review.find_by_mandates(mandates_ids)
+        else:
+            reviews = review.find_before_mandates_state(mandates_ids, current_user_roles)
+        reviews_by_mandate = {}
+        for rev in reviews.select_related('reviewer__person'):
+            reviews_by_mandate.setdefault(rev.mandate_id, []).append(rev)
+        return reviews_by_mandate
+
+    @staticmethod
+    def load_reviewers_entities_acronyms(entities_ids):
+        return get_last_acronyms(entities_ids)
+
+    def get_entities(self, mandate):
+        return self.entities.get(mandate.pk, [])
+
+    def get_tutoring_learning_units_year(self, mandate):
+        return self.tutoring_learning_units_year.get(mandate.pk, [])
+
+    def get_reviews(self, mandate):
+        return self.reviews.get(mandate.pk, [])
+
+    def get_reviewer_entity_acronym(self, reviewer):
+        return self.reviewers_entities_acronyms.get(reviewer.entity_id)
@@ -0,0 +1,101 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from collections import OrderedDict
+
+from django.db.models import Count, Min, Q, Sum
+from django.utils.translation import gettext_lazy as _
+
+from assistant.models import review
+from assistant.models.assistant_mandate import AssistantMandate
+from assistant.models.enums import assistant_mandate_renewal, assistant_mandate_state, review_advice_choices
+from assistant.models.enums import reviewer_role
+from assistant.models.mandate_entity import MandateEntity
+from base.models.entity import find_versions_from_entites
+from base.models.entity_version import EntityVersion
+from base.models.enums import entity_type
+
+
+def get_summary_columns():
+    """Return the keys and the titles of the columns of the summary of the mandates of a faculty."""
+    columns = [('mandates', _('Mandates'))]
+    columns += [('state_' + state, name) for state, name in assistant_mandate_state.ASSISTANT_MANDATE_STATES]
+    columns += [('renewal_' + renewal, name)
+                for renewal, name in assistant_mandate_renewal.ASSISTANT_MANDATE_RENEWAL_TYPES]
+    columns += [('advice_' + advice, name) for advice, name in review_advice_choices.REVIEW_ADVICE_CHOICES]
+    columns += [('fulltime_equivalent', _('Full-time equivalent'))]
+    return columns
+
+
+def get_summary_aggregates(mandate_path=''):
+    """Return the SQL aggregates of the summary columns, for rows reaching the mandate through mandate_path."""
+    vice_rector_reviews = review.Review.objects.filter(
+        reviewer__role__icontains=reviewer_role.VICE_RECTOR.split('_', 1)[0]
+    )
+    aggregates = OrderedDict([('mandates', Count(mandate_path + 'id', distinct=True))])
+    for state, _name in assistant_mandate_state.ASSISTANT_MANDATE_STATES:
+        aggregates['state_' + state] = Count(
+            mandate_path + 'id', distinct=True, filter=Q(**{mandate_path + 'state': state})
+        )
+    for renewal, _name in assistant_mandate_renewal.ASSISTANT_MANDATE_RENEWAL_TYPES:
+        aggregates['renewal_' + renewal] = Count(
+            mandate_path + 'id', distinct=True, filter=Q(**{mandate_path + 'renewal_type': renewal})
+        )
+    for advice, _name in review_advice_choices.REVIEW_ADVICE_CHOICES:
+        aggregates['advice_' + advice] = Count(
+            mandate_path + 'id', distinct=True,
+            filter=Q(**{mandate_path + 'id__in': vice_rector_reviews.filter(advice=advice).values('mandate_id')})
+        )
+    aggregates['fulltime_equivalent'] = Sum(mandate_path + 'fulltime_equivalent')
+    return aggregates
+
+
+def get_faculties_summary(academic_year):
+    """Return the summary of the mandates of each faculty for the academic year, ordered by faculty acronym.
+
+    Each summary is computed by the database in a single grouped query, the acronyms of the faculties with another.
+    A mandate linked more than once to a faculty is counted and summed once: only the first of its links is kept.
+    """
+    first_links = MandateEntity.objects.filter(
+        assistant_mandate__academic_year=academic_year,
+        entity_id__in=EntityVersion.objects.filter(entity_type=entity_type.FACULTY).values('entity_id'),
+    ).values('assistant_mandate_id', 'entity_id').annotate(first_id=Min('id')).values('first_id')
+    summaries = list(
+        MandateEntity.objects.filter(id__in=first_links).values('entity_id').annotate(
+            **get_summary_aggregates('assistant_mandate__')
+        ).order_by()
+    )
+    acronyms = {
+        version.pk: version.acronym for version in find_versions_from_entites(
+            [summary['entity_id'] for summary in summaries], academic_year.start_date
+        )
+    }
+    for summary in summaries:
+        summary['faculty'] = acronyms.get(summary['entity_id'], '')
+    return sorted(summaries, key=lambda summary: summary['faculty'])
+
+
+def get_year_summary(academic_year):
+    return AssistantMandate.objects.filter(academic_year=academic_year).aggregate(**get_summary_aggregates())
@@ -0,0 +1,128 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import functools
+import multiprocessing
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections
+
+from assistant.business.mandates_import import ImportRow, get_renewal_type
+
+VALIDATION_CHUNK_SIZE = 200
+INVALID_DATE = 'INVALID_DATE'
+INVALID_FULLTIME_EQUIVALENT = 'INVALID_FULLTIME_EQUIVALENT'
+INVALID_COLUMNS_COUNT = 'INVALID_COLUMNS_COUNT'
+
+_inherited_connections = []
+
+
+def values_to_dict(values, titles):
+    record_to_import = {}
+    current_col = 0
+    for value in values:
+        value = '' if value is None else str(value)
+        if titles[current_col] == 'FGS' and value and len(value) != 8:
+            record_to_import[titles[current_col]] = value.zfill(8)
+        else:
+            record_to_import[titles[current_col]] = value
+        current_col += 1
+    return record_to_import
+
+
+def check_date_format(date):
+    if not date or len(date) != 10:
+        return False
+    try:
+        day, month, year = re.split('-|/', date)
+        correct_date = datetime.datetime(int(year), int(month), int(day))
+        return correct_date
+    except ValueError:
+        return False
+
+
+def normalize_record(record):
+    record['ASSISTANT_TYPE_CODE'] = record.get('ASSISTANT_TYPE_CODE', '').strip().upper()
+    record['RENEWAL_TYPE'] = get_renewal_type(record)
+    return record
+
+
+def validate_row(numbered_values, titles):
+    """Check and normalise one row of the file without any database access.
+
+    Return the line, the row to import or None, and the codes of the errors found in the row.
+    """
+    line, values = numbered_values
+    if len(values) != len(titles):
+        return line, None, [INVALID_COLUMNS_COUNT]
+    record = values_to_dict(values, titles)
+    errors = []
+    entry_date = check_date_format(record.get('ENTRY_DATE'))
+    end_date = check_date_format(record.get('END_DATE'))
+    if entry_date is False or end_date is False:
+        errors.append(INVALID_DATE)
+    try:
+        # Every mandate has a fulltime equivalent, so an empty cell is an error too.
+        Decimal(record.get('FULLTIME_EQUIVALENT', ''))
+    except InvalidOperation:
+        errors.append(INVALID_FULLTIME_EQUIVALENT)
+    if errors:
+        return line, None, errors
+    return line, ImportRow(line, normalize_record(record), entry_date, end_date), errors
+
+
+def forget_inherited_connections():
+    """Pool initializer making a forked worker open its own database connections if it ever needs one.
+
+    The inherited connections share their sockets with the parent, so they are dropped without being closed: closing
+    them would end the session of the parent, and its transaction with it.
+    """
+    for connection in connections.all():
+        if connection.connection is not None:
+            _inherited_connections.append(connection.connection)
+            connection.connection = None
+
+
+def validate_rows(numbered_values, titles, processes=None):
+    """Validate all the rows before any of them is imported and collect the errors of every line.
+
+    With more than one process, the rows are validated in a process pool. The connections of the caller are left
+    untouched, so the validation can run inside its transaction.
+    """
+    validate = functools.partial(validate_row, titles=titles)
+    if processes and processes > 1:
+        with multiprocessing.Pool(processes, initializer=forget_inherited_connections) as pool:
+            results = pool.map(validate, numbered_values, chunksize=VALIDATION_CHUNK_SIZE)
+    else:
+        results = map(validate, numbered_values)
+    rows = []
+    errors = []
+    for line, row, row_errors in results:
+        if row is not None:
+            rows.append(row)
+        errors.extend((line, error) for error in row_errors)
+    return rows, errors
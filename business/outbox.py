@@ -0,0 +1,118 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from assistant.models import settings as assistant_settings
+from assistant.models.academic_assistant import AcademicAssistant
+from assistant.models.enums import outbox_state
+from assistant.models.outbox_item import OutboxItem, find_pending
+from assistant.utils import send_email
+from osis_common.messaging import message_config
+
+OUTBOX_RATE_LIMIT = getattr(settings, 'ASSISTANT_OUTBOX_RATE_LIMIT', 60)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'ASSISTANT_OUTBOX_MAX_ATTEMPTS', 5)
+OUTBOX_RETRY_DELAY = datetime.timedelta(minutes=getattr(settings, 'ASSISTANT_OUTBOX_RETRY_DELAY_MINUTES', 5))
+OUTBOX_BATCH_SIZE = 100
+
+logger = logging.getLogger(settings.DEFAULT_LOGGER)
+
+
+def deliver_pending_items(limit=OUTBOX_BATCH_SIZE, rate_limit=OUTBOX_RATE_LIMIT):
+    """Send the pending items of the outbox that are due, and return the number of items sent.
+
+    As the templates are rendered with the name and gender of their receiver, each item is sent on its own. It is
+    locked, sent and marked as sent in its own transaction, so that a worker stopped in the middle of a campaign
+    resumes with the items that were not sent yet. The settings and the assistants of the items are loaded once.
+    At most rate_limit messages are sent per minute, without limit when it is 0.
+    """
+    procedure_dates = assistant_settings.get_settings()
+    items = list(find_pending(limit))
+    assistants = AcademicAssistant.objects.select_related('person').in_bulk(
+        {item.template_data['assistant'] for item in items if item.template_data.get('assistant')}
+    )
+    sent = 0
+    for item in items:
+        template_data = dict(item.template_data)
+        if template_data.get('assistant'):
+            template_data['assistant'] = assistants.get(template_data['assistant'])
+        template_base_data = send_email.get_template_base_data(procedure_dates, item.person, **template_data)
+        if deliver_item(item.pk, template_base_data):
+            sent += 1
+            if rate_limit:
+                time.sleep(60 / rate_limit)
+    return sent
+
+
+def deliver_item(item_id, template_base_data):
+    with transaction.atomic():
+        item = OutboxItem.objects.select_for_update(skip_locked=True).filter(
+            pk=item_id, state=outbox_state.PENDING
+        ).select_related('person').first()
+        if item is None:
+            return False
+        receivers = [message_config.create_receiver(item.person.id, item.person.email, item.person.language)]
+        try:
+            error = send_email.send_message_content(
+                item.html_template_ref, item.txt_template_ref, receivers, template_base_data
+            )
+        except Exception as e:
+            logger.exception("Outbox item %s could not be sent", item_id)
+            error = str(e) or e.__class__.__name__
+        if error:
+            report_failure([item], str(error))
+            return False
+        OutboxItem.objects.filter(pk=item.pk).update(
+            state=outbox_state.SENT, sent=timezone.now(), attempts=F('attempts') + 1, error=''
+        )
+        return True
+
+
+def report_failure(items, error):
+    """Schedule another attempt of the items, later after each failure, until they reach OUTBOX_MAX_ATTEMPTS."""
+    for item in items:
+        item.attempts += 1
+        item.error = error
+        if item.attempts >= OUTBOX_MAX_ATTEMPTS:
+            item.state = outbox_state.FAILED
+        else:
+            item.next_attempt = timezone.now() + OUTBOX_RETRY_DELAY * item.attempts
+    OutboxItem.objects.bulk_update(items, ['attempts', 'error', 'state', 'next_attempt'])
+
+
+def process_outbox(rate_limit=OUTBOX_RATE_LIMIT):
+    delivered = 0
+    sent = deliver_pending_items(rate_limit=rate_limit)
+    while sent:
+        delivered += sent
+        sent = deliver_pending_items(rate_limit=rate_limit)
+    return delivered
@@ -0,0 +1,139 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone, translation
+
+from assistant.models import assistant_mandate
+from assistant.models.enums import job_state, pdf_export_type
+from assistant.models.pdf_export_job import PdfExportJob, find_expired
+from assistant.utils import export_utils_pdf
+
+PDF_EXPORT_RETENTION = datetime.timedelta(hours=getattr(settings, 'ASSISTANT_PDF_EXPORT_RETENTION_HOURS', 24))
+PROGRESS_STEP = 10
+
+logger = logging.getLogger(settings.DEFAULT_LOGGER)
+
+
+def claim_next_job():
+    with transaction.atomic():
+        job = PdfExportJob.objects.select_for_update(skip_locked=True).filter(
+            state=job_state.PENDING
+        ).order_by('created').first()
+        if job:
+            job.state = job_state.RUNNING
+            job.started = timezone.now()
+            job.save(update_fields=['state', 'started'])
+        return job
+
+
+def run_job(job, processes=None):
+    """Render the export of a claimed job to its file, publishing the progress as the mandates are rendered.
+
+    The file can be downloaded until the job expires, PDF_EXPORT_RETENTION after it is finished. The timings of the
+    sections of the rendering are summed in the result of the job.
+    """
+    errors = []
+    timings = export_utils_pdf.PdfTimings()
+    try:
+        with translation.override(job.language or None), tempfile.TemporaryFile() as file:
+            file_name = write_export(job, file, processes, timings)
+            job.file.save(file_name, File(file), save=False)
+        job.file_name = file_name
+        job.expires = timezone.now() + PDF_EXPORT_RETENTION
+    except Exception as e:
+        logger.exception("PDF export job %s failed", job.pk)
+        errors.append(str(e))
+    job.state = job_state.FAILED if errors else job_state.DONE
+    job.finished = timezone.now()
+    job.result = {'errors': errors, 'timings': timings.to_dict()}
+    logger.info("PDF export job %s: %s", job.pk, job.result['timings'], extra={'pdf_export_job': job.pk})
+    job.save(update_fields=['state', 'finished', 'expires', 'file', 'file_name', 'result'])
+    return job
+
+
+def write_export(job, file, processes=None, timings=None):
+    """Write the export of a job to file and return the name under which it is downloaded."""
+    user = job.created_by.user
+    year = job.academic_year
+    mandates = find_mandates(job)
+    total = mandates.count()
+    PdfExportJob.objects.filter(pk=job.pk).update(items_total=total)
+
+    def report_progress(count):
+        if count % PROGRESS_STEP == 0:
+            PdfExportJob.objects.filter(pk=job.pk).update(items_processed=count)
+
+    if job.export_type == pdf_export_type.MANDATES_TO_SAP:
+        for chunk in export_utils_pdf.stream_mandates_zip(user, mandates, processes, report_progress, timings):
+            file.write(chunk)
+        extension = 'zip'
+    else:
+        renderer = export_utils_pdf.MandatesPdfRenderer(user, timings=timings)
+        if job.export_type == pdf_export_type.MANDATES:
+            file.write(renderer.render_concatenated(mandates, processes, report_progress))
+        elif job.export_type == pdf_export_type.DECLINED_MANDATES:
+            file.write(renderer.render_declined_mandates(mandates, year))
+        else:
+            file.write(renderer.render_mandates(mandates))
+        extension = 'pdf'
+    PdfExportJob.objects.filter(pk=job.pk).update(items_processed=total)
+    file.seek(0)
+    return export_utils_pdf.get_export_file_name(year, extension)
+
+
+def find_mandates(job):
+    if job.export_type == pdf_export_type.MANDATES_TO_SAP:
+        return export_utils_pdf.find_mandates_to_sap(job.academic_year)
+    if job.export_type == pdf_export_type.MANDATES:
+        return assistant_mandate.find_by_academic_year_by_excluding_declined(job.academic_year)
+    if job.export_type == pdf_export_type.DECLINED_MANDATES:
+        return assistant_mandate.find_declined_by_academic_year(job.academic_year)
+    return export_utils_pdf.find_mandates_for_reviewer(job.created_by, job.academic_year, job.filters)
+
+
+def delete_expired_files():
+    deleted = 0
+    for job in find_expired():
+        job.file.delete(save=False)
+        PdfExportJob.objects.filter(pk=job.pk).update(file='')
+        deleted += 1
+    return deleted
+
+
+def process_pending_jobs(processes=None):
+    processed = 0
+    job = claim_next_job()
+    while job:
+        run_job(job, processes)
+        processed += 1
+        job = claim_next_job()
+    return processed
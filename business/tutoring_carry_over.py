@@ -0,0 +1,86 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from assistant.models.assistant_mandate import AssistantMandate
+from assistant.models.tutoring_learning_unit_year import TutoringLearningUnitYear
+
+BATCH_SIZE = 500
+TUTORING_COPIED_FIELDS = [
+    field.attname for field in TutoringLearningUnitYear._meta.concrete_fields if field.name not in ('id', 'mandate')
+]
+
+
+def find_previous_mandates(mandates_ids):
+    """Map each mandate to the most recent mandate of its assistant in an earlier academic year."""
+    mandates = AssistantMandate.objects.filter(id__in=mandates_ids).values_list(
+        'id', 'assistant_id', 'academic_year__year'
+    )
+    years = {mandate_id: (assistant_id, year) for mandate_id, assistant_id, year in mandates}
+    if not years:
+        return {}
+    candidates = {}
+    earlier_mandates = AssistantMandate.objects.filter(
+        assistant_id__in={assistant_id for assistant_id, _ in years.values()},
+        academic_year__year__lt=max(year for _, year in years.values())
+    ).order_by('-academic_year__year', '-id').values_list('id', 'assistant_id', 'academic_year__year')
+    for mandate_id, assistant_id, year in earlier_mandates:
+        candidates.setdefault(assistant_id, []).append((year, mandate_id))
+    previous_mandates = {}
+    for mandate_id, (assistant_id, year) in years.items():
+        previous = next((candidate for candidate in candidates.get(assistant_id, []) if candidate[0] < year), None)
+        if previous:
+            previous_mandates[mandate_id] = previous[1]
+    return previous_mandates
+
+
+def carry_over_tutoring_learning_units(mandates):
+    """Copy the tutoring learning units of the previous mandate of each assistant to the given mandates.
+
+    The copies are written with one bulk insert whatever the number of mandates. Mandates which already have
+    tutoring learning units are left as they are, so the carry-over can safely be run again on the same mandates.
+    Return the number of tutoring learning units created.
+    """
+    mandates_ids = {mandate.pk for mandate in mandates}
+    mandates_ids -= set(
+        TutoringLearningUnitYear.objects.filter(mandate_id__in=mandates_ids).values_list('mandate_id', flat=True)
+    )
+    previous_mandates = find_previous_mandates(mandates_ids)
+    tutoring_by_mandate = {}
+    for tutoring in TutoringLearningUnitYear.objects.filter(
+            mandate_id__in=set(previous_mandates.values())
+    ).order_by('id').values('mandate_id', *TUTORING_COPIED_FIELDS):
+        tutoring_by_mandate.setdefault(tutoring.pop('mandate_id'), []).append(tutoring)
+    copies = [
+        TutoringLearningUnitYear(mandate_id=mandate_id, **tutoring)
+        for mandate_id, previous_mandate_id in previous_mandates.items()
+        for tutoring in tutoring_by_mandate.get(previous_mandate_id, [])
+    ]
+    TutoringLearningUnitYear.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    return len(copies)
+
+
+def carry_over_tutoring_learning_units_for_academic_year(academic_year):
+    """Carry the tutoring learning units over to all the mandates of an academic year, e.g. at the yearly rollover."""
+    return carry_over_tutoring_learning_units(AssistantMandate.objects.filter(academic_year=academic_year).only('id'))
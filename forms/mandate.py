@@ -25,11 +25,12 @@
 ##############################################################################
 from django import forms
 from django.forms import ModelForm, Textarea, inlineformset_factory
+from django.utils.translation import gettext_lazy as _
 
 import base.models
 from assistant import models as mdl
 from assistant.forms.common import EntityChoiceField
-from assistant.models.enums import assistant_mandate_renewal, assistant_type
+from assistant.models.enums import assistant_mandate_renewal, assistant_mandate_state, assistant_type
 from base.models import academic_year, entity
 from base.models.enums import entity_type
 
@@ -70,6 +71,43 @@ class MandatesArchivesForm(ModelForm):
         fields = ('academic_year',)
 
 
+class MandatesYearsExportForm(forms.Form):
+    from_academic_year = forms.ModelChoiceField(queryset=academic_year.AcademicYear.objects.all().order_by('-year'))
+    to_academic_year = forms.ModelChoiceField(queryset=academic_year.AcademicYear.objects.all().order_by('-year'))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        from_year, to_year = cleaned_data.get('from_academic_year'), cleaned_data.get('to_academic_year')
+        if from_year and to_year and from_year.year > to_year.year:
+            raise forms.ValidationError(_('The first academic year must precede the last one'))
+        return cleaned_data
+
+    def get_academic_years(self):
+        return academic_year.AcademicYear.objects.filter(
+            year__gte=self.cleaned_data['from_academic_year'].year,
+            year__lte=self.cleaned_data['to_academic_year'].year
+        ).order_by('year')
+
+
+class MandatesExportFilterForm(forms.Form):
+    state = forms.MultipleChoiceField(required=False, choices=assistant_mandate_state.ASSISTANT_MANDATE_STATES)
+    assistant_type = forms.MultipleChoiceField(required=False, choices=assistant_type.ASSISTANT_TYPES)
+    entity = forms.ModelChoiceField(required=False, queryset=entity.Entity.objects.all())
+    mandate = forms.ModelMultipleChoiceField(
+        required=False, queryset=mdl.assistant_mandate.AssistantMandate.objects.all()
+    )
+
+    def get_filters(self):
+        """Return the filters that are set, in a form that can be stored with an export job."""
+        filters = {
+            'states': self.cleaned_data['state'],
+            'assistant_types': self.cleaned_data['assistant_type'],
+            'entity': self.cleaned_data['entity'].id if self.cleaned_data['entity'] else None,
+            'mandates': [mandate.id for mandate in self.cleaned_data['mandate']],
+        }
+        return {name: value for name, value in filters.items() if value}
+
+
 def get_field_qs(field, **kwargs):
     if field.name == 'entity':
         return EntityChoiceField(queryset=base.models.entity.find_versions_from_entites(
@@ -29,11 +29,13 @@ from django.utils.translation import gettext as _
 
 class MandateFileForm(forms.Form):
     file = forms.FileField(error_messages={'required': _('No file submitted')})
+    dry_run = forms.BooleanField(required=False)
 
     def clean_file(self):
         file = self.cleaned_data['file']
-        content_type = file.content_type.split('/')[1]
-        valid_content_type = 'vnd.openxmlformats-officedocument.spreadsheetml.sheet' in content_type
-        if ".xlsx" not in file.name or not valid_content_type:
-            self.add_error('file', forms.ValidationError(_('File must be xlsx'), code='invalid'))
+        content_type = file.content_type.split('/')[-1]
+        valid_xlsx = ".xlsx" in file.name and 'vnd.openxmlformats-officedocument.spreadsheetml.sheet' in content_type
+        valid_csv = file.name.lower().endswith(('.csv', '.tsv'))
+        if not valid_xlsx and not valid_csv:
+            self.add_error('file', forms.ValidationError(_('File must be xlsx, csv or tsv'), code='invalid'))
         return file
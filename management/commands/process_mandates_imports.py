@@ -0,0 +1,49 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import time
+
+from django.core.management.base import BaseCommand
+
+from assistant.business import mandate_import_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process the uploaded mandates files waiting to be imported.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the pending jobs then exit.')
+        parser.add_argument('--sleep', type=int, default=5, help='Seconds to wait between two polls of the queue.')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Number of processes validating the rows of a file.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = mandate_import_jobs.process_pending_jobs(options['processes'])
+            if processed:
+                self.stdout.write('%s mandates import job(s) processed.' % processed)
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,49 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import time
+
+from django.core.management.base import BaseCommand
+
+from assistant.business import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send the messages waiting in the outbox, retrying the failed ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send the pending messages then exit.')
+        parser.add_argument('--sleep', type=int, default=5, help='Seconds to wait between two polls of the outbox.')
+        parser.add_argument('--rate-limit', type=int, default=outbox.OUTBOX_RATE_LIMIT,
+                            help='Maximum number of messages sent per minute, 0 for no limit.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = outbox.process_outbox(options['rate_limit'])
+            if sent:
+                self.stdout.write('%s message(s) sent.' % sent)
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
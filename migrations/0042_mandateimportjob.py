@@ -0,0 +1,34 @@
+# Generated by Django 2.2.5 on 2020-01-13 10:12
+
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0156_offeryearentity_education_group_year'),
+        ('assistant', '0041_auto_20191220_0942'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MandateImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='assistant/mandates_imports/')),
+                ('file_name', models.CharField(max_length=255)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'In progress'), ('DONE', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('rows_total', models.PositiveIntegerField(default=0)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('result', django.contrib.postgres.fields.jsonb.JSONField(blank=True, null=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.AcademicYear')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.Person')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2020-01-20 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0042_mandateimportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandateimportjob',
+            name='dry_run',
+            field=models.BooleanField(default=False),
+        ),
+    ]
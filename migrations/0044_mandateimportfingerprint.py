@@ -0,0 +1,24 @@
+# Generated by Django 2.2.5 on 2020-01-27 09:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0043_mandateimportjob_dry_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MandateImportFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('imported', models.DateTimeField(default=django.utils.timezone.now)),
+                ('mandate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='assistant.AssistantMandate')),
+            ],
+        ),
+    ]
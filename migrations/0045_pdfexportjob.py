@@ -0,0 +1,37 @@
+# Generated by Django 2.2.5 on 2020-02-03 14:21
+
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0156_offeryearentity_education_group_year'),
+        ('assistant', '0044_mandateimportfingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_type', models.CharField(choices=[('MANDATES', 'Export of assistants mandates'), ('DECLINED_MANDATES', 'Export of the declined assistants mandates'), ('MANDATES_TO_SAP', 'Export mandates to sap'), ('MANDATES_FOR_ENTITY', 'Exporting all data to a PDF file')], max_length=30)),
+                ('language', models.CharField(blank=True, max_length=10)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'In progress'), ('DONE', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('expires', models.DateTimeField(blank=True, null=True)),
+                ('items_total', models.PositiveIntegerField(default=0)),
+                ('items_processed', models.PositiveIntegerField(default=0)),
+                ('file', models.FileField(blank=True, upload_to='assistant/pdf_exports/')),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('result', django.contrib.postgres.fields.jsonb.JSONField(blank=True, null=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.AcademicYear')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.Person')),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.5 on 2020-02-17 10:04
+
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0156_offeryearentity_education_group_year'),
+        ('assistant', '0046_pdfexportjob_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('html_template_ref', models.CharField(max_length=255)),
+                ('txt_template_ref', models.CharField(max_length=255)),
+                ('template_data', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='assistant.Message')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.Person')),
+            ],
+            options={
+                'index_together': {('state', 'next_attempt')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.5 on 2020-02-24 11:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0047_outboxitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxitem',
+            name='event',
+            field=models.CharField(blank=True, choices=[('MANDATE_DECLINED', 'Mandate declined'), ('MANDATE_TO_PHD_SUPERVISOR', 'To Ph.D. promoter'), ('SUBSTITUTE_PHD_SUPERVISOR', 'Substitute promoter'), ('REVIEWER_DELEGATION', 'Delegation(s)')], max_length=50),
+        ),
+        migrations.AddField(
+            model_name='outboxitem',
+            name='mandate',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='assistant.AssistantMandate'),
+        ),
+        migrations.AddConstraint(
+            model_name='outboxitem',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(_negated=True, event=''), ('mandate__isnull', False), ('state', 'PENDING')), fields=('event', 'mandate', 'person'), name='outbox_item_unique_pending_notification'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.5 on 2020-03-02 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0048_outboxitem_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicassistant',
+            name='changed',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assistantmandate',
+            name='changed',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mandateentity',
+            name='changed',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutoringlearningunityear',
+            name='changed',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
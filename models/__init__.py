@@ -29,7 +29,11 @@ from assistant.models import assistant_document_file
 from assistant.models import assistant_mandate
 from assistant.models import manager
 from assistant.models import mandate_entity
+from assistant.models import mandate_import_fingerprint
+from assistant.models import mandate_import_job
 from assistant.models import message
+from assistant.models import outbox_item
+from assistant.models import pdf_export_job
 from assistant.models import review
 from assistant.models import reviewer
 from assistant.models import settings
@@ -93,6 +93,7 @@ class AssistantMandate(models.Model):
     special = models.BooleanField(default=False)
     contract_duration = models.CharField(max_length=30)
     contract_duration_fte = models.CharField(max_length=30)
+    changed = models.DateTimeField(null=True, auto_now=True)
     service_activities_remark = models.TextField(null=True, blank=True)
 
 
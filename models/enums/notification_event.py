@@ -0,0 +1,36 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.utils.translation import gettext_lazy as _
+
+MANDATE_DECLINED = 'MANDATE_DECLINED'
+MANDATE_TO_PHD_SUPERVISOR = 'MANDATE_TO_PHD_SUPERVISOR'
+SUBSTITUTE_PHD_SUPERVISOR = 'SUBSTITUTE_PHD_SUPERVISOR'
+REVIEWER_DELEGATION = 'REVIEWER_DELEGATION'
+
+NOTIFICATION_EVENTS = ((MANDATE_DECLINED, _('Mandate declined')),
+                       (MANDATE_TO_PHD_SUPERVISOR, _('To Ph.D. promoter')),
+                       (SUBSTITUTE_PHD_SUPERVISOR, _('Substitute promoter')),
+                       (REVIEWER_DELEGATION, _('Delegation(s)')))
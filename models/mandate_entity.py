@@ -31,6 +31,7 @@ from base.models import entity_version
 class MandateEntity(models.Model):
     assistant_mandate = models.ForeignKey('AssistantMandate', on_delete=models.CASCADE)
     entity = models.ForeignKey('base.Entity', on_delete=models.CASCADE)
+    changed = models.DateTimeField(null=True, auto_now=True)
 
     @property
     def name(self):
@@ -0,0 +1,47 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.contrib import admin
+from django.db import models
+from django.utils import timezone
+
+
+class MandateImportFingerprintAdmin(admin.ModelAdmin):
+    list_display = ('mandate', 'fingerprint', 'imported')
+    raw_id_fields = ('mandate',)
+    search_fields = ['mandate__sap_id', 'mandate__assistant__person__global_id']
+
+
+class MandateImportFingerprint(models.Model):
+    mandate = models.OneToOneField('AssistantMandate', on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=40)
+    imported = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return u"%s - %s" % (self.mandate_id, self.fingerprint)
+
+
+def find_by_academic_year(academic_year):
+    return MandateImportFingerprint.objects.filter(mandate__academic_year=academic_year)
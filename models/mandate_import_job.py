@@ -0,0 +1,106 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.contrib import admin
+from django.contrib.postgres.fields import JSONField
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+
+from assistant.models.enums import job_state
+
+
+class MandateImportJobAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'academic_year', 'state', 'dry_run', 'rows_processed', 'rows_total', 'created')
+    raw_id_fields = ('created_by',)
+    list_filter = ('state', 'academic_year')
+
+
+class MandateImportJob(models.Model):
+    file = models.FileField(upload_to='assistant/mandates_imports/')
+    file_name = models.CharField(max_length=255)
+    academic_year = models.ForeignKey('base.AcademicYear', on_delete=models.CASCADE)
+    created_by = models.ForeignKey('base.Person', on_delete=models.CASCADE)
+    state = models.CharField(max_length=20, choices=job_state.JOB_STATES, default=job_state.PENDING)
+    dry_run = models.BooleanField(default=False)
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    result = JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return u"%s (%s)" % (self.file_name, self.get_state_display())
+
+    @property
+    def is_finished(self):
+        return self.state in (job_state.DONE, job_state.FAILED)
+
+    def get_rows_processed(self):
+        """Return the number of rows processed, which a running job publishes in the cache."""
+        if self.state != job_state.RUNNING:
+            return self.rows_processed
+        return cache.get(get_progress_cache_key(self.pk), self.rows_processed)
+
+    def get_eta(self):
+        rows_processed = self.get_rows_processed()
+        if self.state != job_state.RUNNING or not rows_processed or not self.rows_total:
+            return None
+        elapsed = (timezone.now() - self.started).total_seconds()
+        return int(elapsed / rows_processed * (self.rows_total - rows_processed))
+
+    def get_status(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'state_display': str(self.get_state_display()),
+            'dry_run': self.dry_run,
+            'rows_total': self.rows_total,
+            'rows_processed': self.get_rows_processed(),
+            'errors': (self.result or {}).get('errors', []),
+            'eta': self.get_eta(),
+        }
+
+
+def get_progress_cache_key(job_id):
+    return 'assistant_mandate_import_job_progress_%s' % job_id
+
+
+def enqueue(uploaded_file, academic_year, person, dry_run=False):
+    return MandateImportJob.objects.create(
+        file=uploaded_file,
+        file_name=uploaded_file.name,
+        academic_year=academic_year,
+        created_by=person,
+        dry_run=dry_run
+    )
+
+
+def find_by_id(job_id):
+    try:
+        return MandateImportJob.objects.get(id=job_id)
+    except MandateImportJob.DoesNotExist:
+        return None
@@ -0,0 +1,123 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.contrib import admin
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from assistant.models.enums import notification_event, outbox_state
+
+
+class OutboxItemAdmin(admin.ModelAdmin):
+    list_display = ('person', 'message', 'event', 'html_template_ref', 'state', 'attempts', 'created', 'sent')
+    raw_id_fields = ('person', 'message', 'mandate')
+    list_filter = ('state', 'event', 'html_template_ref')
+
+
+class OutboxItem(models.Model):
+    message = models.ForeignKey('assistant.Message', null=True, blank=True, on_delete=models.CASCADE)
+    event = models.CharField(max_length=50, choices=notification_event.NOTIFICATION_EVENTS, blank=True)
+    mandate = models.ForeignKey('assistant.AssistantMandate', null=True, blank=True, on_delete=models.CASCADE)
+    person = models.ForeignKey('base.Person', on_delete=models.CASCADE)
+    html_template_ref = models.CharField(max_length=255)
+    txt_template_ref = models.CharField(max_length=255)
+    template_data = JSONField(default=dict, blank=True)
+    state = models.CharField(max_length=20, choices=outbox_state.OUTBOX_STATES, default=outbox_state.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(default=timezone.now)
+    sent = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        index_together = ('state', 'next_attempt')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'mandate', 'person'],
+                condition=~Q(event='') & Q(mandate__isnull=False) & Q(state=outbox_state.PENDING),
+                name='outbox_item_unique_pending_notification'
+            ),
+        ]
+
+    def __str__(self):
+        return u"%s : %s (%s)" % (self.person, self.html_template_ref, self.get_state_display())
+
+
+def find_pending(limit):
+    return OutboxItem.objects.filter(
+        state=outbox_state.PENDING, next_attempt__lte=timezone.now()
+    ).select_related('person').order_by('id')[:limit]
+
+
+def annotate_progress(messages):
+    """Add the number of items, sent and failed items and the list of the failed items to each message."""
+    return messages.annotate(
+        items_total=Count('outboxitem'),
+        items_sent=Count('outboxitem', filter=Q(outboxitem__state=outbox_state.SENT)),
+        items_failed=Count('outboxitem', filter=Q(outboxitem__state=outbox_state.FAILED)),
+    ).prefetch_related(
+        Prefetch(
+            'outboxitem_set',
+            queryset=OutboxItem.objects.filter(state=outbox_state.FAILED).select_related('person'),
+            to_attr='failed_items'
+        )
+    )
+
+
+def enqueue_campaign(message, recipients):
+    """Store an item for each (person, html_template_ref, txt_template_ref[, template_data]) recipient of the
+    campaign of message, and return their number."""
+    items = [
+        OutboxItem(
+            message=message,
+            person=recipient[0],
+            html_template_ref=recipient[1],
+            txt_template_ref=recipient[2],
+            template_data=recipient[3] if len(recipient) > 3 else {}
+        ) for recipient in recipients
+    ]
+    OutboxItem.objects.bulk_create(items, batch_size=500)
+    return len(items)
+
+
+def enqueue_notification(event, person, html_template_ref, txt_template_ref, mandate=None, assistant=None):
+    """Store the notification of an event of the workflow, unless the same notification of the mandate is still
+    pending for the person. Once it was sent, the event is notified again when it occurs again, for instance when
+    a mandate sent back to the assistant is submitted again. An event without a mandate, such as a delegation, is
+    stored each time it occurs.
+    Called in the transaction of the change it notifies, so that it is only sent once that change is saved.
+    """
+    defaults = {
+        'html_template_ref': html_template_ref,
+        'txt_template_ref': txt_template_ref,
+        'template_data': {'assistant': assistant.pk} if assistant else {},
+    }
+    if mandate is None:
+        return OutboxItem.objects.create(event=event, person=person, **defaults), True
+    return OutboxItem.objects.get_or_create(
+        event=event, mandate=mandate, person=person, state=outbox_state.PENDING, defaults=defaults
+    )
@@ -0,0 +1,102 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.contrib import admin
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils import timezone
+
+from assistant.models.enums import job_state, pdf_export_type
+
+
+class PdfExportJobAdmin(admin.ModelAdmin):
+    list_display = ('export_type', 'academic_year', 'state', 'items_processed', 'items_total', 'created', 'expires')
+    raw_id_fields = ('created_by',)
+    list_filter = ('state', 'export_type', 'academic_year')
+
+
+class PdfExportJob(models.Model):
+    export_type = models.CharField(max_length=30, choices=pdf_export_type.PDF_EXPORT_TYPES)
+    academic_year = models.ForeignKey('base.AcademicYear', on_delete=models.CASCADE)
+    created_by = models.ForeignKey('base.Person', on_delete=models.CASCADE)
+    language = models.CharField(max_length=10, blank=True)
+    state = models.CharField(max_length=20, choices=job_state.JOB_STATES, default=job_state.PENDING)
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    expires = models.DateTimeField(null=True, blank=True)
+    items_total = models.PositiveIntegerField(default=0)
+    items_processed = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='assistant/pdf_exports/', blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    filters = JSONField(null=True, blank=True)
+    result = JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return u"%s (%s)" % (self.get_export_type_display(), self.get_state_display())
+
+    @property
+    def is_finished(self):
+        return self.state in (job_state.DONE, job_state.FAILED)
+
+    @property
+    def is_expired(self):
+        return self.expires is not None and self.expires <= timezone.now()
+
+    @property
+    def is_downloadable(self):
+        return self.state == job_state.DONE and bool(self.file) and not self.is_expired
+
+    def get_status(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'state_display': str(self.get_state_display()),
+            'items_total': self.items_total,
+            'items_processed': self.items_processed,
+            'downloadable': self.is_downloadable,
+            'errors': (self.result or {}).get('errors', []),
+        }
+
+
+def enqueue(export_type, academic_year, person, language, filters=None):
+    return PdfExportJob.objects.create(
+        export_type=export_type,
+        academic_year=academic_year,
+        created_by=person,
+        language=language or '',
+        filters=filters or None
+    )
+
+
+def find_by_id_and_person(job_id, person):
+    try:
+        return PdfExportJob.objects.get(id=job_id, created_by=person)
+    except PdfExportJob.DoesNotExist:
+        return None
+
+
+def find_expired():
+    return PdfExportJob.objects.filter(expires__lte=timezone.now()).exclude(file='')
@@ -54,10 +54,20 @@ def find_by_mandate(mandate_id) -> Review.objects:
     return Review.objects.filter(mandate=mandate_id).order_by('changed')
 
 
+def find_by_mandates(mandates_ids) -> Review.objects:
+    return Review.objects.filter(mandate__in=mandates_ids).order_by('changed')
+
+
 def find_review_for_mandate_by_role(mandate, role) -> Optional[Review]:
     return Review.objects.filter(mandate=mandate).filter(reviewer__role__icontains=role.split('_', 1)[0]).first()
 
 
+def find_by_mandates_and_role(mandates_ids, role) -> Review.objects:
+    return Review.objects.filter(
+        mandate__in=mandates_ids, reviewer__role__icontains=role.split('_', 1)[0]
+    ).order_by('pk')
+
+
 def find_done_by_supervisor_for_mandate(mandate) -> Review:
     return Review.objects.get(reviewer=None, mandate=mandate, status='DONE')
 
@@ -70,6 +80,10 @@ def get_in_progress_for_mandate(mandate) -> Optional[Review]:
 
 
 def find_before_mandate_state(mandate, current_roles):
+    return find_before_mandates_state([mandate], current_roles)
+
+
+def find_before_mandates_state(mandates, current_roles):
     reviewers_order_list = [
         reviewer_role.RESEARCH,
         reviewer_role.SUPERVISION,
@@ -86,7 +100,7 @@ def find_before_mandate_state(mandate, current_roles):
     ]
 
     filter_clause_q = functools.reduce(lambda a, b: a | b, filter_clause, models.Q(reviewer__role=None))
-    qs = Review.objects.filter(mandate=mandate).filter(
+    qs = Review.objects.filter(mandate__in=mandates).filter(
         filter_clause_q
     ).filter(
         status=review_status.DONE
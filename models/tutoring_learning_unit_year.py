@@ -37,6 +37,7 @@ class TutoringLearningUnitYear(models.Model):
     preparation_duration = models.PositiveIntegerField(null=True, blank=True)
     exams_supervision_duration = models.PositiveIntegerField(null=True, blank=True)
     others_delivery = models.TextField(null=True, blank=True)
+    changed = models.DateTimeField(null=True, auto_now=True)
 
 
 def find_by_id(tutoring_learning_unit_id):
@@ -51,5 +52,13 @@ def find_by_mandate(mandate):
     )
 
 
+def find_by_mandates(mandates):
+    return TutoringLearningUnitYear.objects.filter(mandate__in=mandates).select_related(
+        'learning_unit_year__academic_year', 'learning_unit_year__learning_container_year'
+    ).order_by(
+        'learning_unit_year__academic_year'
+    )
+
+
 def find_learning_unit_year(learning_unit_year):
     return TutoringLearningUnitYear.objects.filter(learning_unit_year=learning_unit_year)
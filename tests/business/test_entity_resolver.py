@@ -0,0 +1,63 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+
+from django.test import TestCase
+
+from assistant.business.entity_resolver import EntityResolver
+from base.models.enums import entity_type
+from base.tests.factories.entity_version import EntityVersionFactory
+
+
+class TestEntityResolver(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        end_date = datetime.date(datetime.date.today().year + 1, 9, 14)
+        cls.sector = EntityVersionFactory(entity_type=entity_type.SECTOR, acronym='SST', end_date=end_date)
+        cls.faculty = EntityVersionFactory(entity_type=entity_type.FACULTY, acronym='SC', end_date=end_date)
+
+    def test_find_entity_is_cached(self):
+        resolver = EntityResolver()
+        self.assertEqual(resolver.find_entity('sst', entity_type.SECTOR), self.sector.entity)
+        self.assertIsNone(resolver.find_entity('SST', entity_type.FACULTY))
+        self.assertIsNone(resolver.find_entity(None, entity_type.FACULTY))
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.find_entity('SST', entity_type.SECTOR), self.sector.entity)
+            self.assertIsNone(resolver.find_entity('SST', entity_type.FACULTY))
+            self.assertEqual(resolver.get_entity_type(self.sector.entity), entity_type.SECTOR)
+
+    def test_preload_resolves_all_acronyms_at_once(self):
+        resolver = EntityResolver()
+        with self.assertNumQueries(2):
+            resolver.preload([('SST', entity_type.SECTOR), ('SC', entity_type.FACULTY), ('XX', entity_type.POLE)])
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.find_entity('SC', entity_type.FACULTY), self.faculty.entity)
+            self.assertEqual(resolver.get_entity_type(self.faculty.entity), entity_type.FACULTY)
+
+    def test_get_entity_type_at_date(self):
+        resolver = EntityResolver(datetime.date(datetime.date.today().year + 2, 1, 1))
+        self.assertIsNone(resolver.get_entity_type(self.faculty.entity))
+        self.assertEqual(resolver.get_entity_type(self.faculty.entity, entity_type.FACULTY), entity_type.FACULTY)
@@ -0,0 +1,121 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils import timezone
+
+from assistant.business import mandate_import_jobs
+from assistant.models import mandate_import_job
+from assistant.models.assistant_mandate import AssistantMandate
+from assistant.models.enums import job_state
+from assistant.tests.factories.manager import ManagerFactory
+from base.tests.factories.academic_year import AcademicYearFactory
+
+
+def uploaded_file(path):
+    with open(path, 'rb') as file:
+        return SimpleUploadedFile(
+            'mandates.xlsx', file.read(), content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+
+class TestMandateImportJobs(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = ManagerFactory()
+        cls.academic_year = AcademicYearFactory()
+
+    def test_claim_next_job_takes_oldest_pending_job(self):
+        first_job = mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_ok.xlsx'), self.academic_year, self.manager.person
+        )
+        mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_ok.xlsx'), self.academic_year, self.manager.person
+        )
+        job = mandate_import_jobs.claim_next_job()
+        self.assertEqual(job, first_job)
+        self.assertEqual(job.state, job_state.RUNNING)
+        self.assertIsNotNone(job.started)
+
+    def test_claim_next_job_reclaims_job_left_running(self):
+        job = mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_ok.xlsx'), self.academic_year, self.manager.person
+        )
+        job.state = job_state.RUNNING
+        job.started = timezone.now()
+        job.save()
+        self.assertIsNone(mandate_import_jobs.claim_next_job())
+        job.started = timezone.now() - mandate_import_jobs.IMPORT_JOB_TIMEOUT - datetime.timedelta(minutes=1)
+        job.save()
+        self.assertEqual(mandate_import_jobs.claim_next_job(), job)
+
+    def test_run_job_stores_result_and_progress(self):
+        mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_ok.xlsx'), self.academic_year, self.manager.person
+        )
+        self.assertEqual(mandate_import_jobs.process_pending_jobs(), 1)
+        job = mandate_import_job.MandateImportJob.objects.get()
+        self.assertEqual(job.state, job_state.DONE)
+        self.assertEqual(job.rows_processed, job.rows_total)
+        self.assertEqual(job.result['errors'], [])
+        self.assertIn('preload', job.result['timings'])
+
+    def test_run_job_in_dry_run_does_not_import(self):
+        mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_ok.xlsx'), self.academic_year, self.manager.person,
+            dry_run=True
+        )
+        mandate_import_jobs.process_pending_jobs()
+        job = mandate_import_job.MandateImportJob.objects.get()
+        self.assertEqual(job.state, job_state.DONE)
+        self.assertTrue(job.result['dry_run'])
+        self.assertFalse(AssistantMandate.objects.filter(academic_year=self.academic_year).exists())
+
+    def test_run_job_fails_on_invalid_file(self):
+        mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_bad_date.xlsx'), self.academic_year,
+            self.manager.person
+        )
+        mandate_import_jobs.process_pending_jobs()
+        job = mandate_import_job.MandateImportJob.objects.get()
+        self.assertEqual(job.state, job_state.FAILED)
+        self.assertEqual(len(job.result['errors']), 1)
+        self.assertEqual(job.rows_processed, 0)
+
+    @patch.object(mandate_import_jobs, 'IMPORT_CHUNK_SIZE', 1)
+    def test_run_job_imports_nothing_when_it_fails(self):
+        mandate_import_job.enqueue(
+            uploaded_file('assistant/tests/resources/assistants_ok.xlsx'), self.academic_year, self.manager.person
+        )
+        with patch.object(mandate_import_jobs, 'report_disappeared_rows', side_effect=Exception('error')):
+            mandate_import_jobs.process_pending_jobs()
+        job = mandate_import_job.MandateImportJob.objects.get()
+        self.assertEqual(job.state, job_state.FAILED)
+        self.assertEqual(job.rows_processed, 0)
+        self.assertFalse(AssistantMandate.objects.filter(academic_year=self.academic_year).exists())
@@ -0,0 +1,123 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from assistant.business import mandate_pdf_cache
+from assistant.business.mandate_pdf_cache import MandatePdfCache
+from assistant.models.enums import assistant_mandate_state, user_role
+from assistant.models.tutoring_learning_unit_year import TutoringLearningUnitYear
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.manager import ManagerFactory
+from assistant.tests.factories.review import ReviewFactory
+from assistant.utils import export_utils_pdf
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.learning_unit_year import LearningUnitYearFactory
+
+
+class TestMandatePdfCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        cls.academic_year = AcademicYearFactory(
+            start_date=today.replace(year=today.year - 1),
+            end_date=today.replace(year=today.year + 1),
+            year=today.year - 1,
+        )
+        cls.manager = ManagerFactory()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = MandatePdfCache(directory.name, 10 * 1024 * 1024)
+        patcher = patch.object(mandate_pdf_cache, 'pdf_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mandate = AssistantMandateFactory(academic_year=self.academic_year, state=assistant_mandate_state.DONE)
+
+    def test_accepts_only_reviewed_mandates(self):
+        self.assertTrue(self.cache.accepts(self.mandate))
+        self.mandate.state = assistant_mandate_state.TRTS
+        self.assertFalse(self.cache.accepts(self.mandate))
+        self.mandate.state = assistant_mandate_state.DECLINED
+        self.assertFalse(MandatePdfCache(self.cache.directory, 0).accepts(self.mandate))
+        self.assertFalse(MandatePdfCache(None, 10 * 1024 * 1024).accepts(self.mandate))
+
+    def test_key_depends_on_roles_and_version(self):
+        key = self.cache.get_key(self.mandate, [user_role.ADMINISTRATOR], 'fr-be', None)
+        self.assertTrue(key.startswith('%s-' % self.mandate.pk))
+        self.assertEqual(key, self.cache.get_key(self.mandate, [user_role.ADMINISTRATOR], 'fr-be', None))
+        self.assertNotEqual(key, self.cache.get_key(self.mandate, [user_role.ASSISTANT], 'fr-be', None))
+        self.assertNotEqual(
+            key, self.cache.get_key(self.mandate, [user_role.ADMINISTRATOR], 'fr-be', {'Review': (('rows', 1),)})
+        )
+
+    def test_version_changes_with_content(self):
+        versions = [self.cache.load_versions([self.mandate.pk])[self.mandate.pk]]
+        ReviewFactory(mandate=self.mandate)
+        versions.append(self.cache.load_versions([self.mandate.pk])[self.mandate.pk])
+        TutoringLearningUnitYear.objects.bulk_create([
+            TutoringLearningUnitYear(mandate=self.mandate, learning_unit_year=LearningUnitYearFactory())
+        ])
+        versions.append(self.cache.load_versions([self.mandate.pk])[self.mandate.pk])
+        self.mandate.assistant.save()
+        versions.append(self.cache.load_versions([self.mandate.pk])[self.mandate.pk])
+        self.assertEqual(len({repr(sorted(version.items())) for version in versions}), 4)
+
+    def test_evicts_least_recently_read(self):
+        cache = MandatePdfCache(self.cache.directory, 1024)
+        cache.set('1-a', b'a' * 400)
+        cache.set('2-b', b'b' * 400)
+        os.utime(cache.get_path('1-a'), (0, 0))
+        cache.set('3-c', b'c' * 400)
+        self.assertIsNone(cache.get('1-a'))
+        self.assertEqual(cache.get('2-b'), b'b' * 400)
+        self.assertEqual(cache.get('3-c'), b'c' * 400)
+
+    def test_keeps_size_without_scanning(self):
+        cache = MandatePdfCache(self.cache.directory, 1024)
+        cache.set('1-a', b'a' * 400)
+        with patch.object(cache, 'scan') as mock_scan:
+            cache.set('1-a', b'a' * 300)
+            cache.set('2-b', b'b' * 400)
+            self.assertFalse(mock_scan.called)
+        self.assertEqual(cache.size, 700)
+        cache.remove(cache.get_path('1-a'))
+        self.assertEqual(cache.size, 400)
+
+    def test_renderer_reads_cached_document(self):
+        renderer = export_utils_pdf.MandatesPdfRenderer(self.manager.person.user)
+        pdf = renderer.render_mandates([self.mandate])
+        self.assertEqual(len(os.listdir(self.cache.directory)), 1)
+        with patch.object(export_utils_pdf, 'render_blocks') as mock_render_blocks, \
+                patch.object(export_utils_pdf, 'MandatesPdfData') as mock_data:
+            self.assertEqual(renderer.render_mandates([self.mandate]), pdf)
+            self.assertFalse(mock_render_blocks.called)
+            self.assertFalse(mock_data.called)
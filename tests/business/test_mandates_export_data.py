@@ -0,0 +1,114 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import csv
+import datetime
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from assistant.business.mandates_export_data import MandatesExportData, iter_mandates_export_data
+from assistant.models import assistant_mandate
+from assistant.models.enums import review_advice_choices, reviewer_role
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.mandate_entity import MandateEntityFactory
+from assistant.tests.factories.review import ReviewFactory
+from assistant.tests.factories.reviewer import ReviewerFactory
+from assistant.views import mandate as mandate_view
+from base.models.enums import entity_type
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.entity_version import EntityVersionFactory
+
+
+class TestMandatesExportData(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        cls.academic_year = AcademicYearFactory(
+            start_date=today.replace(year=today.year - 1),
+            end_date=today.replace(year=today.year + 1),
+            year=today.year - 1,
+        )
+        cls.faculty = EntityVersionFactory(
+            entity_type=entity_type.FACULTY, start_date=cls.academic_year.start_date, end_date=None
+        )
+        cls.institute = EntityVersionFactory(
+            entity_type=entity_type.INSTITUTE, start_date=cls.academic_year.start_date, end_date=None
+        )
+        cls.vice_rector = ReviewerFactory(role=reviewer_role.VICE_RECTOR, entity=cls.faculty.entity)
+        cls.mandates = [cls.create_mandate() for _ in range(4)]
+
+    @classmethod
+    def create_mandate(cls):
+        mandate = AssistantMandateFactory(academic_year=cls.academic_year)
+        MandateEntityFactory(assistant_mandate=mandate, entity=cls.faculty.entity)
+        MandateEntityFactory(assistant_mandate=mandate, entity=cls.institute.entity)
+        ReviewFactory(mandate=mandate, reviewer=cls.vice_rector, advice=review_advice_choices.FAVORABLE)
+        return mandate
+
+    def get_mandates(self, count):
+        return assistant_mandate.AssistantMandate.objects.filter(
+            pk__in=[mandate.pk for mandate in self.mandates[:count]]
+        ).order_by('pk')
+
+    def count_queries(self, mandates, chunk_size):
+        with CaptureQueriesContext(connection) as context:
+            list(iter_mandates_export_data(mandates, chunk_size))
+        return len(context.captured_queries)
+
+    def test_queries_count_does_not_depend_on_mandates_count(self):
+        self.assertEqual(
+            self.count_queries(self.get_mandates(1), chunk_size=10),
+            self.count_queries(self.get_mandates(4), chunk_size=10)
+        )
+
+    def test_lines_are_the_same_as_without_data(self):
+        for mandate, data in iter_mandates_export_data(self.get_mandates(4), chunk_size=3):
+            self.assertEqual(mandate_view.construct_line(mandate, data), mandate_view.construct_line(mandate))
+
+    def test_data_of_each_mandate(self):
+        data = MandatesExportData(self.get_mandates(4).select_related('academic_year'))
+        for mandate in data.mandates:
+            self.assertCountEqual(
+                [entity.pk for entity in data.get_entities(mandate)],
+                [self.faculty.entity.pk, self.institute.entity.pk]
+            )
+            self.assertEqual(data.get_vice_rector_review(mandate).reviewer, self.vice_rector)
+
+    def test_jsonl_lines_have_every_column(self):
+        lines = list(mandate_view.generate_jsonl(self.get_mandates(4)))
+        self.assertEqual(len(lines), 4)
+        record = json.loads(lines[0])
+        self.assertCountEqual(record.keys(), mandate_view.LINES_COLUMNS)
+        self.assertEqual(record['faculty'], self.faculty.acronym)
+        self.assertEqual(record['sap_id'], self.mandates[0].sap_id)
+
+    def test_csv_lines_start_with_titles(self):
+        rows = list(csv.reader(''.join(mandate_view.generate_csv(self.get_mandates(4))).splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0], mandate_view.get_titles())
+        self.assertEqual(rows[1][4], self.mandates[0].sap_id)
@@ -0,0 +1,190 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from assistant.business.mandates_import import ImportRow, ImportRun, MandatesImporter
+from assistant.business.mandates_import import get_row_fingerprint, report_disappeared_rows
+from assistant.models.academic_assistant import AcademicAssistant
+from assistant.models.assistant_mandate import AssistantMandate
+from assistant.models.enums import assistant_mandate_renewal, assistant_phd_inscription, assistant_type
+from assistant.models.enums import import_action
+from assistant.models.mandate_entity import MandateEntity
+from assistant.models.mandate_import_fingerprint import MandateImportFingerprint
+from assistant.tests.factories.academic_assistant import AcademicAssistantFactory
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.mandate_entity import MandateEntityFactory
+from base.models.enums import entity_type
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.entity_version import EntityVersionFactory
+from base.tests.factories.person import PersonFactory
+
+
+def build_record(global_id, sap_id, **kwargs):
+    record = {
+        'SECTOR': 'SST', 'LOGISTICS_ENTITY': 'None', 'FACULTY': 'SC', 'SCHOOL': 'None', 'INSTITUTE': 'None',
+        'POLE': 'None', 'SAP_ID': sap_id, 'GLOBAL_ID': sap_id, 'LAST_NAME': 'last_name', 'FIRST_NAME': 'first_name',
+        'FULLTIME_EQUIVALENT': '1', 'ENTRY_DATE': '01/02/2015', 'END_DATE': '03-10-2017',
+        'ASSISTANT_TYPE_CODE': 'ST', 'SCALE': '021', 'CONTRACT_DURATION': '4', 'CONTRACT_DURATION_FTE': '4',
+        'RENEWAL_TYPE': 'NORMAL', 'ABSENCES': 'None', 'COMMENT': 'None', 'OTHER_STATUS': 'None', 'EMAIL': 'None',
+        'FGS': global_id
+    }
+    record.update(kwargs)
+    return record
+
+
+def build_row(line, record):
+    return ImportRow(line, record, datetime.datetime(2015, 2, 1), datetime.datetime(2017, 10, 3))
+
+
+class TestMandatesImporter(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.academic_year = AcademicYearFactory()
+        end_date = datetime.date(datetime.date.today().year + 1, 9, 14)
+        cls.sector = EntityVersionFactory(entity_type=entity_type.SECTOR, acronym='SST', end_date=end_date)
+        cls.faculty = EntityVersionFactory(entity_type=entity_type.FACULTY, acronym='SC', end_date=end_date)
+        cls.other_faculty = EntityVersionFactory(entity_type=entity_type.FACULTY, acronym='LSM', end_date=end_date)
+        cls.person = PersonFactory(global_id='00201968')
+        cls.assistant = AcademicAssistantFactory(person=cls.person)
+        cls.new_person = PersonFactory(global_id='00201979')
+
+    def test_import_creates_assistant_mandate_and_entities(self):
+        import_run = MandatesImporter(self.academic_year).import_rows([
+            build_row(2, build_record('00201979', '1122199', ASSISTANT_TYPE_CODE='AS', RENEWAL_TYPE='exceptionnel'))
+        ])
+        self.assertEqual(import_run.assistants_imported, 1)
+        self.assertEqual(import_run.mandates_imported, 1)
+        assistant = AcademicAssistant.objects.get(person=self.new_person)
+        self.assertEqual(assistant.inscription, assistant_phd_inscription.NO)
+        mandate = AssistantMandate.objects.get(assistant=assistant, academic_year=self.academic_year)
+        self.assertEqual(mandate.assistant_type, assistant_type.TEACHING_ASSISTANT)
+        self.assertEqual(mandate.renewal_type, assistant_mandate_renewal.EXCEPTIONAL)
+        self.assertCountEqual(
+            MandateEntity.objects.filter(assistant_mandate=mandate).values_list('entity', flat=True),
+            [self.sector.entity.pk, self.faculty.entity.pk]
+        )
+
+    def test_import_updates_existing_mandate_and_replaces_entity_of_same_type(self):
+        mandate = AssistantMandateFactory(assistant=self.assistant, academic_year=self.academic_year, sap_id='1122199')
+        MandateEntityFactory(assistant_mandate=mandate, entity=self.other_faculty.entity)
+        import_run = MandatesImporter(self.academic_year).import_rows([
+            build_row(2, build_record('00201968', '1122199', SCALE='502'))
+        ])
+        self.assertEqual(import_run.assistants_unchanged, 1)
+        self.assertEqual(import_run.mandates_updated, 1)
+        self.assertEqual(
+            import_run.changes,
+            [(2, '1122199', import_action.UNCHANGED, import_action.UPDATED, import_action.UPDATED)]
+        )
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.scale, '502')
+        self.assertCountEqual(
+            MandateEntity.objects.filter(assistant_mandate=mandate).values_list('entity', flat=True),
+            [self.sector.entity.pk, self.faculty.entity.pk]
+        )
+
+    def test_dry_run_reports_changes_without_writing(self):
+        import_run = MandatesImporter(self.academic_year, dry_run=True).import_rows([
+            build_row(2, build_record('00201979', '1122199'))
+        ])
+        self.assertTrue(import_run.dry_run)
+        self.assertEqual(import_run.assistants_imported, 1)
+        self.assertEqual(import_run.mandates_imported, 1)
+        self.assertEqual(
+            import_run.changes,
+            [(2, '1122199', import_action.CREATED, import_action.CREATED, import_action.CREATED)]
+        )
+        self.assertFalse(AcademicAssistant.objects.filter(person=self.new_person).exists())
+        self.assertFalse(AssistantMandate.objects.filter(sap_id='1122199').exists())
+
+    def test_unchanged_rows_are_skipped(self):
+        rows = [build_row(2, build_record('00201968', '1122199'))]
+        MandatesImporter(self.academic_year).import_rows(rows)
+        mandate = AssistantMandate.objects.get(assistant=self.assistant, sap_id='1122199')
+        links_ids = set(MandateEntity.objects.filter(assistant_mandate=mandate).values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            import_run = MandatesImporter(self.academic_year, use_fingerprints=False).import_rows(rows)
+        self.assertEqual(import_run.rows_unchanged, 1)
+        self.assertEqual(import_run.mandates_unchanged, 1)
+        self.assertEqual(import_run.changes, [])
+        self.assertFalse([query for query in queries if query['sql'].startswith(('UPDATE', 'DELETE', 'INSERT'))])
+        self.assertSetEqual(
+            set(MandateEntity.objects.filter(assistant_mandate=mandate).values_list('id', flat=True)), links_ids
+        )
+
+    def test_rows_with_same_fingerprint_are_not_processed(self):
+        MandatesImporter(self.academic_year).import_rows([build_row(2, build_record('00201968', '1122199'))])
+        mandate = AssistantMandate.objects.get(assistant=self.assistant, sap_id='1122199')
+        self.assertTrue(MandateImportFingerprint.objects.filter(mandate=mandate).exists())
+        import_run = MandatesImporter(self.academic_year).import_rows([
+            build_row(2, build_record('00201968', '1122199', FACULTY=' sc ', FULLTIME_EQUIVALENT='1.00'))
+        ])
+        self.assertEqual(import_run.rows_unchanged, 1)
+        self.assertEqual(import_run.mandates_unchanged + import_run.mandates_updated, 0)
+        import_run = MandatesImporter(self.academic_year).import_rows([
+            build_row(2, build_record('00201968', '1122199', SCALE='502'))
+        ])
+        self.assertEqual(import_run.mandates_updated, 1)
+        self.assertEqual(MandateImportFingerprint.objects.get(mandate=mandate).fingerprint, get_row_fingerprint(
+            build_row(2, build_record('00201968', '1122199', SCALE='502'))
+        ))
+
+    def test_report_disappeared_rows(self):
+        MandatesImporter(self.academic_year).import_rows([
+            build_row(2, build_record('00201968', '1122199')),
+            build_row(3, build_record('00201979', '1122200')),
+        ])
+        import_run = ImportRun()
+        report_disappeared_rows(self.academic_year, [build_row(2, build_record('00201968', '1122199'))], import_run)
+        self.assertEqual(
+            import_run.disappeared,
+            [('1122200', '00201979', self.new_person.last_name, self.new_person.first_name)]
+        )
+
+    def test_import_counts_persons_not_found(self):
+        import_run = MandatesImporter(self.academic_year).import_rows([build_row(2, build_record('99999999', '1'))])
+        self.assertEqual(import_run.persons_not_found, 1)
+        self.assertFalse(AssistantMandate.objects.filter(sap_id='1').exists())
+
+    def test_queries_count_does_not_depend_on_rows_count(self):
+        mandates = [
+            AssistantMandateFactory(
+                assistant__person__global_id=str(index).zfill(8), academic_year=self.academic_year, sap_id=str(index)
+            ) for index in range(1, 21)
+        ]
+        rows = [
+            build_row(index, build_record(mandate.assistant.person.global_id, mandate.sap_id))
+            for index, mandate in enumerate(mandates)
+        ]
+        with CaptureQueriesContext(connection) as few_rows_queries:
+            MandatesImporter(self.academic_year).import_rows(rows[:2])
+        with CaptureQueriesContext(connection) as many_rows_queries:
+            MandatesImporter(self.academic_year).import_rows(rows[2:])
+        self.assertEqual(len(few_rows_queries), len(many_rows_queries))
@@ -0,0 +1,87 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from assistant.business.mandates_pdf_data import MandatesPdfData
+from assistant.models.enums import review_status, reviewer_role, user_role
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.mandate_entity import MandateEntityFactory
+from assistant.tests.factories.review import ReviewFactory
+from assistant.tests.factories.reviewer import ReviewerFactory
+from assistant.tests.factories.tutoring_learning_unit_year import TutoringLearningUnitYearFactory
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.entity_version import EntityVersionFactory
+
+
+class TestMandatesPdfData(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        cls.academic_year = AcademicYearFactory(
+            start_date=today.replace(year=today.year - 1),
+            end_date=today.replace(year=today.year + 1),
+            year=today.year - 1,
+        )
+        cls.entity_version = EntityVersionFactory(start_date=cls.academic_year.start_date, end_date=None)
+        cls.reviewer = ReviewerFactory(role=reviewer_role.RESEARCH, entity=cls.entity_version.entity)
+        cls.mandates = [cls.create_mandate() for _ in range(4)]
+
+    @classmethod
+    def create_mandate(cls):
+        mandate = AssistantMandateFactory(academic_year=cls.academic_year)
+        MandateEntityFactory(assistant_mandate=mandate, entity=cls.entity_version.entity)
+        TutoringLearningUnitYearFactory(mandate=mandate)
+        ReviewFactory(mandate=mandate, reviewer=None, status=review_status.DONE)
+        ReviewFactory(mandate=mandate, reviewer=cls.reviewer, status=review_status.DONE)
+        return mandate
+
+    def count_queries(self, mandates, roles):
+        with CaptureQueriesContext(connection) as context:
+            MandatesPdfData(mandates, roles)
+        return len(context.captured_queries)
+
+    def test_queries_count_does_not_depend_on_mandates_count(self):
+        for roles in ([user_role.ADMINISTRATOR], [reviewer_role.SUPERVISION]):
+            self.assertEqual(
+                self.count_queries(self.mandates[:1], roles),
+                self.count_queries(self.mandates, roles)
+            )
+
+    def test_data_of_each_mandate(self):
+        data = MandatesPdfData(self.mandates, [user_role.ADMINISTRATOR])
+        for mandate in self.mandates:
+            self.assertEqual([entity.pk for entity in data.get_entities(mandate)], [self.entity_version.entity.pk])
+            self.assertEqual(len(data.get_tutoring_learning_units_year(mandate)), 1)
+            self.assertEqual(len(data.get_reviews(mandate)), 2)
+        self.assertEqual(data.get_reviewer_entity_acronym(self.reviewer), self.entity_version.acronym)
+
+    def test_no_reviews_for_assistant(self):
+        data = MandatesPdfData(self.mandates, [user_role.ASSISTANT])
+        self.assertEqual(data.get_reviews(self.mandates[0]), [])
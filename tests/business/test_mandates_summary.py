@@ -0,0 +1,119 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import tempfile
+from decimal import Decimal
+
+from django.test import TestCase
+from openpyxl import load_workbook
+
+from assistant.business import mandates_summary
+from assistant.models.enums import assistant_mandate_renewal, assistant_mandate_state, review_advice_choices
+from assistant.models.enums import reviewer_role
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.mandate_entity import MandateEntityFactory
+from assistant.tests.factories.review import ReviewFactory
+from assistant.tests.factories.reviewer import ReviewerFactory
+from assistant.views import mandate as mandate_view
+from base.models.enums import entity_type
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.entity_version import EntityVersionFactory
+
+
+class TestMandatesSummary(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        cls.academic_year = AcademicYearFactory(
+            start_date=today.replace(year=today.year - 1),
+            end_date=today.replace(year=today.year + 1),
+            year=today.year - 1,
+        )
+        cls.previous_academic_year = AcademicYearFactory(
+            start_date=today.replace(year=today.year - 2),
+            end_date=today.replace(year=today.year - 1),
+            year=today.year - 2,
+        )
+        cls.faculty = EntityVersionFactory(
+            entity_type=entity_type.FACULTY, start_date=cls.previous_academic_year.start_date, end_date=None
+        )
+        cls.vice_rector = ReviewerFactory(role=reviewer_role.VICE_RECTOR, entity=cls.faculty.entity)
+        cls.mandates = [
+            cls.create_mandate(assistant_mandate_state.DONE, assistant_mandate_renewal.NORMAL, 1),
+            cls.create_mandate(assistant_mandate_state.DONE, assistant_mandate_renewal.SPECIAL, 0.5),
+            cls.create_mandate(assistant_mandate_state.DECLINED, assistant_mandate_renewal.NORMAL, 0.25),
+        ]
+        ReviewFactory(mandate=cls.mandates[0], reviewer=cls.vice_rector, advice=review_advice_choices.FAVORABLE)
+        ReviewFactory(mandate=cls.mandates[1], reviewer=cls.vice_rector, advice=review_advice_choices.UNFAVOURABLE)
+        cls.previous_mandate = AssistantMandateFactory(academic_year=cls.previous_academic_year)
+        MandateEntityFactory(assistant_mandate=cls.previous_mandate, entity=cls.faculty.entity)
+
+    @classmethod
+    def create_mandate(cls, state, renewal_type, fulltime_equivalent):
+        mandate = AssistantMandateFactory(
+            academic_year=cls.academic_year, state=state, renewal_type=renewal_type,
+            fulltime_equivalent=fulltime_equivalent
+        )
+        MandateEntityFactory(assistant_mandate=mandate, entity=cls.faculty.entity)
+        return mandate
+
+    def test_faculties_summary(self):
+        summaries = mandates_summary.get_faculties_summary(self.academic_year)
+        self.assertEqual(len(summaries), 1)
+        summary = summaries[0]
+        self.assertEqual(summary['faculty'], self.faculty.acronym)
+        self.assertEqual(summary['mandates'], 3)
+        self.assertEqual(summary['state_' + assistant_mandate_state.DONE], 2)
+        self.assertEqual(summary['state_' + assistant_mandate_state.DECLINED], 1)
+        self.assertEqual(summary['renewal_' + assistant_mandate_renewal.NORMAL], 2)
+        self.assertEqual(summary['advice_' + review_advice_choices.FAVORABLE], 1)
+        self.assertEqual(summary['advice_' + review_advice_choices.UNFAVOURABLE], 1)
+        self.assertEqual(summary['advice_' + review_advice_choices.CONDITIONAL], 0)
+        self.assertEqual(summary['fulltime_equivalent'], Decimal('1.75'))
+
+    def test_faculties_summary_counts_mandate_linked_twice_once(self):
+        MandateEntityFactory(assistant_mandate=self.mandates[0], entity=self.faculty.entity)
+        summary = mandates_summary.get_faculties_summary(self.academic_year)[0]
+        self.assertEqual(summary['mandates'], 3)
+        self.assertEqual(summary['state_' + assistant_mandate_state.DONE], 2)
+        self.assertEqual(summary['advice_' + review_advice_choices.FAVORABLE], 1)
+        self.assertEqual(summary['fulltime_equivalent'], Decimal('1.75'))
+
+    def test_year_summary(self):
+        summary = mandates_summary.get_year_summary(self.previous_academic_year)
+        self.assertEqual(summary['mandates'], 1)
+        self.assertEqual(summary['fulltime_equivalent'], self.previous_mandate.fulltime_equivalent)
+
+    def test_years_workbook(self):
+        with tempfile.TemporaryFile() as file:
+            mandate_view.generate_years_xls(file, [self.previous_academic_year, self.academic_year])
+            file.seek(0)
+            workbook = load_workbook(file, read_only=True)
+            sheets = [list(worksheet.iter_rows()) for worksheet in workbook.worksheets]
+        self.assertEqual(len(sheets), 3)
+        self.assertEqual(len(sheets[0]), 1 + len(self.mandates) + 1)
+        self.assertEqual(sheets[0][1][0].value, str(self.previous_academic_year))
+        self.assertEqual([row[0].value for row in sheets[2][1:]], [self.faculty.acronym, 'Total'])
@@ -0,0 +1,103 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from assistant.business.mandates_validation import INVALID_COLUMNS_COUNT, INVALID_DATE, INVALID_FULLTIME_EQUIVALENT
+from assistant.business.mandates_validation import check_date_format, validate_rows, values_to_dict
+from assistant.models.enums import assistant_mandate_renewal
+from assistant.utils.import_xls_file_data import COLS_TITLES
+
+
+def build_values(**kwargs):
+    record = dict(
+        {title: None for title in COLS_TITLES},
+        SAP_ID='1122199', FULLTIME_EQUIVALENT='0.5', ENTRY_DATE='01/02/2015', END_DATE='03-10-2017',
+        ASSISTANT_TYPE_CODE='ST', RENEWAL_TYPE='NORMAL', FGS='201968'
+    )
+    record.update(kwargs)
+    return [record[title] for title in COLS_TITLES]
+
+
+class TestMandatesValidation(SimpleTestCase):
+    def test_validate_rows_collects_errors_of_every_line(self):
+        rows, errors = validate_rows([
+            (2, build_values()),
+            (3, build_values(END_DATE='2017/10/3')),
+            (4, build_values(FULLTIME_EQUIVALENT='full')),
+            (5, build_values(ENTRY_DATE='01.02.2015', FULLTIME_EQUIVALENT=None)),
+        ], COLS_TITLES)
+        self.assertEqual([row.line for row in rows], [2])
+        self.assertEqual(errors, [
+            (3, INVALID_DATE), (4, INVALID_FULLTIME_EQUIVALENT), (5, INVALID_DATE), (5, INVALID_FULLTIME_EQUIVALENT)
+        ])
+
+    def test_validate_rows_reports_ragged_lines(self):
+        rows, errors = validate_rows([
+            (2, build_values() + ['extra']),
+            (3, build_values()[:-1]),
+            (4, build_values()),
+        ], COLS_TITLES)
+        self.assertEqual([row.line for row in rows], [4])
+        self.assertEqual(errors, [(2, INVALID_COLUMNS_COUNT), (3, INVALID_COLUMNS_COUNT)])
+
+    def test_validate_rows_with_missing_values(self):
+        rows, errors = validate_rows([(2, build_values(ENTRY_DATE='', FULLTIME_EQUIVALENT=''))], COLS_TITLES)
+        self.assertEqual(rows, [])
+        self.assertEqual(errors, [(2, INVALID_DATE), (2, INVALID_FULLTIME_EQUIVALENT)])
+
+    def test_validate_rows_normalizes_records(self):
+        rows, errors = validate_rows([(2, build_values(ASSISTANT_TYPE_CODE=' as', RENEWAL_TYPE='Exceptionnel'))],
+                                     COLS_TITLES)
+        self.assertEqual(errors, [])
+        self.assertEqual(rows[0].record['FGS'], '00201968')
+        self.assertEqual(rows[0].record['ASSISTANT_TYPE_CODE'], 'AS')
+        self.assertEqual(rows[0].record['RENEWAL_TYPE'], assistant_mandate_renewal.EXCEPTIONAL)
+
+    def test_validate_rows_in_process_pool(self):
+        numbered_values = [(line, build_values(SAP_ID=str(line))) for line in range(2, 500)]
+        numbered_values.append((500, build_values(END_DATE='bad')))
+        rows, errors = validate_rows(numbered_values, COLS_TITLES, processes=2)
+        self.assertEqual(rows, validate_rows(numbered_values, COLS_TITLES)[0])
+        self.assertEqual(errors, [(500, INVALID_DATE)])
+
+    def test_values_to_dict_keeps_empty_cells_empty(self):
+        record = values_to_dict(build_values(FGS=None, FULLTIME_EQUIVALENT=1), COLS_TITLES)
+        self.assertEqual(record['FGS'], '')
+        self.assertEqual(record['FULLTIME_EQUIVALENT'], '1')
+        self.assertEqual(record['LAST_NAME'], '')
+
+    def test_check_date_format_with_unknown_separator(self):
+        self.assertFalse(check_date_format('01.02.2015'))
+
+
+class TestMandatesValidationInTransaction(TestCase):
+    def test_validate_rows_in_process_pool_keeps_connection_of_caller(self):
+        User.objects.create(username='importer')
+        numbered_values = [(line, build_values(SAP_ID=str(line))) for line in range(2, 10)]
+        rows, errors = validate_rows(numbered_values, COLS_TITLES, processes=2)
+        self.assertEqual(len(rows), 8)
+        self.assertTrue(User.objects.filter(username='importer').exists())
@@ -0,0 +1,133 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from assistant.business import outbox
+from assistant.models.enums import message_type, notification_event, outbox_state
+from assistant.models.message import Message
+from assistant.models.outbox_item import OutboxItem, annotate_progress, enqueue_campaign, enqueue_notification
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.manager import ManagerFactory
+from assistant.tests.factories.settings import SettingsFactory
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.person import PersonFactory
+
+
+@patch("osis_common.messaging.send_message.send_messages", return_value=None)
+class TestOutbox(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SettingsFactory()
+        cls.message = Message.objects.create(
+            sender=ManagerFactory(), type=message_type.TO_ALL_DEANS, academic_year=AcademicYearFactory()
+        )
+        cls.persons = [PersonFactory(), PersonFactory()]
+
+    def setUp(self):
+        enqueue_campaign(
+            self.message,
+            [(person, 'assistant_deans_startup__html', 'assistant_deans_startup_txt') for person in self.persons]
+        )
+
+    def test_pending_items_are_sent_once(self, mock_send_messages):
+        self.assertEqual(outbox.deliver_pending_items(rate_limit=0), 2)
+        self.assertEqual(OutboxItem.objects.filter(state=outbox_state.SENT).count(), 2)
+        self.assertEqual(outbox.deliver_pending_items(rate_limit=0), 0)
+        self.assertEqual(mock_send_messages.call_count, 2)
+
+    def test_resumed_campaign_skips_sent_items(self, mock_send_messages):
+        OutboxItem.objects.filter(person=self.persons[0]).update(state=outbox_state.SENT)
+        self.assertEqual(outbox.process_outbox(rate_limit=0), 1)
+        receivers = mock_send_messages.call_args[0][0].get('receivers')
+        self.assertEqual([receiver['receiver_id'] for receiver in receivers], [self.persons[1].id])
+
+    def test_failed_items_are_retried_later(self, mock_send_messages):
+        mock_send_messages.side_effect = Exception('SMTP unavailable')
+        self.assertEqual(outbox.deliver_pending_items(rate_limit=0), 0)
+        for item in OutboxItem.objects.all():
+            self.assertEqual((item.state, item.attempts, item.error), (outbox_state.PENDING, 1, 'SMTP unavailable'))
+            self.assertGreater(item.next_attempt, timezone.now())
+        self.assertEqual(outbox.deliver_pending_items(rate_limit=0), 0)
+        self.assertEqual(mock_send_messages.call_count, 2)
+
+    def test_items_fail_after_max_attempts(self, mock_send_messages):
+        mock_send_messages.return_value = 'receivers_error'
+        OutboxItem.objects.update(attempts=outbox.OUTBOX_MAX_ATTEMPTS - 1)
+        outbox.deliver_pending_items(rate_limit=0)
+        self.assertEqual(OutboxItem.objects.filter(state=outbox_state.FAILED).count(), 2)
+
+    def test_progress_of_campaign(self, mock_send_messages):
+        OutboxItem.objects.filter(person=self.persons[0]).update(state=outbox_state.SENT)
+        OutboxItem.objects.filter(person=self.persons[1]).update(state=outbox_state.FAILED, error='error')
+        message = annotate_progress(Message.objects.filter(pk=self.message.pk)).get()
+        self.assertEqual((message.items_total, message.items_sent, message.items_failed), (2, 1, 1))
+        self.assertEqual([item.person for item in message.failed_items], [self.persons[1]])
+
+    def test_notification_is_stored_once_per_mandate_and_person(self, mock_send_messages):
+        mandate = AssistantMandateFactory()
+        for _ in range(2):
+            enqueue_notification(
+                notification_event.MANDATE_TO_PHD_SUPERVISOR, self.persons[0], 'assistant_phd_supervisor_html',
+                'assistant_phd_supervisor_txt', mandate=mandate, assistant=mandate.assistant
+            )
+        enqueue_notification(
+            notification_event.MANDATE_TO_PHD_SUPERVISOR, self.persons[0], 'assistant_phd_supervisor_html',
+            'assistant_phd_supervisor_txt', mandate=AssistantMandateFactory(), assistant=mandate.assistant
+        )
+        self.assertEqual(OutboxItem.objects.filter(event=notification_event.MANDATE_TO_PHD_SUPERVISOR).count(), 2)
+
+    def test_notification_is_stored_again_when_mandate_is_submitted_again(self, mock_send_messages):
+        OutboxItem.objects.all().delete()
+        mandate = AssistantMandateFactory()
+        for _ in range(2):
+            enqueue_notification(
+                notification_event.MANDATE_TO_PHD_SUPERVISOR, self.persons[0], 'assistant_phd_supervisor_html',
+                'assistant_phd_supervisor_txt', mandate=mandate, assistant=mandate.assistant
+            )
+            self.assertEqual(outbox.deliver_pending_items(rate_limit=0), 1)
+        self.assertEqual(OutboxItem.objects.filter(mandate=mandate, state=outbox_state.SENT).count(), 2)
+
+    def test_notification_without_mandate_is_stored_each_time(self, mock_send_messages):
+        for _ in range(2):
+            enqueue_notification(
+                notification_event.REVIEWER_DELEGATION, self.persons[0], 'assistant_reviewers_startup_html',
+                'assistant_reviewers_startup_txt'
+            )
+        self.assertEqual(OutboxItem.objects.filter(event=notification_event.REVIEWER_DELEGATION).count(), 2)
+
+    def test_notification_is_sent_with_assistant(self, mock_send_messages):
+        OutboxItem.objects.all().delete()
+        mandate = AssistantMandateFactory()
+        enqueue_notification(
+            notification_event.MANDATE_DECLINED, self.persons[0], 'assistant_dean_assistant_decline_html',
+            'assistant_dean_assistant_decline_txt', mandate=mandate, assistant=mandate.assistant
+        )
+        self.assertEqual(outbox.deliver_pending_items(rate_limit=0), 1)
+        template_data = mock_send_messages.call_args[0][0].get('template_base_data')
+        self.assertEqual(template_data['assistant'], mandate.assistant.person)
@@ -0,0 +1,102 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+import io
+import zipfile
+
+from django.test import TestCase
+from django.utils import timezone
+
+from assistant.business import pdf_export_jobs
+from assistant.models import pdf_export_job
+from assistant.models.enums import assistant_mandate_state, job_state, pdf_export_type
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.manager import ManagerFactory
+from base.tests.factories.academic_year import AcademicYearFactory
+
+
+class TestPdfExportJobs(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = ManagerFactory()
+        today = datetime.date.today()
+        cls.academic_year = AcademicYearFactory(
+            start_date=today.replace(year=today.year - 1),
+            end_date=today.replace(year=today.year + 1),
+            year=today.year - 1,
+        )
+        cls.mandates = [AssistantMandateFactory(academic_year=cls.academic_year) for _ in range(2)]
+        cls.declined_mandate = AssistantMandateFactory(
+            academic_year=cls.academic_year, state=assistant_mandate_state.DECLINED
+        )
+
+    def enqueue(self, export_type):
+        return pdf_export_job.enqueue(export_type, self.academic_year, self.manager.person, 'fr-be')
+
+    def test_claim_next_job_takes_oldest_pending_job(self):
+        first_job = self.enqueue(pdf_export_type.MANDATES)
+        self.enqueue(pdf_export_type.DECLINED_MANDATES)
+        job = pdf_export_jobs.claim_next_job()
+        self.assertEqual(job, first_job)
+        self.assertEqual(job.state, job_state.RUNNING)
+
+    def test_run_job_stores_pdf_file(self):
+        for export_type in (pdf_export_type.MANDATES, pdf_export_type.DECLINED_MANDATES):
+            job = pdf_export_jobs.run_job(self.enqueue(export_type))
+            job.refresh_from_db()
+            self.assertEqual(job.state, job_state.DONE)
+            self.assertTrue(job.is_downloadable)
+            self.assertTrue(job.file_name.endswith('.pdf'))
+            self.assertGreater(job.expires, timezone.now())
+            with job.file.open('rb') as file:
+                self.assertTrue(file.read().startswith(b'%PDF'))
+
+    def test_run_job_stores_timings_of_rendered_documents(self):
+        job = pdf_export_jobs.run_job(self.enqueue(pdf_export_type.MANDATES))
+        job.refresh_from_db()
+        self.assertEqual(job.result['timings']['documents'], len(self.mandates))
+        self.assertIn('layout', job.result['timings']['sections'])
+
+    def test_run_job_stores_zip_of_mandates_to_sap(self):
+        job = pdf_export_jobs.run_job(self.enqueue(pdf_export_type.MANDATES_TO_SAP))
+        job.refresh_from_db()
+        self.assertEqual((job.items_processed, job.items_total), (2, 2))
+        with job.file.open('rb') as file:
+            archive = zipfile.ZipFile(io.BytesIO(file.read()))
+        self.assertCountEqual(
+            archive.namelist(),
+            ['%s_%s_%s.pdf' % (mandate.sap_id, mandate.academic_year, mandate.assistant.person.last_name)
+             for mandate in self.mandates]
+        )
+
+    def test_delete_expired_files(self):
+        job = pdf_export_jobs.run_job(self.enqueue(pdf_export_type.DECLINED_MANDATES))
+        pdf_export_job.PdfExportJob.objects.filter(pk=job.pk).update(expires=timezone.now())
+        self.assertEqual(pdf_export_jobs.delete_expired_files(), 1)
+        job.refresh_from_db()
+        self.assertFalse(job.file)
+        self.assertTrue(job.is_expired)
+        self.assertFalse(job.is_downloadable)
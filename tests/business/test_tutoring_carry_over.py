@@ -0,0 +1,76 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+from django.test import TestCase
+
+from assistant.business.tutoring_carry_over import carry_over_tutoring_learning_units
+from assistant.business.tutoring_carry_over import carry_over_tutoring_learning_units_for_academic_year
+from assistant.models.tutoring_learning_unit_year import TutoringLearningUnitYear
+from assistant.tests.factories.academic_assistant import AcademicAssistantFactory
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.tutoring_learning_unit_year import TutoringLearningUnitYearFactory
+from base.tests.factories.academic_year import AcademicYearFactory
+
+
+class TestTutoringCarryOver(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.academic_year = AcademicYearFactory(year=2019)
+        cls.previous_academic_year = AcademicYearFactory(year=2018)
+        cls.older_academic_year = AcademicYearFactory(year=2017)
+        cls.assistant = AcademicAssistantFactory()
+        cls.older_mandate = AssistantMandateFactory(assistant=cls.assistant, academic_year=cls.older_academic_year)
+        cls.previous_mandate = AssistantMandateFactory(
+            assistant=cls.assistant, academic_year=cls.previous_academic_year
+        )
+        TutoringLearningUnitYearFactory(mandate=cls.older_mandate)
+        cls.tutoring = [TutoringLearningUnitYearFactory(mandate=cls.previous_mandate) for _ in range(2)]
+
+    def test_copies_tutoring_of_most_recent_previous_mandate(self):
+        mandate = AssistantMandateFactory(assistant=self.assistant, academic_year=self.academic_year)
+        self.assertEqual(carry_over_tutoring_learning_units([mandate]), 2)
+        self.assertCountEqual(
+            TutoringLearningUnitYear.objects.filter(mandate=mandate).values_list(
+                'learning_unit_year', 'sessions_number', 'others_delivery'
+            ),
+            [(tutoring.learning_unit_year_id, tutoring.sessions_number, tutoring.others_delivery)
+             for tutoring in self.tutoring]
+        )
+
+    def test_carry_over_can_be_run_again(self):
+        mandate = AssistantMandateFactory(assistant=self.assistant, academic_year=self.academic_year)
+        carry_over_tutoring_learning_units_for_academic_year(self.academic_year)
+        self.assertEqual(carry_over_tutoring_learning_units_for_academic_year(self.academic_year), 0)
+        self.assertEqual(TutoringLearningUnitYear.objects.filter(mandate=mandate).count(), 2)
+
+    def test_queries_count_does_not_depend_on_mandates_count(self):
+        mandates = []
+        for _ in range(5):
+            assistant = AcademicAssistantFactory()
+            previous_mandate = AssistantMandateFactory(assistant=assistant, academic_year=self.previous_academic_year)
+            TutoringLearningUnitYearFactory(mandate=previous_mandate)
+            mandates.append(AssistantMandateFactory(assistant=assistant, academic_year=self.academic_year))
+        with self.assertNumQueries(5):
+            self.assertEqual(carry_over_tutoring_learning_units(mandates), 5)
@@ -25,11 +25,15 @@
 ##############################################################################
 import datetime
 import functools
+import io
 import operator
+import pickle
+import zipfile
 
 from django.test import TestCase
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
+from PyPDF2 import PdfFileReader
 from reportlab.lib.enums import TA_LEFT
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
@@ -37,7 +41,8 @@ from reportlab.platypus import Paragraph
 
 from assistant.models import tutoring_learning_unit_year
 from assistant.models.enums import assistant_mandate_state, assistant_phd_inscription, assistant_type, \
-    assistant_mandate_renewal, review_status, reviewer_role
+    assistant_mandate_renewal, pdf_export_type, review_status, reviewer_role, user_role
+from assistant.models.pdf_export_job import PdfExportJob
 from assistant.tests.factories.academic_assistant import AcademicAssistantFactory
 from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
 from assistant.tests.factories.manager import ManagerFactory
@@ -47,6 +52,7 @@ from assistant.tests.factories.reviewer import ReviewerFactory
 from assistant.tests.factories.settings import SettingsFactory
 from assistant.tests.factories.tutoring_learning_unit_year import TutoringLearningUnitYearFactory
 from assistant.utils import export_utils_pdf
+from base.models import academic_year as academic_year_mdl
 from base.models.entity import find_versions_from_entites
 from base.models.enums import entity_type
 from base.tests.factories.academic_year import AcademicYearFactory
@@ -165,25 +171,135 @@ class ExportPdfTestCase(TestCase):
         response = self.client.post('/assistants/assistant/export_pdf/', {'mandate_id': self.mandate.id})
         self.assertEqual(HTTP_OK, response.status_code)
 
+    def assertRedirectsToExportJob(self, response, person, export_type):
+        job = PdfExportJob.objects.get(created_by=person, export_type=export_type)
+        self.assertRedirects(response, reverse('pdf_export_job', args=[job.id]), fetch_redirect_response=False)
+
     def test_export_mandates(self):
         self.client.force_login(self.manager.person.user)
         response = self.client.post('/assistants/manager/mandates/export_pdf/')
-        self.assertEqual(HTTP_OK, response.status_code)
+        self.assertRedirectsToExportJob(response, self.manager.person, pdf_export_type.MANDATES)
 
     def test_export_mandates_to_sap(self):
         self.client.force_login(self.manager.person.user)
         response = self.client.post('/assistants/manager/mandates/export_mandates_to_sap/')
-        self.assertEqual(HTTP_OK, response.status_code)
+        self.assertRedirectsToExportJob(response, self.manager.person, pdf_export_type.MANDATES_TO_SAP)
+
+    def test_stream_mandates_zip_of_each_mandate(self):
+        mandates = export_utils_pdf.find_mandates_to_sap(academic_year_mdl.starting_academic_year())
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(
+            export_utils_pdf.stream_mandates_zip(self.manager.person.user, mandates)
+        )))
+        self.assertIsNone(archive.testzip())
+        self.assertCountEqual(
+            archive.namelist(),
+            ['%s_%s_%s.pdf' % (mandate.sap_id, mandate.academic_year, mandate.assistant.person.last_name)
+             for mandate in mandates]
+        )
+
+    def test_renderer_resolves_roles_of_user(self):
+        self.assertEqual(export_utils_pdf.MandatesPdfRenderer(self.manager.person.user).roles,
+                         [user_role.ADMINISTRATOR])
+        self.assertEqual(export_utils_pdf.MandatesPdfRenderer(self.assistant.person.user).roles, [user_role.ASSISTANT])
+        self.assertEqual(export_utils_pdf.MandatesPdfRenderer(self.reviewer2.person.user).roles, [self.reviewer2.role])
+
+    def test_renderer_returns_pdf_bytes(self):
+        renderer = export_utils_pdf.MandatesPdfRenderer(self.manager.person.user)
+        self.assertTrue(renderer.render_mandates([self.mandate]).startswith(b'%PDF'))
+        self.assertTrue(
+            renderer.render_declined_mandates([self.mandate2], self.current_academic_year).startswith(b'%PDF')
+        )
+
+    def test_renderer_renders_each_mandate_in_order_with_a_pool(self):
+        renderer = export_utils_pdf.MandatesPdfRenderer(self.manager.person.user)
+        mandates = [self.mandate, self.mandate2, self.mandate]
+        rendered = list(renderer.render_each(mandates, processes=2))
+        self.assertEqual([mandate for mandate, pdf in rendered], mandates)
+        for mandate, pdf in rendered:
+            self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_get_mandate_blocks_are_picklable(self):
+        blocks = export_utils_pdf.get_mandate_blocks(self.mandate, [user_role.ADMINISTRATOR])
+        self.assertEqual(pickle.loads(pickle.dumps(blocks)), blocks)
+        pdf, stats = export_utils_pdf.render_blocks(('en', blocks, False))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertIsNone(stats)
+
+    def test_renderer_times_sections_of_each_document(self):
+        timings = export_utils_pdf.PdfTimings()
+        renderer = export_utils_pdf.MandatesPdfRenderer(self.manager.person.user, cached_states=[], timings=timings)
+        with self.assertLogs(export_utils_pdf.logger, level='INFO') as logs:
+            list(renderer.render_each([self.mandate, self.mandate2]))
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(logs.records[0].pdf_export_timings['mandate'], self.mandate.pk)
+        summary = timings.to_dict()
+        self.assertEqual(summary['documents'], 2)
+        self.assertGreaterEqual(summary['pages'], 2)
+        self.assertCountEqual(
+            summary['sections'].keys(), ['load', 'content', 'paragraphs', 'time_repartition', 'layout']
+        )
+        self.assertGreater(summary['sections']['load']['queries'], 0)
+
+    def test_renderer_concatenates_documents_with_bookmarks(self):
+        renderer = export_utils_pdf.MandatesPdfRenderer(self.manager.person.user)
+        reader = PdfFileReader(io.BytesIO(renderer.render_concatenated([self.mandate, self.mandate2])))
+        titles = []
+        outlines = reader.getOutlines()
+        while outlines:
+            item = outlines.pop(0)
+            if isinstance(item, list):
+                outlines = item + outlines
+            else:
+                titles.append(item.title)
+        self.assertIn(str(self.mandate.assistant.person), titles)
+        self.assertIn(str(self.mandate2.assistant.person), titles)
+        self.assertGreaterEqual(
+            reader.getNumPages(),
+            sum(PdfFileReader(io.BytesIO(renderer.render_mandates([mandate]))).getNumPages()
+                for mandate in (self.mandate, self.mandate2))
+        )
 
     def test_export_declined_mandates(self):
         self.client.force_login(self.manager.person.user)
         response = self.client.post('/assistants/manager/mandates/export_declined_pdf/')
-        self.assertEqual(HTTP_OK, response.status_code)
+        self.assertRedirectsToExportJob(response, self.manager.person, pdf_export_type.DECLINED_MANDATES)
 
     def test_export_mandates_for_entity(self):
         self.client.force_login(self.reviewer2.person.user)
         response = self.client.get(reverse("export_mandates_for_entity_pdf", args=[self.mandate.academic_year.year]))
-        self.assertEqual(HTTP_OK, response.status_code)
+        self.assertRedirectsToExportJob(response, self.reviewer2.person, pdf_export_type.MANDATES_FOR_ENTITY)
+
+    def test_export_mandates_for_entity_stores_filters(self):
+        self.client.force_login(self.reviewer2.person.user)
+        response = self.client.get(
+            reverse("export_mandates_for_entity_pdf", args=[self.mandate.academic_year.year]),
+            {'state': [self.mandate.state], 'entity': self.entity_version.entity.id, 'mandate': [self.mandate.id]}
+        )
+        self.assertRedirectsToExportJob(response, self.reviewer2.person, pdf_export_type.MANDATES_FOR_ENTITY)
+        self.assertEqual(
+            PdfExportJob.objects.get(created_by=self.reviewer2.person).filters,
+            {'states': [self.mandate.state], 'entity': self.entity_version.entity.id, 'mandates': [self.mandate.id]}
+        )
+
+    def test_export_mandates_for_entity_without_matching_mandate(self):
+        self.client.force_login(self.reviewer2.person.user)
+        response = self.client.get(
+            reverse("export_mandates_for_entity_pdf", args=[self.mandate.academic_year.year]),
+            {'assistant_type': [assistant_type.TEACHING_ASSISTANT]}
+        )
+        self.assertRedirects(response, reverse('reviewer_mandates_list'), fetch_redirect_response=False)
+        self.assertFalse(PdfExportJob.objects.filter(created_by=self.reviewer2.person).exists())
+
+    def test_find_mandates_for_reviewer_with_filters(self):
+        person = self.reviewer2.person
+        year = self.mandate.academic_year
+        self.assertEqual(list(export_utils_pdf.find_mandates_for_reviewer(person, year, {})), [self.mandate])
+        for filters in ({'states': [self.mandate.state]}, {'assistant_types': [assistant_type.ASSISTANT]},
+                        {'entity': self.entity_version.entity.id}, {'mandates': [self.mandate.id]}):
+            self.assertEqual(list(export_utils_pdf.find_mandates_for_reviewer(person, year, filters)), [self.mandate])
+        for filters in ({'assistant_types': [assistant_type.TEACHING_ASSISTANT]},
+                        {'entity': EntityVersionFactory().entity.id}, {'mandates': [self.mandate2.id]}):
+            self.assertFalse(export_utils_pdf.find_mandates_for_reviewer(person, year, filters).exists())
 
     def test_export_mandates_for_entity_with_no_entity(self):
         self.client.force_login(self.reviewer3.person.user)
@@ -361,25 +477,29 @@ class ExportPdfTestCase(TestCase):
             data.append(Paragraph("%s" % _(title), style))
         self.assertEqual(str([data]), str(export_utils_pdf.generate_headers(titles, style)))
 
-    def test_get_tutoring_learning_unit_year(self):
+    def test_mandate_blocks_show_tutoring_learning_units_year(self):
         style = self.styles['Tiny']
-        data = export_utils_pdf.generate_headers([
+        rows = [["%s" % _(title) for title in [
             'Course units', 'Academic year', 'Number of sessions planned for this course', 'Duration of a session (h)',
             'Number of series', 'Number of face-to-face hours', 'Number of students per series',
             'Preparation, coordination and evaluation (h)', 'Other types of services associated with this course'
-        ], style)
+        ]]]
         tutoring_learning_units_year = tutoring_learning_unit_year.find_by_mandate(self.mandate)
         for this_tutoring_learning_unit_year in tutoring_learning_units_year:
             academic_year = str(this_tutoring_learning_unit_year.learning_unit_year.academic_year)
-            data.append([Paragraph(this_tutoring_learning_unit_year.learning_unit_year.complete_title + " (" +
-                                   this_tutoring_learning_unit_year.learning_unit_year.acronym + ")", style),
-                         Paragraph(academic_year, style),
-                         Paragraph(str(this_tutoring_learning_unit_year.sessions_number), style),
-                         Paragraph(str(this_tutoring_learning_unit_year.sessions_duration), style),
-                         Paragraph(str(this_tutoring_learning_unit_year.series_number), style),
-                         Paragraph(str(this_tutoring_learning_unit_year.face_to_face_duration), style),
-                         Paragraph(str(this_tutoring_learning_unit_year.attendees), style),
-                         Paragraph(str(this_tutoring_learning_unit_year.exams_supervision_duration), style),
-                         Paragraph(this_tutoring_learning_unit_year.others_delivery or '', style)
+            rows.append([this_tutoring_learning_unit_year.learning_unit_year.complete_title + " (" +
+                         this_tutoring_learning_unit_year.learning_unit_year.acronym + ")",
+                         academic_year,
+                         str(this_tutoring_learning_unit_year.sessions_number),
+                         str(this_tutoring_learning_unit_year.sessions_duration),
+                         str(this_tutoring_learning_unit_year.series_number),
+                         str(this_tutoring_learning_unit_year.face_to_face_duration),
+                         str(this_tutoring_learning_unit_year.attendees),
+                         str(this_tutoring_learning_unit_year.exams_supervision_duration),
+                         this_tutoring_learning_unit_year.others_delivery or ''
                          ])
-        self.assertEqual(str(data), str(export_utils_pdf.get_tutoring_learning_unit_year(self.mandate, style)))
+        blocks = export_utils_pdf.get_mandate_blocks(self.mandate, [user_role.ADMINISTRATOR])
+        table_block = next(block for block in blocks if block[0] == export_utils_pdf.TABLE_BLOCK)
+        self.assertEqual(table_block[1], rows)
+        table = export_utils_pdf.build_blocks([table_block], self.styles)[0]
+        self.assertEqual(str(table._cellvalues), str([[Paragraph(cell, style) for cell in row] for row in rows]))
@@ -28,26 +28,19 @@ import datetime
 from django.core.files import File
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase
-from django.utils import timezone
+from django.urls import reverse
 
-from assistant.models.mandate_entity import find_by_mandate_and_entity
-from assistant.models.tutoring_learning_unit_year import find_by_mandate
+from assistant.models.enums import job_state
+from assistant.models.mandate_import_job import MandateImportJob
 from assistant.tests.factories.academic_assistant import AcademicAssistantFactory
 from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
 from assistant.tests.factories.manager import ManagerFactory
-from assistant.tests.factories.tutoring_learning_unit_year import TutoringLearningUnitYearFactory
-from assistant.utils import import_xls_file_data
-from assistant.utils.import_xls_file_data import COLS_TITLES
+from assistant.utils.import_xls_file_data import COLS_TITLES, CSV_FORMAT, TSV_FORMAT, XLSX_FORMAT
 from assistant.utils.import_xls_file_data import check_date_format
 from assistant.utils.import_xls_file_data import check_file_format
-from assistant.utils.import_xls_file_data import create_academic_assistant_if_not_exists
-from assistant.utils.import_xls_file_data import create_assistant_mandate_if_not_exists
-from assistant.utils.import_xls_file_data import link_mandate_to_entity
+from assistant.utils.import_xls_file_data import detect_file_format
+from assistant.utils.import_xls_file_data import iter_csv_rows
 from assistant.utils.import_xls_file_data import read_xls_mandates
-from assistant.utils.import_xls_file_data import retrieve_learning_units_year_from_previous_mandate
-from assistant.utils.import_xls_file_data import search_entity_by_acronym_and_type
-from base.models import academic_year
-from base.models import entity
 from base.models.enums import entity_type
 from base.tests.factories.academic_year import AcademicYearFactory
 from base.tests.factories.entity_version import EntityVersionFactory
@@ -64,9 +57,7 @@ class ExportImportXlsFile(TestCase):
         cls.request._messages = FakeMessages()
         cls.manager = ManagerFactory()
         cls.request.user = cls.manager.person.user
-        now = timezone.now()
         AcademicYearFactory.produce_in_past()
-        cls.previous_academic_year = academic_year.find_academic_year_by_year(now.year - 2)
         cls.person1 = PersonFactory(global_id='00201968')
         cls.assistant1 = AcademicAssistantFactory(person=cls.person1)
         cls.record1 = {
@@ -78,24 +69,6 @@ class ExportImportXlsFile(TestCase):
             'OTHER_STATUS': None, 'EMAIL': None, 'FGS': '00201968'
         }
         cls.person2 = PersonFactory(global_id='00201979')
-        cls.assistant2 = AcademicAssistantFactory()
-        cls.record2 = {
-            'SECTOR': 'SST', 'LOGISTICS_ENTITY': 'None', 'FACULTY': 'SC', 'SCHOOL': 'CHIM', 'INSTITUTE': 'IMCN',
-            'POLE': 'MOST', 'SAP_ID': '1122199', 'GLOBAL_ID': '1122199', 'LAST_NAME': cls.person2.last_name,
-            'FIRST_NAME': cls.person2.first_name, 'FULLTIME_EQUIVALENT': '1', 'ENTRY_DATE': '01/02/2015',
-            'END_DATE': '03-10-2017', 'ASSISTANT_TYPE_CODE': 'AS', 'SCALE': '021', 'CONTRACT_DURATION': '4',
-            'CONTRACT_DURATION_FTE': '4', 'RENEWAL_TYPE': 'exceptional', 'ABSENCES': None, 'COMMENT': None,
-            'OTHER_STATUS': None, 'EMAIL': None, 'FGS': '00201979'
-        }
-        cls.assistant3 = AcademicAssistantFactory()
-        cls.record3 = {
-            'SECTOR': 'SST', 'LOGISTICS_ENTITY': 'None', 'FACULTY': 'SC', 'SCHOOL': 'CHIM', 'INSTITUTE': 'IMCN',
-            'POLE': 'MOST', 'SAP_ID': '1122599', 'GLOBAL_ID': '1322199', 'LAST_NAME': 'last_name',
-            'FIRST_NAME': 'first_name', 'FULLTIME_EQUIVALENT': '1', 'ENTRY_DATE': '01/02/2015',
-            'END_DATE': '03-10-2017', 'ASSISTANT_TYPE_CODE': 'AS', 'SCALE': '021', 'CONTRACT_DURATION': '4',
-            'CONTRACT_DURATION_FTE': '4', 'RENEWAL_TYPE': 'SPECIAL', 'ABSENCES': None, 'COMMENT': None,
-            'OTHER_STATUS': None, 'EMAIL': None, 'FGS': None
-        }
         cls.entity_version1 = EntityVersionFactory(entity_type=entity_type.SECTOR,
                                                    acronym='SST',
                                                    title='Secteur des Sciences et Technologies',
@@ -113,30 +86,67 @@ class ExportImportXlsFile(TestCase):
     def test_upload_mandates_file(self):
         file = File(open('assistant/tests/resources/assistants_ok.xlsx', 'rb'))
         response = self.client.post('/assistants/manager/mandates/upload/', {'file': file})
-        self.assertEqual(response.status_code, HTTP_OK)
+        job = MandateImportJob.objects.get()
+        self.assertEqual(job.state, job_state.PENDING)
+        self.assertRedirects(response, '{}?job={}'.format(reverse('load_mandates'), job.id))
         file2 = File(open('assistant/tests/resources/bad_file_format.txt', 'rb'))
         response2 = self.client.post('/assistants/manager/mandates/upload/', {'file': file2})
         self.assertEqual(response2.status_code, HTTP_OK)
 
+    def test_import_job_status(self):
+        file = File(open('assistant/tests/resources/assistants_ok.xlsx', 'rb'))
+        self.client.post('/assistants/manager/mandates/upload/', {'file': file})
+        job = MandateImportJob.objects.get()
+        response = self.client.get(reverse('mandates_import_job_status', kwargs={'job_id': job.id}))
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertEqual(response.json()['state'], job_state.PENDING)
+
     def test_read_xls_mandates(self):
         file = File(open('assistant/tests/resources/assistants_bad_date.xlsx', 'rb'))
         uploaded_file = SimpleUploadedFile(
             'new_excel.xlsx', file.read(),
             content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        self.assertFalse(read_xls_mandates(self.request, uploaded_file))
+        self.assertTrue(read_xls_mandates(self.request, uploaded_file).has_errors)
         file2 = File(open('assistant/tests/resources/assistants_ok.xlsx', 'rb'))
         uploaded_file2 = SimpleUploadedFile(
             'new_excel.xlsx', file2.read(),
             content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        self.assertTrue(read_xls_mandates(self.request, uploaded_file2))
+        self.assertFalse(read_xls_mandates(self.request, uploaded_file2).has_errors)
         file3 = File(open('assistant/tests/resources/assistants_bad_column.xlsx', 'rb'))
         uploaded_file3 = SimpleUploadedFile(
             'new_excel.xlsx', file3.read(),
             content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        self.assertFalse(read_xls_mandates(self.request, uploaded_file3))
+        self.assertTrue(read_xls_mandates(self.request, uploaded_file3).has_errors)
+
+    def test_read_csv_mandates(self):
+        lines = [';'.join(COLS_TITLES)]
+        lines.append(';'.join(self.record1[title] or '' for title in COLS_TITLES))
+        uploaded_file = SimpleUploadedFile('mandates.csv', '\n'.join(lines).encode('utf-8'), content_type='text/csv')
+        import_run = read_xls_mandates(self.request, uploaded_file)
+        self.assertFalse(import_run.has_errors)
+        self.assertEqual(import_run.assistants_updated, 1)
+
+    def test_read_tsv_mandates_with_bad_date(self):
+        record = dict(self.record1, END_DATE='2017/10/3')
+        lines = ['\t'.join(COLS_TITLES), '\t'.join(record[title] or '' for title in COLS_TITLES)]
+        uploaded_file = SimpleUploadedFile('mandates.tsv', '\n'.join(lines).encode('utf-8'), content_type='text/plain')
+        import_run = read_xls_mandates(self.request, uploaded_file)
+        self.assertEqual(import_run.errors[0][0], 2)
+
+    def test_iter_csv_rows(self):
+        content = 'SECTOR,FACULTY\nSST,\n'.encode('utf-8')
+        rows = list(iter_csv_rows(SimpleUploadedFile('mandates', content)))
+        self.assertEqual(rows, [['SECTOR', 'FACULTY'], ['SST', None]])
+
+    def test_detect_file_format(self):
+        with open('assistant/tests/resources/assistants_ok.xlsx', 'rb') as file:
+            self.assertEqual(detect_file_format(SimpleUploadedFile('upload', file.read())), XLSX_FORMAT)
+        self.assertEqual(detect_file_format(SimpleUploadedFile('mandates.csv', b'SECTOR')), CSV_FORMAT)
+        self.assertEqual(detect_file_format(SimpleUploadedFile('mandates.tsv', b'SECTOR')), TSV_FORMAT)
+        self.assertEqual(detect_file_format(SimpleUploadedFile('upload', b'SECTOR')), CSV_FORMAT)
 
     def test_dates_format_(self):
         self.assertFalse(check_date_format('12/2015/92'))
@@ -155,88 +165,27 @@ class ExportImportXlsFile(TestCase):
         cols[1] = 'ANOTHER_BAD_TITLE'
         self.assertFalse(check_file_format(self.request, cols))
 
-    def test_create_academic_assistant_if_not_exists(self):
-        nbr_assistant_updated = import_xls_file_data.ASSISTANTS_UPDATED
-        nbr_assistant_imported = import_xls_file_data.ASSISTANTS_IMPORTED
-        nbr_persons_not_found = import_xls_file_data.PERSONS_NOT_FOUND
-        create_academic_assistant_if_not_exists(self.record1)
-        self.assertEqual(import_xls_file_data.ASSISTANTS_IMPORTED, nbr_assistant_imported)
-        self.assertEqual(nbr_assistant_updated + 1, import_xls_file_data.ASSISTANTS_UPDATED)
-        self.assertEqual(nbr_persons_not_found, import_xls_file_data.PERSONS_NOT_FOUND)
-        create_academic_assistant_if_not_exists(self.record2)
-        self.assertEqual(import_xls_file_data.ASSISTANTS_IMPORTED, nbr_assistant_imported + 1)
-        self.assertEqual(nbr_assistant_updated + 1, import_xls_file_data.ASSISTANTS_UPDATED)
-        self.assertEqual(nbr_persons_not_found, import_xls_file_data.PERSONS_NOT_FOUND)
-        create_academic_assistant_if_not_exists(self.record3)
-        self.assertEqual(import_xls_file_data.ASSISTANTS_IMPORTED, nbr_assistant_imported + 1)
-        self.assertEqual(nbr_assistant_updated + 1, import_xls_file_data.ASSISTANTS_UPDATED)
-        self.assertEqual(nbr_persons_not_found + 1, import_xls_file_data.PERSONS_NOT_FOUND)
-
-    def test_create_assistant_mandate_if_not_exists(self):
-        nbr_mandates_imported = import_xls_file_data.MANDATES_IMPORTED
-        nbr_mandates_updated = import_xls_file_data.MANDATES_UPDATED
-        create_assistant_mandate_if_not_exists(
-            self.record1, self.assistant1, check_date_format(self.record1.get('END_DATE')),
-            check_date_format(self.record1.get('END_DATE'))
-        )
-        self.assertEqual(import_xls_file_data.MANDATES_IMPORTED, nbr_mandates_imported + 1)
-        self.assertEqual(import_xls_file_data.MANDATES_UPDATED, nbr_mandates_updated)
-        create_assistant_mandate_if_not_exists(
-            self.record1, self.assistant1, check_date_format(self.record1.get('END_DATE')),
-            check_date_format(self.record1.get('END_DATE'))
-        )
-        self.assertEqual(import_xls_file_data.MANDATES_IMPORTED, nbr_mandates_imported + 1)
-        self.assertEqual(import_xls_file_data.MANDATES_UPDATED, nbr_mandates_updated + 1)
-        create_assistant_mandate_if_not_exists(
-            self.record2, self.assistant2, check_date_format(self.record2.get('END_DATE')),
-            check_date_format(self.record2.get('END_DATE'))
-        )
-        self.assertEqual(import_xls_file_data.MANDATES_IMPORTED, nbr_mandates_imported + 2)
-        self.assertEqual(import_xls_file_data.MANDATES_UPDATED, nbr_mandates_updated + 1)
-        create_assistant_mandate_if_not_exists(
-            self.record3, self.assistant3, check_date_format(self.record3.get('END_DATE')),
-            check_date_format(self.record3.get('END_DATE'))
-        )
-        self.assertEqual(import_xls_file_data.MANDATES_IMPORTED, nbr_mandates_imported + 3)
-        self.assertEqual(import_xls_file_data.MANDATES_UPDATED, nbr_mandates_updated + 1)
-
-    def test_retrieve_learning_units_year_from_previous_mandate(self):
-        self.assistant_mandate3 = AssistantMandateFactory(assistant=self.assistant2)
-        self.assistant_mandate2 = AssistantMandateFactory(
-            assistant=self.assistant1,
-            academic_year=self.previous_academic_year
-        )
-        self.tutoring_learning_unit_year1 = TutoringLearningUnitYearFactory(mandate=self.assistant_mandate2)
-        self.tutoring_learning_unit_year2 = TutoringLearningUnitYearFactory(mandate=self.assistant_mandate2)
-        self.assistant_mandate5 = AssistantMandateFactory(
-            assistant=self.assistant2
+    def test_read_xls_mandates_returns_a_new_import_run_each_time(self):
+        file = File(open('assistant/tests/resources/assistants_ok.xlsx', 'rb'))
+        content = file.read()
+        first_run = read_xls_mandates(
+            self.request,
+            SimpleUploadedFile('new_excel.xlsx', content,
+                               content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         )
-        retrieve_learning_units_year_from_previous_mandate(self.assistant1, self.assistant_mandate1)
-        self.assertEqual(len(find_by_mandate(self.assistant_mandate1)), 2)
-
-        retrieve_learning_units_year_from_previous_mandate(self.assistant2, self.assistant_mandate5)
-        self.assertEqual(len(find_by_mandate(self.assistant_mandate5)), 0)
-
-        retrieve_learning_units_year_from_previous_mandate(self.assistant2, self.assistant_mandate3)
-        self.assertEqual(len(find_by_mandate(self.assistant_mandate3)), 0)
-
-    def test_link_mandate_to_entity(self):
-        self.assertEqual(
-            link_mandate_to_entity(self.assistant_mandate1, self.entity_version1.entity),
-            find_by_mandate_and_entity(self.assistant_mandate1, self.entity_version1.entity)[0]
+        second_run = read_xls_mandates(
+            self.request,
+            SimpleUploadedFile('new_excel.xlsx', content,
+                               content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         )
-        self.assertEqual(link_mandate_to_entity(self.assistant_mandate1), None)
+        self.assertIsNot(first_run, second_run)
+        self.assertEqual(second_run.mandates_imported, 0)
         self.assertEqual(
-            link_mandate_to_entity(self.assistant_mandate1, self.entity_version2.entity),
-            find_by_mandate_and_entity(self.assistant_mandate1, self.entity_version2.entity)[0]
+            second_run.rows_unchanged + second_run.mandates_updated + second_run.mandates_unchanged +
+            second_run.persons_not_found,
+            first_run.mandates_imported + first_run.mandates_updated + first_run.persons_not_found
         )
-
-    def test_search_entity_by_acronym_and_type(self):
-        self.assertIsInstance(search_entity_by_acronym_and_type('SST', entity_type.SECTOR), entity.Entity)
-        self.assertEqual(search_entity_by_acronym_and_type(None, entity_type.SECTOR), None)
-        self.assertEqual(search_entity_by_acronym_and_type(None, entity_type.SECTOR), None)
-        self.assertEqual(search_entity_by_acronym_and_type('SST', None), None)
-
+        self.assertIn('preload', second_run.timings)
 
 class FakeMessages:
     messages = []
@@ -0,0 +1,146 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import io
+import json
+import os
+import time
+import tracemalloc
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+
+from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
+from assistant.tests.factories.manager import ManagerFactory
+from assistant.utils.import_xls_file_data import COLS_TITLES
+from assistant.utils.import_xls_file_data import read_xls_mandates
+from base.models import academic_year
+from base.models.enums import entity_type
+from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.entity_version import EntityVersionFactory
+from base.tests.factories.person import PersonFactory
+
+# The time and memory measures depend on the machine and the 1k and 10k rows workbooks take minutes to generate:
+# they are only checked when this variable is set. Otherwise only the number of queries of 100 rows is checked.
+RUN_BENCHMARKS = bool(os.environ.get('ASSISTANT_IMPORT_BENCHMARK'))
+# File where the measures of every run are appended as JSON lines
+BENCHMARK_OUTPUT = os.environ.get('ASSISTANT_IMPORT_BENCHMARK_OUTPUT')
+
+# Maximum per row for each workbook size; the fixed costs of the import weigh more on small workbooks
+THRESHOLDS = {
+    100: {'seconds': 0.05, 'queries': 0.5, 'peak_memory': 256 * 1024},
+    1000: {'seconds': 0.01, 'queries': 0.08, 'peak_memory': 64 * 1024},
+    10000: {'seconds': 0.005, 'queries': 0.02, 'peak_memory': 64 * 1024},
+}
+# One row in EXISTING_MANDATES_RATIO updates a mandate that already exists, the others create one
+EXISTING_MANDATES_RATIO = 3
+FACULTIES = ('SC', 'LSM', 'ESPO', 'DRT', 'MED')
+
+
+def build_mandates_workbook(rows_count, current_academic_year):
+    EntityVersionFactory(entity_type=entity_type.SECTOR, acronym='SST')
+    for acronym in FACULTIES:
+        EntityVersionFactory(entity_type=entity_type.FACULTY, acronym=acronym)
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(COLS_TITLES)
+    for index in range(rows_count):
+        global_id = str(index + 1).zfill(8)
+        sap_id = str(index + 1)
+        if index % EXISTING_MANDATES_RATIO == 0:
+            AssistantMandateFactory(
+                assistant__person__global_id=global_id, academic_year=current_academic_year, sap_id=sap_id
+            )
+        else:
+            PersonFactory(global_id=global_id)
+        record = {
+            'SECTOR': 'SST', 'LOGISTICS_ENTITY': None, 'FACULTY': FACULTIES[index % len(FACULTIES)],
+            'SCHOOL': None, 'INSTITUTE': None, 'POLE': None, 'SAP_ID': sap_id, 'GLOBAL_ID': sap_id,
+            'LAST_NAME': 'last_name', 'FIRST_NAME': 'first_name', 'FULLTIME_EQUIVALENT': '0.5',
+            'ENTRY_DATE': '01/02/2015', 'END_DATE': '03-10-2017', 'ASSISTANT_TYPE_CODE': ('ST', 'AS')[index % 2],
+            'SCALE': '021', 'CONTRACT_DURATION': '4', 'CONTRACT_DURATION_FTE': '4', 'RENEWAL_TYPE': 'NORMAL',
+            'ABSENCES': None, 'COMMENT': None, 'OTHER_STATUS': None, 'EMAIL': None, 'FGS': global_id
+        }
+        worksheet.append([record[title] for title in COLS_TITLES])
+    content = io.BytesIO()
+    workbook.save(content)
+    return SimpleUploadedFile(
+        'benchmark.xlsx', content.getvalue(), content_type='vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+class ImportXlsFileBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        AcademicYearFactory.produce_in_past()
+        cls.current_academic_year = academic_year.starting_academic_year()
+        cls.manager = ManagerFactory()
+
+    def run_benchmark(self, rows_count):
+        uploaded_file = build_mandates_workbook(rows_count, self.current_academic_year)
+        request = RequestFactory().post('/assistants/manager/mandates/upload/')
+        request.user = self.manager.person.user
+        tracemalloc.start()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            import_run = read_xls_mandates(request, uploaded_file)
+        seconds = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertFalse(import_run.has_errors)
+        self.assertEqual(import_run.mandates_imported + import_run.mandates_updated, rows_count)
+        measures = {
+            'rows': rows_count,
+            'seconds': seconds,
+            'queries': len(queries),
+            'peak_memory': peak_memory,
+            'timings': import_run.timings,
+        }
+        if BENCHMARK_OUTPUT:
+            with open(BENCHMARK_OUTPUT, 'a') as output:
+                output.write(json.dumps(measures) + '\n')
+        for measure, threshold in THRESHOLDS[rows_count].items():
+            if measure != 'queries' and not RUN_BENCHMARKS:
+                continue
+            self.assertLessEqual(
+                measures[measure] / rows_count, threshold,
+                '{} per row above {} for {} rows: {}'.format(measure, threshold, rows_count, measures)
+            )
+        return measures
+
+    def test_import_100_rows(self):
+        self.run_benchmark(100)
+
+    @unittest.skipUnless(RUN_BENCHMARKS, 'Set ASSISTANT_IMPORT_BENCHMARK to run the large import benchmarks')
+    def test_import_1000_rows(self):
+        self.run_benchmark(1000)
+
+    @unittest.skipUnless(RUN_BENCHMARKS, 'Set ASSISTANT_IMPORT_BENCHMARK to run the large import benchmarks')
+    def test_import_10000_rows(self):
+        self.run_benchmark(10000)
@@ -23,13 +23,16 @@
 #    see http://www.gnu.org/licenses/.
 #
 ##############################################################################
+import datetime
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-from assistant.models.enums import assistant_mandate_renewal
+from assistant.models.enums import assistant_mandate_renewal, message_type
 from assistant.models.enums import reviewer_role
+from assistant.models.outbox_item import OutboxItem
 from assistant.tests.factories.academic_assistant import AcademicAssistantFactory
 from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
 from assistant.tests.factories.manager import ManagerFactory
@@ -38,6 +41,7 @@ from assistant.tests.factories.settings import SettingsFactory
 from assistant.utils import send_email
 from base.models.person import Person
 from base.tests.factories.academic_year import AcademicYearFactory
+from base.tests.factories.entity_version import EntityVersionFactory
 
 
 class SendEmailTestCase(TestCase):
@@ -85,3 +89,15 @@ class SendEmailTestCase(TestCase):
         send_email.send_message(self.phd_supervisor, html_template_ref, txt_template_ref)
         args = mock_send_messages.call_args[0][0]
         self.assertEqual(len(args.get('receivers')), 1)
+
+    @patch("osis_common.messaging.send_message.send_messages")
+    def test_send_message_to_reviewers_enqueues_campaign(self, mock_send_messages):
+        last_version = EntityVersionFactory(
+            entity=self.reviewer.entity, start_date=datetime.date.today(), end_date=None
+        )
+        self.client.force_login(self.manager.person.user)
+        self.client.get(reverse('send_message_to_reviewers'))
+        self.assertFalse(mock_send_messages.called)
+        item = OutboxItem.objects.get(person=self.reviewer.person)
+        self.assertEqual(item.message.type, message_type.TO_ALL_REVIEWERS)
+        self.assertEqual(item.template_data, {'role': self.reviewer.role, 'entity': last_version.acronym})
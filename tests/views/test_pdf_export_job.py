@@ -0,0 +1,84 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import datetime
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from assistant.models import pdf_export_job
+from assistant.models.enums import job_state, pdf_export_type
+from assistant.tests.factories.manager import ManagerFactory
+from base.tests.factories.academic_year import AcademicYearFactory
+
+HTTP_OK = 200
+HTTP_NOT_FOUND = 404
+
+
+class PdfExportJobViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = ManagerFactory()
+        cls.other_manager = ManagerFactory()
+        cls.academic_year = AcademicYearFactory()
+
+    def setUp(self):
+        self.job = pdf_export_job.enqueue(pdf_export_type.MANDATES, self.academic_year, self.manager.person, 'en')
+        self.client.force_login(self.manager.person.user)
+
+    def finish_job(self, expires):
+        self.job.file.save('mandates.pdf', ContentFile(b'%PDF-1.4'), save=False)
+        self.job.file_name = 'mandates.pdf'
+        self.job.state = job_state.DONE
+        self.job.expires = expires
+        self.job.save()
+
+    def test_job_view(self):
+        response = self.client.get(reverse('pdf_export_job', args=[self.job.id]))
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertTemplateUsed(response, 'pdf_export_job.html')
+
+    def test_job_status(self):
+        response = self.client.get(reverse('pdf_export_job_status', args=[self.job.id]))
+        self.assertEqual(response.json()['state'], job_state.PENDING)
+        self.assertFalse(response.json()['downloadable'])
+
+    def test_job_of_another_person_is_not_found(self):
+        self.client.force_login(self.other_manager.person.user)
+        for name in ('pdf_export_job', 'pdf_export_job_status', 'pdf_export_job_download'):
+            response = self.client.get(reverse(name, args=[self.job.id]))
+            self.assertEqual(response.status_code, HTTP_NOT_FOUND)
+
+    def test_job_download(self):
+        self.finish_job(timezone.now() + datetime.timedelta(hours=1))
+        response = self.client.get(reverse('pdf_export_job_download', args=[self.job.id]))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+
+    def test_expired_job_download_is_not_found(self):
+        self.finish_job(timezone.now())
+        response = self.client.get(reverse('pdf_export_job_download', args=[self.job.id]))
+        self.assertEqual(response.status_code, HTTP_NOT_FOUND)
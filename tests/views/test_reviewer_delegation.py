@@ -29,7 +29,8 @@ from django.test import TestCase
 from django.urls import reverse
 
 from assistant.models.enums import assistant_mandate_state, review_status
-from assistant.models.enums import reviewer_role
+from assistant.models.enums import notification_event, reviewer_role
+from assistant.models.outbox_item import OutboxItem
 from assistant.models.reviewer import find_by_person
 from assistant.tests.factories.assistant_mandate import AssistantMandateFactory
 from assistant.tests.factories.mandate_entity import MandateEntityFactory
@@ -145,6 +146,9 @@ class TestAddReviewerForDelegation(ReviewerDelegationDataMixin, TestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, HttpResponseRedirect.status_code)
         self.assertTrue(find_by_person(self.delegate))
+        self.assertTrue(
+            OutboxItem.objects.filter(event=notification_event.REVIEWER_DELEGATION, person=self.delegate).exists()
+        )
 
     def test_add_reviewer_for_structure_if_logged_reviewer_cannot_delegate(self):
         self.client.force_login(self.vice_sector_reviewer.person.user)
@@ -107,3 +107,12 @@ class ReviewerMandatesListViewTestCase(TestCase):
             find_by_academic_year(self.previous_academic_year).filter(id__in=mandates_id),
             transform=lambda x: x
         )
+
+    def test_context_data_with_export_entities(self):
+        self.client.force_login(self.phd_supervisor.user)
+        response = self.client.get('/assistants/reviewer/')
+        self.assertEqual(
+            [entity.pk for entity in response.context['export_entities']],
+            [self.entity_version.entity.pk]
+        )
+        self.assertContains(response, '<option value="{}">'.format(self.entity_version.entity.pk))
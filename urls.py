@@ -34,12 +34,17 @@ from assistant.views import manager_reviews_view
 from assistant.views import manager_settings, reviewers_management, upload_assistant_file
 from assistant.views import mandate, home, assistant_form, assistant, phd_supervisor_review
 from assistant.views import mandates_list, reviewer_mandates_list, reviewer_review, reviewer_delegation
-from assistant.views import messages, phd_supervisor_assistants_list
+from assistant.views import messages, pdf_export_job, phd_supervisor_assistants_list
 
 urlpatterns = [
     url(r'^$', home.assistant_home, name='assistants_home'),
     url(r'^access_denied$', home.access_denied, name='access_denied'),
     url(r'^api/get_persons/', get_persons.get_persons, name='get_persons'),
+    url(r'^pdf_exports/(?P<job_id>\d+)/', include([
+        url(r'^$', pdf_export_job.job_view, name='pdf_export_job'),
+        url(r'^status/$', pdf_export_job.job_status, name='pdf_export_job_status'),
+        url(r'^download/$', pdf_export_job.job_download, name='pdf_export_job_download'),
+    ])),
 
 
     url(r'^assistant/', include([
@@ -106,7 +111,11 @@ urlpatterns = [
             url(r'^go_backward/$', find_assistant_mandate_step_backward_state, name='assistant_mandate_step_back'),
             url(r'^load/$', mandate.load_mandates, name='load_mandates'),
             url(r'^upload/$', import_xls_file_data.upload_mandates_file, name='upload_mandates_file'),
+            url(r'^import_jobs/(?P<job_id>\d+)/status/$', import_xls_file_data.import_job_status,
+                name='mandates_import_job_status'),
             url(r'^export/$', mandate.export_mandates, name='export_mandates'),
+            url(r'^export_years/$', mandate.export_mandates_years, name='export_mandates_years'),
+            url(r'^export/(?P<file_format>csv|jsonl)/$', mandate.export_mandates_lines, name='export_mandates_lines'),
             url(r'^export_mandates_to_sap/$', export_utils_pdf.export_mandates_to_sap,
                 name='export_mandates_to_sap'),
             url(r'^export_pdf/$', export_utils_pdf.export_mandates, name='export_mandates_pdf'),
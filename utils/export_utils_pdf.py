@@ -24,18 +24,27 @@
 #
 ##############################################################################
 import datetime
+import itertools
+import logging
+import multiprocessing
 import time
 import zipfile
+from contextlib import contextmanager
 from io import BytesIO
-from typing import Sequence, List, Union
+from typing import Sequence, List
 
 from django import http
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test, login_required
+from django.db import connection
+from django.db.models import prefetch_related_objects
 from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import redirect
 from django.urls import reverse
-from django.utils import timezone
+from django.utils import timezone, translation
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_http_methods
+from PyPDF2 import PdfFileReader, PdfFileWriter
 from reportlab.graphics.charts.legends import Legend
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.shapes import Drawing
@@ -47,14 +56,16 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet
 from reportlab.lib.units import mm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak, Table, TableStyle
 
-from assistant.business import users_access
-from assistant.models import academic_assistant, assistant_mandate, review, reviewer, tutoring_learning_unit_year
-from assistant.models.enums import review_status, assistant_type, user_role, assistant_mandate_renewal
+from assistant.business import mandate_pdf_cache, users_access
+from assistant.business.mandates_pdf_data import MandatesPdfData
+from assistant.forms.mandate import MandatesExportFilterForm
+from assistant.models import academic_assistant, assistant_mandate, mandate_entity, pdf_export_job, reviewer
+from assistant.models import tutoring_learning_unit_year
+from assistant.models.enums import review_status, assistant_type, user_role, assistant_mandate_renewal, \
+    pdf_export_type
 from assistant.models.enums.assistant_phd_inscription import PHD_INSCRIPTION_CHOICES
-from assistant.models.review import find_before_mandate_state
 from assistant.utils import assistant_access, manager_access
 from base.models import academic_year, entity_version
-from base.models.entity import find_versions_from_entites
 from base.models.enums import entity_type
 from base.models.person import find_by_user
 
@@ -63,75 +74,276 @@ MARGIN_SIZE = 15 * mm
 COLS_WIDTH_FOR_REVIEWS = [35*mm, 20*mm, 70*mm, 30*mm, 30*mm]
 COLS_WIDTH_FOR_DECLINED_MANDATES = [100*mm]
 COLS_WIDTH_FOR_TUTORING = [40*mm, 15*mm, 15*mm, 15*mm, 15*mm, 15*mm, 15*mm, 15*mm, 40*mm]
+PDF_EXPORT_PROCESSES = getattr(settings, 'ASSISTANT_PDF_EXPORT_PROCESSES', 1)
+PDF_EXPORT_BATCH_SIZE_PER_PROCESS = 10
+
+logger = logging.getLogger(settings.DEFAULT_LOGGER)
 
 
 @user_passes_test(manager_access.user_is_manager, login_url='access_denied')
 def export_mandates_to_sap(request):
-    mandates = assistant_mandate.find_by_academic_year_by_excluding_declined(academic_year.starting_academic_year())
-    response = HttpResponse(content_type='application/zip')
-    filename = ('%s_%s_%s.zip' % (_('assistants_mandates'), mandates[0].academic_year, time.strftime("%Y%m%d_%H%M")))
-    response['Content-Disposition'] = 'filename="%s"' % filename
-    buffer = BytesIO()
-    zip_file = zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED)
-    for mandate in mandates:
-        file = build_doc(request, mandates=[mandate], type='export_to_sap')
-        zip_file.writestr(
-            ('%s_%s_%s.pdf' % (mandate.sap_id, mandate.academic_year, mandate.assistant.person.last_name)),
-            file.content
-        )
-    zip_file.close()
-    buffer.flush()
-    ret_zip = buffer.getvalue()
-    buffer.close()
-    response.write(ret_zip)
-    return response
+    return enqueue_export(request, pdf_export_type.MANDATES_TO_SAP, academic_year.starting_academic_year())
+
+
+def enqueue_export(request, export_type, year, filters=None):
+    job = pdf_export_job.enqueue(export_type, year, find_by_user(request.user), translation.get_language(), filters)
+    return redirect('pdf_export_job', job_id=job.id)
+
+
+def get_export_file_name(year, extension):
+    return '%s_%s_%s.%s' % (_('assistants_mandates'), year, time.strftime("%Y%m%d_%H%M"), extension)
+
+
+def find_mandates_to_sap(year):
+    return assistant_mandate.find_by_academic_year_by_excluding_declined(year).select_related(
+        'academic_year', 'assistant__person'
+    )
+
+
+def stream_mandates_zip(user, mandates, processes=None, progress=None, timings=None):
+    """Yield a ZIP archive of the PDF of each mandate, one member at a time, in the order of the mandates.
+
+    With more than one process, the PDF are rendered by a pool of workers while only a small batch of them is
+    held in memory. progress is called with the number of mandates written after each of them.
+    """
+    renderer = MandatesPdfRenderer(user, timings=timings)
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        rendered = renderer.render_each(mandates.iterator(), processes or PDF_EXPORT_PROCESSES)
+        for count, (mandate, pdf) in enumerate(rendered, 1):
+            zip_file.writestr(
+                ('%s_%s_%s.pdf' % (mandate.sap_id, mandate.academic_year, mandate.assistant.person.last_name)),
+                pdf
+            )
+            if progress:
+                progress(count)
+            yield stream.pop()
+    yield stream.pop()
+
+
+class ZipStream:
+    """Unseekable file object on which zipfile writes an archive that is consumed as it is written."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
 
 
 @login_required
-def build_doc(request: http.HttpRequest, mandates: Sequence[assistant_mandate.AssistantMandate], type: str = 'default'):
+def build_doc(request: http.HttpRequest, mandates: Sequence[assistant_mandate.AssistantMandate], type: str = 'default',
+              renderer: 'MandatesPdfRenderer' = None):
     if mandates:
         year = mandates[0].academic_year
     else:
         year = academic_year.starting_academic_year()
-    if type is 'export_to_sap':
+    if type == 'export_to_sap':
         filename = ('%s_%s_%s.pdf' % (mandates[0].sap_id, year, mandates[0].assistant.person))
     else:
         filename = ('%s_%s_%s.pdf' % (_('assistants_mandates'), year, time.strftime("%Y%m%d_%H%M")))
+    renderer = renderer or MandatesPdfRenderer(request.user)
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename="%s"' % filename
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=PAGE_SIZE, rightMargin=MARGIN_SIZE, leftMargin=MARGIN_SIZE, topMargin=70,
-                            bottomMargin=25)
+    if type == 'default' or type == 'export_to_sap':
+        response.write(renderer.render_mandates(mandates))
+    else:
+        response.write(renderer.render_declined_mandates(mandates, year))
+    return response
+
+
+def get_styles() -> StyleSheet1:
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name='Tiny', fontSize=6, font='Helvetica', leading=8, leftIndent=0, rightIndent=0,
                               firstLineIndent=0, alignment=TA_LEFT, spaceBefore=0, spaceAfter=0, splitLongWords=1, ))
     styles.add(ParagraphStyle(name='StandardWithBorder', font='Helvetica', leading=18, leftIndent=10, rightIndent=10,
                               firstLineIndent=0, alignment=TA_JUSTIFY, spaceBefore=25, spaceAfter=5, splitLongWords=1,
                               borderColor='#000000', borderWidth=1, borderPadding=10, ))
-    content = []
-    roles = []
-    if academic_assistant.find_by_person(find_by_user(request.user)):
-        roles = [user_role.ASSISTANT]
-    elif reviewer.find_by_person(find_by_user(request.user)):
-        roles = reviewer.find_by_person(find_by_user(request.user)).values_list("role", flat=True)
-    else:
-        roles = [user_role.ADMINISTRATOR]
-    if type is 'default' or type is 'export_to_sap':
-        for mandate in mandates:
-            add_mandate_content(content, mandate, styles, roles)
-    else:
-        content.append(create_paragraph("%s (%s)<br />" % (_('Assistants who have declined their renewal'), year),
-                                        '',
-                                        styles["BodyText"])
-                       )
+    return styles
+
+
+def get_user_roles(user) -> List[str]:
+    person = find_by_user(user)
+    if academic_assistant.find_by_person(person):
+        return [user_role.ASSISTANT]
+    roles = list(reviewer.find_by_person(person).values_list("role", flat=True))
+    return roles or [user_role.ADMINISTRATOR]
+
+
+class MandatesPdfRenderer:
+    """Render mandates as PDF documents for a user.
+
+    The styles and the roles of the user, which decide the reviews shown, are resolved once so that the same
+    renderer can produce the documents of every mandate of an export. The documents of mandates in cached_states
+    are read from and written to the PDF cache. The sections of the rendering are timed into timings when given.
+    """
+
+    def __init__(self, user, cached_states=mandate_pdf_cache.CACHED_MANDATE_STATES, timings: 'PdfTimings' = None):
+        self.styles = get_styles()
+        self.roles = get_user_roles(user)
+        self.cached_states = cached_states
+        self.timings = timings
+
+    def new_stats(self):
+        return new_document_stats() if self.timings else None
+
+    def build(self, content: List) -> bytes:
+        return build_pdf(content, self.styles, self.timings.stats if self.timings else None)
+
+    def load(self, mandates) -> MandatesPdfData:
+        with timed_section(self.timings.stats if self.timings else None, 'load'):
+            return MandatesPdfData(mandates, self.roles)
+
+    def get_blocks(self, mandate, data: MandatesPdfData, stats):
+        with timed_section(stats, 'content'):
+            return get_mandate_blocks(mandate, self.roles, data)
+
+    def add_header_footer(self, canvas, doc):
+        add_header_footer(canvas, doc, self.styles)
+
+    def render_mandates(self, mandates: Sequence[assistant_mandate.AssistantMandate]) -> bytes:
+        mandates = list(mandates)
+        if len(mandates) == 1:
+            return next(self.render_documents(mandates))[1]
+        content = []
+        data = self.load(mandates)
+        for mandate in data.mandates:
+            stats = self.new_stats()
+            content += build_blocks(self.get_blocks(mandate, data, stats), self.styles, stats)
+            if self.timings:
+                self.timings.add_document(mandate, stats)
+        return self.build(content)
+
+    def render_declined_mandates(self, mandates: Sequence[assistant_mandate.AssistantMandate], year) -> bytes:
+        content = [
+            create_paragraph("%s (%s)<br />" % (_('Assistants who have declined their renewal'), year), '',
+                             self.styles["BodyText"])
+        ]
         if mandates:
-            write_table(content, add_declined_mandates(mandates, styles['Tiny']), COLS_WIDTH_FOR_DECLINED_MANDATES)
+            write_table(content, add_declined_mandates(mandates, self.styles['Tiny']),
+                        COLS_WIDTH_FOR_DECLINED_MANDATES)
             content.append(PageBreak())
-    doc.build(content, add_header_footer)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
-    return response
+        return self.build(content)
+
+    def render_each(self, mandates, processes: int = 1):
+        """Yield each mandate with its own PDF, in the order of the mandates.
+
+        The data of the mandates is always loaded by this process; with more than one process, only the layout of
+        the documents, which is where the time goes, is done by a pool of workers. Those never use the database.
+        """
+        if processes <= 1:
+            for batch in iter_batches(mandates, PDF_EXPORT_BATCH_SIZE_PER_PROCESS):
+                yield from self.render_documents(batch)
+            return
+        with multiprocessing.Pool(processes) as pool:
+            for batch in iter_batches(mandates, processes * PDF_EXPORT_BATCH_SIZE_PER_PROCESS):
+                yield from self.render_documents(batch, pool)
+
+    def render_documents(self, mandates, pool=None):
+        """Yield each mandate with its own PDF, read from the PDF cache when it was rendered already.
+
+        The cache is looked up first, so that the data is only loaded for the documents which are rendered.
+        """
+        cache = mandate_pdf_cache.pdf_cache
+        language = translation.get_language()
+        keys = self.get_cache_keys(mandates, language)
+        cached = {}
+        for mandate in mandates:
+            pdf = cache.get(keys[mandate.pk]) if mandate.pk in keys else None
+            if pdf is not None:
+                cached[mandate.pk] = pdf
+        to_render = [mandate for mandate in mandates if mandate.pk not in cached]
+        data = self.load(to_render) if to_render else None
+        documents = []
+        for mandate in mandates:
+            stats = self.new_stats()
+            pdf = cached.get(mandate.pk)
+            blocks = self.get_blocks(mandate, data, stats) if pdf is None else None
+            documents.append((mandate, keys.get(mandate.pk), blocks, pdf, stats))
+        tasks = [(language, blocks, stats is not None)
+                 for _mandate, _key, blocks, pdf, stats in documents if pdf is None]
+        rendered = iter(pool.map(render_blocks, tasks) if pool else map(render_blocks, tasks))
+        for mandate, key, _blocks, pdf, stats in documents:
+            if pdf is None:
+                pdf, render_stats = next(rendered)
+                if key:
+                    cache.set(key, pdf)
+                add_stats(stats, render_stats)
+            elif stats is not None:
+                stats['cached'] = True
+            if self.timings:
+                self.timings.add_document(mandate, stats)
+            yield mandate, pdf
+
+    def get_cache_keys(self, mandates, language) -> dict:
+        """Map the mandates whose documents are cached to their key, with a single query."""
+        cache = mandate_pdf_cache.pdf_cache
+        accepted = [mandate for mandate in mandates if cache.accepts(mandate, self.cached_states)]
+        if not accepted:
+            return {}
+        with timed_section(self.timings.stats if self.timings else None, 'load'):
+            versions = cache.load_versions([mandate.pk for mandate in accepted])
+        return {
+            mandate.pk: cache.get_key(mandate, self.roles, language, versions.get(mandate.pk))
+            for mandate in accepted
+        }
+
+    def render_concatenated(self, mandates, processes: int = None, progress=None) -> bytes:
+        """Return one PDF made of the document of each mandate, with bookmarks by sector, faculty and assistant.
+
+        Each document is rendered on its own, so that only the documents which are not in the PDF cache cost a
+        rendering. The documents are grouped by sector and faculty, in the order of the mandates within a group.
+        progress is called with the number of mandates added after each of them.
+        """
+        mandates = list(mandates)
+        if not mandates:
+            return self.render_mandates(mandates)
+        entities = MandatesPdfData.load_entities([mandate.pk for mandate in mandates])
+        sections = {mandate.pk: get_outline_sections(entities.get(mandate.pk, [])) for mandate in mandates}
+        mandates.sort(key=lambda mandate: sections[mandate.pk])
+        writer = PdfFileWriter()
+        writer.setPageMode('/UseOutlines')
+        bookmarks = {}
+        rendered = self.render_each(mandates, processes or PDF_EXPORT_PROCESSES)
+        for count, (mandate, pdf) in enumerate(rendered, 1):
+            page_number = writer.getNumPages()
+            for page in PdfFileReader(BytesIO(pdf), strict=False).pages:
+                writer.addPage(page)
+            parent = None
+            for depth in range(1, len(sections[mandate.pk]) + 1):
+                path = sections[mandate.pk][:depth]
+                if path not in bookmarks:
+                    bookmarks[path] = writer.addBookmark(path[-1], page_number, parent)
+                parent = bookmarks[path]
+            writer.addBookmark(str(mandate.assistant.person), page_number, parent)
+            if progress:
+                progress(count)
+        buffer = BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+
+def get_outline_sections(entities) -> tuple:
+    """Return the acronyms of the sector and faculty of a mandate, leaving out the missing ones."""
+    acronyms = {entity.entity_type: entity.acronym for entity in entities}
+    return tuple(acronyms[level] for level in (entity_type.SECTOR, entity_type.FACULTY) if acronyms.get(level))
+
+
+def iter_batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(itertools.islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, size))
 
 
 @require_http_methods(["POST"])
@@ -144,18 +356,118 @@ def export_mandate(request):
 
 @user_passes_test(manager_access.user_is_manager, login_url='access_denied')
 def export_mandates(request):
-    mandates = assistant_mandate.find_by_academic_year_by_excluding_declined(academic_year.starting_academic_year())
-    return build_doc(request, mandates)
+    return enqueue_export(request, pdf_export_type.MANDATES, academic_year.starting_academic_year())
 
 
 @user_passes_test(manager_access.user_is_manager, login_url='access_denied')
 def export_declined_mandates(request):
-    mandates = assistant_mandate.find_declined_by_academic_year(academic_year.starting_academic_year())
-    return build_doc(request, mandates, type='declined')
+    return enqueue_export(request, pdf_export_type.DECLINED_MANDATES, academic_year.starting_academic_year())
+
+
+def build_pdf(content: List, styles: StyleSheet1, stats: dict = None) -> bytes:
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=PAGE_SIZE, rightMargin=MARGIN_SIZE, leftMargin=MARGIN_SIZE,
+                            topMargin=70, bottomMargin=25)
+    with timed_section(stats, 'layout'):
+        doc.build(content, lambda canvas, doc: add_header_footer(canvas, doc, styles))
+    if stats is not None:
+        stats['pages'] += doc.page
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+
+_worker_styles = None
+
+
+def render_blocks(task) -> tuple:
+    """Render the blocks of a mandate, in this process or in a worker process of MandatesPdfRenderer.render_each.
+
+    Return the PDF with the statistics of its sections when they are asked for, None otherwise.
+    """
+    global _worker_styles
+    language, blocks, timed = task
+    if _worker_styles is None:
+        _worker_styles = get_styles()
+    stats = new_document_stats() if timed else None
+    with translation.override(language):
+        return build_pdf(build_blocks(blocks, _worker_styles, stats), _worker_styles, stats), stats
+
+
+def new_document_stats() -> dict:
+    return {'sections': {}, 'pages': 0, 'cached': False}
+
+
+def add_stats(stats: dict, other: dict) -> None:
+    if stats is None or other is None:
+        return
+    stats['pages'] += other['pages']
+    for name, section in other['sections'].items():
+        total = stats['sections'].setdefault(name, {'seconds': 0, 'queries': 0})
+        total['seconds'] += section['seconds']
+        total['queries'] += section['queries']
+
+
+@contextmanager
+def timed_section(stats: dict, name: str):
+    """Add the wall time and the number of queries of the block to the section name of stats, unless it is None."""
+    if stats is None:
+        yield
+        return
+    queries = [0]
+
+    def count_query(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_query):
+            yield
+    finally:
+        add_stats(stats, {
+            'sections': {name: {'seconds': time.perf_counter() - start, 'queries': queries[0]}}, 'pages': 0
+        })
+
+
+class PdfTimings:
+    """Totals of the timed sections of an export: loading the data, building the content of a mandate, its
+    paragraphs and tables, its time repartition chart and the layout of the documents.
+
+    Each document is also logged as a structured record with the wall time and the number of queries of each of
+    its sections and its number of pages.
+    """
+
+    def __init__(self):
+        self.stats = new_document_stats()
+        self.documents = 0
+        self.cached_documents = 0
+
+    def add_document(self, mandate, stats):
+        self.documents += 1
+        self.cached_documents += stats['cached']
+        add_stats(self.stats, stats)
+        logger.info(
+            "PDF export of mandate %s: %s pages%s, %s",
+            mandate.pk, stats['pages'], ' (cached)' if stats['cached'] else '',
+            ', '.join('%s %.3f s %s queries' % (name, section['seconds'], section['queries'])
+                      for name, section in stats['sections'].items()),
+            extra={'pdf_export_timings': dict(stats, mandate=mandate.pk)}
+        )
+
+    def to_dict(self):
+        return {
+            'documents': self.documents,
+            'cached_documents': self.cached_documents,
+            'pages': self.stats['pages'],
+            'sections': self.stats['sections'],
+        }
 
 
 def add_declined_mandates(mandates, style):
     data = generate_headers(["%s" % (_('Assistant'))], style)
+    mandates = list(mandates)
+    prefetch_related_objects(mandates, 'assistant__person')
     for mandate in mandates:
         person = "{} {}".format(
             mandate.assistant.person.first_name,
@@ -167,71 +479,125 @@ def add_declined_mandates(mandates, style):
 
 @user_passes_test(users_access.user_is_reviewer_and_procedure_is_open, login_url='access_denied')
 def export_mandates_for_entity(request: http.HttpRequest, year: int):
+    """Export the mandates of the entities of the reviewer, restricted by the filters given in the query string:
+    the states, the assistant types, an entity the mandates belong to and the ids of the mandates.
+    """
+    year = academic_year.find_academic_year_by_year(year)
+    form = MandatesExportFilterForm(request.GET)
+    if form.is_valid():
+        filters = form.get_filters()
+        if find_mandates_for_reviewer(find_by_user(request.user), year, filters).exists():
+            return enqueue_export(request, pdf_export_type.MANDATES_FOR_ENTITY, year, filters)
+    return HttpResponseRedirect(reverse('reviewer_mandates_list'))
+
+
+def find_mandates_for_reviewer(person, year, filters=None):
     mandates = assistant_mandate.AssistantMandate.objects.filter(
-        mandateentity__entity__in=reviewer.find_by_person(find_by_user(request.user)).values_list("entity", flat=True),
-        academic_year=academic_year.find_academic_year_by_year(year)
-    ).order_by(
+        mandateentity__entity__in=reviewer.find_by_person(person).values_list("entity", flat=True),
+        academic_year=year
+    )
+    return filter_mandates(mandates, filters or {}).order_by(
         'assistant__person__last_name'
     )
-    if mandates:
-        return build_doc(request, mandates)
-    return HttpResponseRedirect(reverse('reviewer_mandates_list'))
 
 
-def add_mandate_content(
-        content: List[Union[Paragraph, PageBreak]],
-        mandate: assistant_mandate.AssistantMandate,
-        styles: StyleSheet1,
-        current_user_roles: List[str]
-) -> None:
-    content.append(
-        create_paragraph(
-            "%s (%s)" % (mandate.assistant.person, mandate.academic_year),
-            get_administrative_data(mandate),
-            styles['StandardWithBorder']
+def filter_mandates(mandates, filters):
+    if filters.get('states'):
+        mandates = mandates.filter(state__in=filters['states'])
+    if filters.get('assistant_types'):
+        mandates = mandates.filter(assistant_type__in=filters['assistant_types'])
+    if filters.get('entity'):
+        mandates = mandates.filter(
+            id__in=mandate_entity.MandateEntity.objects.filter(
+                entity_id=filters['entity']
+            ).values('assistant_mandate_id')
         )
-    )
-    content.append(create_paragraph("%s" % (_('Entities')), get_entities(mandate), styles['StandardWithBorder']))
-    content.append(create_paragraph("<strong>%s</strong>" % (_('Absences')), get_absences(mandate),
-                                    styles['StandardWithBorder']))
-    content.append(create_paragraph("<strong>%s</strong>" % (_('Comment')), get_comment(mandate),
-                                    styles['StandardWithBorder']))
-    content.append(PageBreak())
+    if filters.get('mandates'):
+        mandates = mandates.filter(id__in=filters['mandates'])
+    return mandates
+
+
+PARAGRAPH_BLOCK = 'paragraph'
+TABLE_BLOCK = 'table'
+TIME_REPARTITION_BLOCK = 'time_repartition'
+PAGE_BREAK_BLOCK = 'page_break'
+
+TUTORING_TITLES = [
+    'Course units', 'Academic year', 'Number of sessions planned for this course', 'Duration of a session (h)',
+    'Number of series', 'Number of face-to-face hours', 'Number of students per series',
+    'Preparation, coordination and evaluation (h)', 'Other types of services associated with this course'
+]
+
+
+def get_mandate_blocks(mandate: assistant_mandate.AssistantMandate, current_user_roles: List[str],
+                       data: MandatesPdfData = None) -> List[tuple]:
+    """Describe the document of a mandate with plain, picklable blocks.
+
+    Every database access and translation happens here, so that the blocks can be turned into flowables by
+    build_blocks in another process. The related rows are taken from data, loaded for the mandate alone when
+    it is not given.
+    """
+    data = data or MandatesPdfData([mandate], current_user_roles)
+    blocks = [
+        (PARAGRAPH_BLOCK, "%s (%s)" % (mandate.assistant.person, mandate.academic_year),
+         get_administrative_data(mandate), 'StandardWithBorder', ''),
+        (PARAGRAPH_BLOCK, "%s" % (_('Entities')), get_entities(mandate, data.get_entities(mandate)),
+         'StandardWithBorder', ''),
+        (PARAGRAPH_BLOCK, "<strong>%s</strong>" % (_('Absences')), get_absences(mandate), 'StandardWithBorder', ''),
+        (PARAGRAPH_BLOCK, "<strong>%s</strong>" % (_('Comment')), get_comment(mandate), 'StandardWithBorder', ''),
+        (PAGE_BREAK_BLOCK,),
+    ]
     if mandate.assistant_type == assistant_type.ASSISTANT:
-        content.append(create_paragraph("%s" % (_('Ph.D.')), get_phd_data(mandate.assistant),
-                                        styles['StandardWithBorder']))
-        content.append(create_paragraph("%s" % (_('Research')), get_research_data(mandate),
-                                        styles['StandardWithBorder']))
-        content.append(PageBreak())
-    content.append(create_paragraph("%s<br />" % (_('Course units')), '', styles["BodyText"]))
-    write_table(content, get_tutoring_learning_unit_year(mandate, styles['Tiny']), COLS_WIDTH_FOR_TUTORING)
-    content.append(PageBreak())
-    content.append(create_paragraph("%s" % (_('Representation activities at UCL')),
-                                    get_representation_activities(mandate),
-                                    styles['StandardWithBorder'], " (%s)" % (_('number of hours per year'))))
-    content.append(create_paragraph("%s" % (_('Service activities')), get_service_activities(mandate),
-                                    styles['StandardWithBorder'], " (%s)" % (_('number of hours per year'))))
-    content.append(create_paragraph("%s" % (_('Training activities')), get_formation_activities(mandate),
-                                    styles['StandardWithBorder']))
-    content.append(PageBreak())
-    content.append(create_paragraph("%s" % (_('Summary')), get_summary(mandate), styles['StandardWithBorder']))
-    content += [draw_time_repartition(mandate)]
-    content.append(PageBreak())
+        blocks += [
+            (PARAGRAPH_BLOCK, "%s" % (_('Ph.D.')), get_phd_data(mandate.assistant), 'StandardWithBorder', ''),
+            (PARAGRAPH_BLOCK, "%s" % (_('Research')), get_research_data(mandate), 'StandardWithBorder', ''),
+            (PAGE_BREAK_BLOCK,),
+        ]
+    blocks += [
+        (PARAGRAPH_BLOCK, "%s<br />" % (_('Course units')), '', 'BodyText', ''),
+        (TABLE_BLOCK, get_tutoring_rows(mandate, data.get_tutoring_learning_units_year(mandate)),
+         COLS_WIDTH_FOR_TUTORING, 'Tiny'),
+        (PAGE_BREAK_BLOCK,),
+        (PARAGRAPH_BLOCK, "%s" % (_('Representation activities at UCL')), get_representation_activities(mandate),
+         'StandardWithBorder', " (%s)" % (_('number of hours per year'))),
+        (PARAGRAPH_BLOCK, "%s" % (_('Service activities')), get_service_activities(mandate),
+         'StandardWithBorder', " (%s)" % (_('number of hours per year'))),
+        (PARAGRAPH_BLOCK, "%s" % (_('Training activities')), get_formation_activities(mandate),
+         'StandardWithBorder', ''),
+        (PAGE_BREAK_BLOCK,),
+        (PARAGRAPH_BLOCK, "%s" % (_('Summary')), get_summary(mandate), 'StandardWithBorder', ''),
+        (TIME_REPARTITION_BLOCK, get_time_repartition(mandate)),
+        (PAGE_BREAK_BLOCK,),
+    ]
     if user_role.ASSISTANT not in current_user_roles:
-        content.append(create_paragraph("%s<br />" % (_('Opinions')), '', styles["BodyText"]))
-        if user_role.ADMINISTRATOR in current_user_roles:
-            reviews = review.find_by_mandate(mandate.id)
-        else:
-            reviews = find_before_mandate_state(mandate, current_user_roles)
-        for rev in reviews:
+        blocks.append((PARAGRAPH_BLOCK, "%s<br />" % (_('Opinions')), '', 'BodyText', ''))
+        for rev in data.get_reviews(mandate):
             if rev.status == review_status.IN_PROGRESS:
                 break
-            content.append(create_paragraph(
-                str(_(rev.advice)),
-                get_review_details_for_mandate(mandate, rev),
-                styles['StandardWithBorder'])
+            details = get_review_details_for_mandate(
+                mandate, rev, data.get_reviewer_entity_acronym(rev.reviewer) if rev.reviewer else None
             )
-        content.append(PageBreak())
+            blocks.append((PARAGRAPH_BLOCK, str(_(rev.advice)), details, 'StandardWithBorder', ''))
+        blocks.append((PAGE_BREAK_BLOCK,))
+    return blocks
+
+
+def build_blocks(blocks: List[tuple], styles: StyleSheet1, stats: dict = None) -> List:
+    content = []
+    for block in blocks:
+        with timed_section(stats, 'time_repartition' if block[0] == TIME_REPARTITION_BLOCK else 'paragraphs'):
+            if block[0] == PARAGRAPH_BLOCK:
+                title, data, style_name, subtitle = block[1:]
+                content.append(create_paragraph(title, data, styles[style_name], subtitle))
+            elif block[0] == TABLE_BLOCK:
+                rows, cols_width, style_name = block[1:]
+                write_table(content, [[Paragraph(cell, styles[style_name]) for cell in row] for row in rows],
+                            cols_width)
+            elif block[0] == TIME_REPARTITION_BLOCK:
+                content.append(draw_repartition(block[1]))
+            else:
+                content.append(PageBreak())
+    return content
 
 
 def format_data(data, title, underlined: bool = False) -> str:
@@ -282,10 +648,9 @@ def get_administrative_data(mandate: assistant_mandate.AssistantMandate):
         + external_contract + external_functions
 
 
-def get_entities(mandate):
-    start_date = academic_year.starting_academic_year().start_date
-    entities_id = mandate.mandateentity_set.all().order_by('id').values_list('entity', flat=True)
-    entities = find_versions_from_entites(entities_id, start_date)
+def get_entities(mandate, entities=None):
+    if entities is None:
+        entities = MandatesPdfData.load_entities([mandate.pk]).get(mandate.pk, [])
     entities_data = ""
     for entity in entities:
         entities_data += "<strong>{} : </strong>{}<br />".format(dict(entity_type.ENTITY_TYPES)[entity.entity_type],
@@ -329,27 +694,24 @@ def get_research_data(mandate):
     return internships + conferences + publications + awards + framing + remark
 
 
-def get_tutoring_learning_unit_year(mandate, style):
-    data = generate_headers([
-        'Course units', 'Academic year', 'Number of sessions planned for this course', 'Duration of a session (h)',
-        'Number of series', 'Number of face-to-face hours', 'Number of students per series',
-        'Preparation, coordination and evaluation (h)', 'Other types of services associated with this course'
-    ], style)
-    tutoring_learning_units_year = tutoring_learning_unit_year.find_by_mandate(mandate)
+def get_tutoring_rows(mandate, tutoring_learning_units_year=None) -> List[List[str]]:
+    if tutoring_learning_units_year is None:
+        tutoring_learning_units_year = tutoring_learning_unit_year.find_by_mandate(mandate)
+    rows = [["%s" % _(title) for title in TUTORING_TITLES]]
     for this_tutoring_learning_unit_year in tutoring_learning_units_year:
-        academic_year = str(this_tutoring_learning_unit_year.learning_unit_year.academic_year)
-        data.append([Paragraph(this_tutoring_learning_unit_year.learning_unit_year.complete_title + " (" +
-                               this_tutoring_learning_unit_year.learning_unit_year.acronym + ")", style),
-                     Paragraph(academic_year, style),
-                     Paragraph(str(this_tutoring_learning_unit_year.sessions_number), style),
-                     Paragraph(str(this_tutoring_learning_unit_year.sessions_duration), style),
-                     Paragraph(str(this_tutoring_learning_unit_year.series_number), style),
-                     Paragraph(str(this_tutoring_learning_unit_year.face_to_face_duration), style),
-                     Paragraph(str(this_tutoring_learning_unit_year.attendees), style),
-                     Paragraph(str(this_tutoring_learning_unit_year.exams_supervision_duration), style),
-                     Paragraph(this_tutoring_learning_unit_year.others_delivery[0:3500] or '', style)
-                     ])
-    return data
+        learning_unit_year = this_tutoring_learning_unit_year.learning_unit_year
+        rows.append([
+            learning_unit_year.complete_title + " (" + learning_unit_year.acronym + ")",
+            str(learning_unit_year.academic_year),
+            str(this_tutoring_learning_unit_year.sessions_number),
+            str(this_tutoring_learning_unit_year.sessions_duration),
+            str(this_tutoring_learning_unit_year.series_number),
+            str(this_tutoring_learning_unit_year.face_to_face_duration),
+            str(this_tutoring_learning_unit_year.attendees),
+            str(this_tutoring_learning_unit_year.exams_supervision_duration),
+            (this_tutoring_learning_unit_year.others_delivery or '')[0:3500],
+        ])
+    return rows
 
 
 def generate_headers(titles, style):
@@ -403,7 +765,7 @@ def get_formation_activities(mandate):
                        )
 
 
-def get_review_details_for_mandate(mandate, rev):
+def get_review_details_for_mandate(mandate, rev, reviewer_entity_acronym=None):
     if rev.reviewer is None:
         person = "{} {}<br/>({})".format(
             mandate.assistant.supervisor.first_name,
@@ -414,7 +776,7 @@ def get_review_details_for_mandate(mandate, rev):
         person = "{} {}<br/>({})".format(
             rev.reviewer.person.first_name,
             rev.reviewer.person.last_name,
-            entity_version.get_last_version(rev.reviewer.entity).acronym
+            reviewer_entity_acronym or entity_version.get_last_version(rev.reviewer.entity).acronym
         )
     reviewer = format_data(person, _('Reviewer'))
     remark = format_data(rev.remark, _('Remark'))
@@ -440,7 +802,18 @@ def set_items(n, obj, attr, values):
         setattr(obj[j], attr, values[j*i % m])
 
 
-def draw_time_repartition(mandate):
+def get_time_repartition(mandate) -> List[tuple]:
+    """Return the (percentage, translated title) of each non-empty part of the time of the mandate."""
+    repartition = [
+        (mandate.research_percent, 'Percentage for research and Ph.D.'),
+        (mandate.tutoring_percent, 'Percentage for teaching'),
+        (mandate.service_activities_percent, 'Percentage for service activities'),
+        (mandate.formation_activities_percent, 'Percentage of involvement as beneficiary in training activities'),
+    ]
+    return [(data, str(_(title))) for data, title in repartition if data != 0]
+
+
+def draw_repartition(repartition):
     drawing = Drawing(width=180*mm, height=120*mm)
     pdf_chart_colors = [HexColor("#fa9d00"), HexColor("#006884"), HexColor("#00909e"), HexColor("#ffd08d"), ]
     pie = Pie()
@@ -454,11 +827,8 @@ def draw_time_repartition(mandate):
     pie.data = []
     pie.labels = []
     titles = []
-    add_data_and_titles_to_pie(pie, titles, mandate.research_percent, 'Percentage for research and Ph.D.')
-    add_data_and_titles_to_pie(pie, titles, mandate.tutoring_percent, 'Percentage for teaching')
-    add_data_and_titles_to_pie(pie, titles, mandate.service_activities_percent, 'Percentage for service activities')
-    add_data_and_titles_to_pie(pie, titles, mandate.formation_activities_percent,
-                               'Percentage of involvement as beneficiary in training activities')
+    for data, title in repartition:
+        add_data_and_titles_to_pie(pie, titles, data, title)
     if len(pie.data) > 0:
         drawing.add(pie)
         add_legend_to_pie(drawing)
@@ -498,8 +868,8 @@ def add_data_and_titles_to_pie(pie, titles, data, title):
         titles.append(_(title))
 
 
-def add_header_footer(canvas, doc):
-    styles = getSampleStyleSheet()
+def add_header_footer(canvas, doc, styles=None):
+    styles = styles or getSampleStyleSheet()
     canvas.saveState()
     header_building(canvas, doc)
     footer_building(canvas, doc, styles)
@@ -23,267 +23,163 @@
 #    see http://www.gnu.org/licenses/.
 #
 ##############################################################################
-import datetime
-import re
+import codecs
+import csv
+import itertools
 
 from django.contrib.auth.decorators import user_passes_test
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils.translation import gettext as _
 from django.views.decorators.http import require_http_methods
 from openpyxl import load_workbook
 
-from assistant import models as assistant_mdl
+from assistant.business.mandates_import import ImportRun, MandatesImporter, report_disappeared_rows
+from assistant.business.mandates_validation import INVALID_COLUMNS_COUNT, INVALID_FULLTIME_EQUIVALENT, validate_rows
+from assistant.business.mandates_validation import check_date_format
 from assistant.forms.mandate_file import MandateFileForm
-from assistant.models.enums import assistant_mandate_state
-from assistant.models.enums import assistant_type, assistant_phd_inscription, assistant_mandate_renewal
+from assistant.models import mandate_import_job
 from assistant.utils import manager_access
 from base import models as mdl
-from base.models.enums import entity_type
 from base.views.common import display_error_messages
 
 COLS_NUMBER = 23
-ASSISTANTS_IMPORTED = 0
-MANDATES_IMPORTED = 0
-ASSISTANTS_UPDATED = 0
-MANDATES_UPDATED = 0
-PERSONS_NOT_FOUND = 0
+XLSX_FORMAT = 'xlsx'
+CSV_FORMAT = 'csv'
+TSV_FORMAT = 'tsv'
+XLSX_SIGNATURE = b'PK\x03\x04'
+CSV_DELIMITERS = ',;\t'
 COLS_TITLES = ['SECTOR', 'LOGISTICS_ENTITY', 'FACULTY', 'SCHOOL', 'INSTITUTE', 'POLE', 'SAP_ID', 'GLOBAL_ID',
                'LAST_NAME', 'FIRST_NAME', 'FULLTIME_EQUIVALENT', 'ENTRY_DATE', 'END_DATE', 'ASSISTANT_TYPE_CODE',
                'SCALE', 'CONTRACT_DURATION', 'CONTRACT_DURATION_FTE', 'RENEWAL_TYPE', 'ABSENCES', 'COMMENT',
                'OTHER_STATUS', 'EMAIL', 'FGS']
-ASSISTANT_TYPES_ALIASES = {
-    'ST': assistant_type.ASSISTANT,
-    'AS': assistant_type.TEACHING_ASSISTANT
-}
 
 
 @require_http_methods(["POST"])
 @user_passes_test(manager_access.user_is_manager, login_url='assistants_home')
 def upload_mandates_file(request):
-    global ASSISTANTS_IMPORTED, ASSISTANTS_UPDATED, MANDATES_IMPORTED, MANDATES_UPDATED, PERSONS_NOT_FOUND
     form = MandateFileForm(request.POST, request.FILES)
     if form.is_valid() and request.FILES['file']:
-        read_xls_mandates(request, request.FILES['file'])
-    else:
-        display_error_messages(request, [error_msg for error_msgs in form.errors.values() for error_msg in error_msgs])
-    return show_import_result(request)
+        job = mandate_import_job.enqueue(
+            request.FILES['file'],
+            mdl.academic_year.starting_academic_year(),
+            request.user.person,
+            dry_run=form.cleaned_data['dry_run']
+        )
+        return redirect('{}?job={}'.format(reverse('load_mandates'), job.id))
+    import_run = ImportRun()
+    for error_msgs in form.errors.values():
+        for error_msg in error_msgs:
+            report_error(request, import_run, error_msg)
+    return show_import_result(request, import_run)
 
 
 @user_passes_test(manager_access.user_is_manager, login_url='assistants_home')
-def read_xls_mandates(request, file_name):
+def import_job_status(request, job_id):
+    job = get_object_or_404(mandate_import_job.MandateImportJob, id=job_id)
+    return JsonResponse(job.get_status())
+
+
+def read_xls_mandates(request, file_name, dry_run=False):
+    """Import a file of mandates in the current process, without a job, and return its ImportRun."""
+    import_run = ImportRun(dry_run=dry_run)
+    with import_run.phase('read'):
+        rows_to_import = read_mandates_rows(request, file_name, import_run)
+    if not import_run.has_errors:
+        academic_year = mdl.academic_year.starting_academic_year()
+        MandatesImporter(academic_year, import_run, dry_run=dry_run).import_rows(rows_to_import)
+        with import_run.phase('disappeared'):
+            report_disappeared_rows(academic_year, rows_to_import, import_run)
+    return import_run
+
+
+def read_mandates_rows(request, file, import_run, processes=None):
+    file_format = detect_file_format(file)
     try:
-        workbook = load_workbook(file_name, read_only=True, data_only=True)
-    except KeyError:
-        display_error_messages(request, _('File must be xlsx'))
-        return False
-    first_sheet = workbook.get_sheet_names()[0]
-    worksheet = workbook.get_sheet_by_name(first_sheet)
+        if file_format == XLSX_FORMAT:
+            values_rows = iter_xlsx_rows(file)
+        else:
+            values_rows = iter_csv_rows(file, delimiter='\t' if file_format == TSV_FORMAT else None)
+        return values_rows_to_import_rows(request, values_rows, import_run, processes)
+    except (KeyError, UnicodeDecodeError, csv.Error):
+        report_error(request, import_run, _('File must be xlsx, csv or tsv'))
+        return []
+
+
+def values_rows_to_import_rows(request, values_rows, import_run, processes=None):
     titles_row = []
+    numbered_values = []
     current_row = 1
-    for row in worksheet.iter_rows():
+    for values in values_rows:
         if current_row == 1:
-            titles_row = save_xls_rows_titles(row)
-            if check_file_format(request, titles_row) is False:
-                return False
-        else:
-            current_record = xls_row_to_dict(row, titles_row)
-            end_date = check_date_format(current_record.get('END_DATE'))
-            entry_date = check_date_format(current_record.get('ENTRY_DATE'))
-            if end_date is False or entry_date is False:
-                display_error_messages(request,
-                                       _('A date is invalid in the file') + _(' at line number : ') + str(current_row)
-                                       )
-                return False
-            assistant = create_academic_assistant_if_not_exists(current_record)
-            if assistant:
-                mandate = create_assistant_mandate_if_not_exists(current_record, assistant, entry_date, end_date)
-                sector = search_entity_by_acronym_and_type(
-                    current_record.get('SECTOR'),
-                    entity_type.SECTOR
-                )
-                if sector:
-                    link_mandate_to_entity(mandate, sector)
-                logistic_entity = search_entity_by_acronym_and_type(
-                    current_record.get('LOGISTICS_ENTITY'),
-                    entity_type.LOGISTICS_ENTITY
-                )
-                if logistic_entity:
-                    link_mandate_to_entity(mandate, logistic_entity)
-                faculty = search_entity_by_acronym_and_type(current_record.get('FACULTY'),
-                                                            entity_type.FACULTY)
-                if faculty:
-                    link_mandate_to_entity(mandate, faculty)
-                school = search_entity_by_acronym_and_type(
-                    current_record.get('SCHOOL'),
-                    entity_type.SCHOOL
-                )
-                if school:
-                    link_mandate_to_entity(mandate, school)
-
-                institute = search_entity_by_acronym_and_type(
-                    current_record.get('INSTITUTE'),
-                    entity_type.INSTITUTE)
-                if institute:
-                    link_mandate_to_entity(mandate, institute)
-                pole = search_entity_by_acronym_and_type(current_record.get('POLE'), entity_type.POLE)
-                if pole:
-                    link_mandate_to_entity(mandate, pole)
+            titles_row = values
+            if check_file_format(request, titles_row, import_run) is False:
+                return []
+        elif values:
+            numbered_values.append((current_row, values))
         current_row += 1
-    return True
-
-
-def search_entity_by_acronym_and_type(acronym, type):
-    if not acronym:
-        return None
-    entities = mdl.entity_version.search(entity_type=type, acronym=acronym)
-    if len(entities) > 0:
-        return entities[0].entity
-    else:
-        return None
-
-
-def save_xls_rows_titles(current_row):
-    titles = []
-    for cell in current_row:
-        titles.append(cell.value)
-    return titles
-
-
-def xls_row_to_dict(row, titles):
-    record_to_import = {}
-    current_col = 0
-    for cell in row:
-        if titles[current_col] == 'FGS' and len(str(cell.value)) != 8:
-            record_to_import[titles[current_col]] = str(cell.value).zfill(8)
-        else:
-            record_to_import[titles[current_col]] = str(cell.value)
-        current_col += 1
-    return record_to_import
-
-
-def create_academic_assistant_if_not_exists(record):
-    global ASSISTANTS_UPDATED, ASSISTANTS_IMPORTED, PERSONS_NOT_FOUND
-    person = mdl.person.find_by_global_id(record.get('FGS'))
-    if person:
-        assistant = assistant_mdl.academic_assistant.find_by_person(person)
-        if assistant:
-            ASSISTANTS_UPDATED += 1
-        else:
-            assistant = assistant_mdl.academic_assistant.AcademicAssistant()
-            ASSISTANTS_IMPORTED += 1
-            assistant.person = person
-        if ASSISTANT_TYPES_ALIASES.get(record.get('ASSISTANT_TYPE_CODE')) == assistant_type.TEACHING_ASSISTANT:
-            assistant.inscription = assistant_phd_inscription.NO
-        assistant.save()
-        return assistant
-    else:
-        PERSONS_NOT_FOUND += 1
-        return None
-
-
-def create_assistant_mandate_if_not_exists(record, assistant, entry_date, end_date):
-    global MANDATES_IMPORTED, MANDATES_UPDATED
-    new_mandate = False
-    current_academic_year = mdl.academic_year.starting_academic_year()
-    mandates = assistant_mdl.assistant_mandate.find_mandate(assistant, current_academic_year, record.get('SAP_ID'))
-    if len(mandates) == 0:
-        mandate = assistant_mdl.assistant_mandate.AssistantMandate()
-        mandate.state = assistant_mandate_state.TO_DO
-        MANDATES_IMPORTED += 1
-        new_mandate = True
-    else:
-        mandate = mandates[0]
-        MANDATES_UPDATED += 1
-    mandate.assistant = assistant
-    mandate.academic_year = current_academic_year
-    mandate.end_date = end_date
-    mandate.entry_date = entry_date
-    mandate.fulltime_equivalent = record.get('FULLTIME_EQUIVALENT')
-    mandate.sap_id = record.get('SAP_ID')
-    mandate.contract_duration = record.get('CONTRACT_DURATION')
-    mandate.contract_duration_fte = record.get('CONTRACT_DURATION_FTE')
-    if record.get('RENEWAL_TYPE').lower() == 'exceptional' or record.get('RENEWAL_TYPE').lower() == 'exceptionnel':
-        mandate.renewal_type = assistant_mandate_renewal.EXCEPTIONAL
-    elif record.get('RENEWAL_TYPE').lower() == 'normal':
-        mandate.renewal_type = assistant_mandate_renewal.NORMAL
-    else:
-        mandate.renewal_type = assistant_mandate_renewal.SPECIAL
-    mandate.absences = record.get('ABSENCES')
-    mandate.comment = record.get('COMMENT')
-    mandate.other_status = record.get('OTHER_STATUS')
-    if ASSISTANT_TYPES_ALIASES.get(record.get('ASSISTANT_TYPE_CODE')) == assistant_type.TEACHING_ASSISTANT:
-        mandate.assistant_type = assistant_type.TEACHING_ASSISTANT
-    else:
-        mandate.assistant_type = assistant_type.ASSISTANT
-    mandate.scale = record.get('SCALE')
-    mandate.save()
-    if new_mandate:
-        retrieve_learning_units_year_from_previous_mandate(assistant, mandate)
-    return mandate
+    rows_to_import, errors = validate_rows(numbered_values, titles_row, processes)
+    for line, error in errors:
+        report_error(request, import_run, get_validation_error_message(error) + _(' at line number : ') + str(line),
+                     line)
+    return [] if errors else rows_to_import
+
+
+def get_validation_error_message(error):
+    if error == INVALID_FULLTIME_EQUIVALENT:
+        return _('The fulltime equivalent is invalid')
+    if error == INVALID_COLUMNS_COUNT:
+        return _('The number of columns does not match the titles of the file')
+    return _('A date is invalid in the file')
+
+
+def detect_file_format(file):
+    name = (getattr(file, 'name', None) or '').lower()
+    if name.endswith('.tsv'):
+        return TSV_FORMAT
+    if name.endswith('.csv'):
+        return CSV_FORMAT
+    signature = file.read(len(XLSX_SIGNATURE))
+    file.seek(0)
+    return XLSX_FORMAT if signature == XLSX_SIGNATURE else CSV_FORMAT
+
+
+def iter_xlsx_rows(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    first_sheet = workbook.get_sheet_names()[0]
+    worksheet = workbook.get_sheet_by_name(first_sheet)
+    for row in worksheet.iter_rows():
+        yield [cell.value for cell in row]
 
 
-def retrieve_learning_units_year_from_previous_mandate(assistant, new_mandate):
-    previous_mandates = assistant_mdl.assistant_mandate.find_before_year_for_assistant(
-        new_mandate.academic_year.year,
-        assistant
-    )
-    if previous_mandates:
-        previous_tutoring_learning_units_year = assistant_mdl.tutoring_learning_unit_year.find_by_mandate(
-            previous_mandates[0]
-        )
-        for previous_tutoring_learning_unit_year in previous_tutoring_learning_units_year:
-            previous_tutoring_learning_unit_year.pk = None
-            previous_tutoring_learning_unit_year.mandate = new_mandate
-            previous_tutoring_learning_unit_year.save()
+def iter_csv_rows(file, delimiter=None):
+    """Stream the rows of a CSV/TSV file; empty fields become None to match the empty cells of a workbook."""
+    lines = codecs.iterdecode(file, 'utf-8-sig')
+    first_line = next(lines, '')
+    if delimiter is None:
+        delimiter = csv.Sniffer().sniff(first_line, delimiters=CSV_DELIMITERS).delimiter
+    for values in csv.reader(itertools.chain([first_line], lines), delimiter=delimiter):
+        yield [value if value != '' else None for value in values]
 
 
-def link_mandate_to_entity(mandate, entity=None):
-    if entity:
-        type = mdl.entity_version.get_by_entity_and_date(entity, None)
-        mandate_entities = assistant_mdl.mandate_entity.find_by_mandate_and_type(mandate, type[0].entity_type)
-        if len(mandate_entities) > 0:
-            mandate_entity = mandate_entities[0]
-            mandate_entity.delete()
-        mandate_entity = assistant_mdl.mandate_entity.MandateEntity()
-        mandate_entity.assistant_mandate = mandate
-        mandate_entity.entity = entity
-        mandate_entity.save()
-        return mandate_entity
-    else:
-        return None
+def report_error(request, import_run, message, line=None):
+    if request is not None:
+        display_error_messages(request, message)
+    if import_run is not None:
+        import_run.add_error(message, line)
 
 
-def show_import_result(request):
-    global ASSISTANTS_IMPORTED, ASSISTANTS_UPDATED, MANDATES_IMPORTED, MANDATES_UPDATED, PERSONS_NOT_FOUND
-    return render(
-        request,
-        "load_mandates.html",
-        {
-            'imported_assistants': ASSISTANTS_IMPORTED,
-            'imported_mandates': MANDATES_IMPORTED,
-            'updated_mandates': MANDATES_UPDATED,
-            'updated_assistants': ASSISTANTS_UPDATED,
-            'persons_not_found': PERSONS_NOT_FOUND
-        }
-    )
+def show_import_result(request, import_run=None):
+    context = import_run.as_context() if import_run else {}
+    return render(request, "load_mandates.html", context)
 
 
-def check_file_format(request, titles_rows):
+def check_file_format(request, titles_rows, import_run=None):
     if len(titles_rows) != COLS_NUMBER:
-        display_error_messages(request, _('The number of cols is wrong.'))
+        report_error(request, import_run, _('The number of cols is wrong.'))
         return False
     if titles_rows != COLS_TITLES:
-        display_error_messages(request, _('The cols title are wrong.'))
+        report_error(request, import_run, _('The cols title are wrong.'))
         return False
     return True
-
-
-def check_date_format(date):
-    if len(date) != 10:
-        return False
-    day, month, year = re.split('-|/', date)
-    try:
-        correct_date = datetime.datetime(int(year), int(month), int(day))
-        return correct_date
-    except ValueError:
-        return False
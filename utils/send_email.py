@@ -24,32 +24,31 @@
 #
 ##############################################################################
 from django.contrib.auth.decorators import user_passes_test
+from django.db import transaction
 from django.shortcuts import redirect
 from django.utils import timezone
 
+from assistant.business.mandate_entity import get_last_acronyms
 from assistant.models import assistant_mandate, settings, manager, reviewer
 from assistant.models.enums import message_type, assistant_mandate_renewal
 from assistant.models.enums import reviewer_role
 from assistant.models.message import Message
+from assistant.models.outbox_item import enqueue_campaign
 from assistant.utils import manager_access
-from base.models import academic_year, entity_version
+from base.models import academic_year
 from osis_common.messaging import message_config, send_message as message_service
 
 
 @user_passes_test(manager_access.user_is_manager, login_url='assistants_home')
 def send_message_to_assistants(request):
     mandates_for_current_academic_year = assistant_mandate.find_by_academic_year(
-        academic_year.starting_academic_year())
-    for mandate in mandates_for_current_academic_year:
-        if mandate.renewal_type == assistant_mandate_renewal.NORMAL or \
-                mandate.renewal_type == assistant_mandate_renewal.SPECIAL:
-            html_template_ref = 'assistant_assistants_startup_normal_renewal_html'
-            txt_template_ref = 'assistant_assistants_startup_normal_renewal_txt'
-        else:
-            html_template_ref = 'assistant_assistants_startup_except_renewal_html'
-            txt_template_ref = 'assistant_assistants_startup_except_renewal_txt'
-        send_message(mandate.assistant.person, html_template_ref, txt_template_ref)
-    save_message_history(request, message_type.TO_ALL_ASSISTANTS)
+        academic_year.starting_academic_year()).select_related('assistant__person')
+    with transaction.atomic():
+        enqueue_campaign(
+            save_message_history(request, message_type.TO_ALL_ASSISTANTS),
+            ((mandate.assistant.person,) + get_assistant_templates_refs(mandate)
+             for mandate in mandates_for_current_academic_year)
+        )
     return redirect('messages_history')
 
 
@@ -57,10 +56,12 @@ def send_message_to_assistants(request):
 def send_message_to_deans(request):
     html_template_ref = 'assistant_deans_startup__html'
     txt_template_ref = 'assistant_deans_startup_txt'
-    all_deans = reviewer.find_by_role('SUPERVISION')
-    for dean in all_deans:
-        send_message(dean.person, html_template_ref, txt_template_ref)
-    save_message_history(request, message_type.TO_ALL_DEANS)
+    all_deans = reviewer.find_by_role('SUPERVISION').select_related('person')
+    with transaction.atomic():
+        enqueue_campaign(
+            save_message_history(request, message_type.TO_ALL_DEANS),
+            ((dean.person, html_template_ref, txt_template_ref) for dean in all_deans)
+        )
     return redirect('messages_history')
 
 
@@ -68,11 +69,14 @@ def send_message_to_deans(request):
 def send_message_to_reviewers(request):
     html_template_ref = 'assistant_reviewers_startup_html'
     txt_template_ref = 'assistant_reviewers_startup_txt'
-    reviewers = reviewer.find_reviewers()
-    for rev in reviewers:
-        send_message(rev.person, html_template_ref, txt_template_ref, role=rev.role,
-                     entity=entity_version.get_last_version(rev.entity).acronym)
-    save_message_history(request, message_type.TO_ALL_REVIEWERS)
+    reviewers = list(reviewer.find_reviewers().select_related('person'))
+    acronyms = get_last_acronyms({rev.entity_id for rev in reviewers})
+    with transaction.atomic():
+        enqueue_campaign(
+            save_message_history(request, message_type.TO_ALL_REVIEWERS),
+            ((rev.person, html_template_ref, txt_template_ref,
+              {'role': rev.role, 'entity': acronyms.get(rev.entity_id)}) for rev in reviewers)
+        )
     return redirect('messages_history')
 
 
@@ -83,12 +87,24 @@ def save_message_history(request, type):
                                      type=type,
                                      academic_year=academic_year.starting_academic_year())
     message.save()
+    return message
+
+
+def get_assistant_templates_refs(mandate):
+    if mandate.renewal_type == assistant_mandate_renewal.NORMAL or \
+            mandate.renewal_type == assistant_mandate_renewal.SPECIAL:
+        return 'assistant_assistants_startup_normal_renewal_html', 'assistant_assistants_startup_normal_renewal_txt'
+    return 'assistant_assistants_startup_except_renewal_html', 'assistant_assistants_startup_except_renewal_txt'
 
 
 def send_message(person, html_template_ref, txt_template_ref, assistant=None, role=None, entity=None):
-    procedure_dates = settings.get_settings()
     receivers = [message_config.create_receiver(person.id, person.email,
                                                 person.language)]
+    template_base_data = get_template_base_data(settings.get_settings(), person, assistant, role, entity)
+    return send_message_content(html_template_ref, txt_template_ref, receivers, template_base_data)
+
+
+def get_template_base_data(procedure_dates, person, assistant=None, role=None, entity=None):
     template_base_data = {'start_date': procedure_dates.assistants_contract_end_starting_date,
                           'end_date': procedure_dates.assistants_contract_end_ending_date,
                           'first_name': person.first_name, 'last_name': person.last_name,
@@ -100,6 +116,10 @@ def send_message(person, html_template_ref, txt_template_ref, assistant=None, ro
         template_base_data['role'] = role
     if entity:
         template_base_data['entity'] = entity
+    return template_base_data
+
+
+def send_message_content(html_template_ref, txt_template_ref, receivers, template_base_data):
     subject_data = None
     table = None
     message_content = message_config.create_message_content(html_template_ref, txt_template_ref, table,
@@ -25,6 +25,7 @@
 ##############################################################################
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
 from django.db.models import Q
 from django.forms import forms
 from django.http.response import HttpResponseRedirect
@@ -38,9 +39,9 @@ from assistant.models import academic_assistant, assistant_mandate, assistant_do
 from assistant.models import settings, reviewer, mandate_entity
 from assistant.models import tutoring_learning_unit_year
 from assistant.models.assistant_mandate import AssistantMandate
-from assistant.models.enums import document_type, assistant_mandate_state, reviewer_role
+from assistant.models.enums import document_type, assistant_mandate_state, notification_event, reviewer_role
+from assistant.models.outbox_item import enqueue_notification
 from assistant.utils import assistant_access
-from assistant.utils.send_email import send_message
 from base.models import person, academic_year
 from base.models.enums import entity_type
 
@@ -87,6 +88,7 @@ class AssistantMandatesListView(LoginRequiredMixin, UserPassesTestMixin, ListVie
 
 @user_passes_test(assistant_access.user_is_assistant_and_procedure_is_open, login_url='access_denied')
 @require_http_methods(["POST"])
+@transaction.atomic
 def mandate_change_state(request):
     mandate = assistant_mandate.find_mandate_by_id(request.POST.get("mandate_id"))
     if mandate:
@@ -102,8 +104,8 @@ def mandate_change_state(request):
                 assistant = academic_assistant.find_by_person(pers)
                 html_template_ref = 'assistant_dean_assistant_decline_html'
                 txt_template_ref = 'assistant_dean_assistant_decline_txt'
-                send_message(person=faculty_dean.person, html_template_ref=html_template_ref,
-                             txt_template_ref=txt_template_ref, assistant=assistant)
+                enqueue_notification(notification_event.MANDATE_DECLINED, faculty_dean.person, html_template_ref,
+                                     txt_template_ref, mandate=mandate, assistant=assistant)
         mandate.save()
     return HttpResponseRedirect(reverse('assistant_mandates'))
 
@@ -24,6 +24,7 @@
 #
 ##############################################################################
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db import transaction
 from django.http import JsonResponse
 from django.http.response import HttpResponseRedirect
 from django.shortcuts import render
@@ -36,10 +37,10 @@ from assistant.forms.assistant import AssistantFormPart1, AssistantFormPart3, As
     AssistantFormPart6
 from assistant.forms.tutoring_learning_unit import TutoringLearningUnitForm
 from assistant.models import *
-from assistant.models.enums import assistant_mandate_state, assistant_phd_inscription
+from assistant.models.enums import assistant_mandate_state, assistant_phd_inscription, notification_event
 from assistant.models.enums import document_type
 from assistant.utils.assistant_access import user_is_assistant_and_procedure_is_open_and_workflow_is_assistant
-from assistant.utils.send_email import send_message
+from assistant.models.outbox_item import enqueue_notification
 from base.models import person_address, person, learning_unit_year, academic_year
 from base.models.enums import entity_type
 from base.models.learning_unit_year import search
@@ -292,6 +293,7 @@ def form_part6_edit(request, msg=None):
 
 @user_passes_test(user_is_assistant_and_procedure_is_open_and_workflow_is_assistant, login_url='access_denied')
 @require_http_methods(["POST"])
+@transaction.atomic
 def form_part6_save(request):
     mandate = assistant_mandate.find_mandate_by_id(request.POST.get("mandate_id"))
     if mandate:
@@ -318,8 +320,8 @@ def form_part6_save(request):
                     mandate.state = assistant_mandate_state.PHD_SUPERVISOR
                     html_template_ref = 'assistant_phd_supervisor_html'
                     txt_template_ref = 'assistant_phd_supervisor_txt'
-                    send_message(person=assistant.supervisor, html_template_ref=html_template_ref,
-                                 txt_template_ref=txt_template_ref, assistant=assistant)
+                    enqueue_notification(notification_event.MANDATE_TO_PHD_SUPERVISOR, assistant.supervisor,
+                                         html_template_ref, txt_template_ref, mandate=mandate, assistant=assistant)
                 elif mandate_entity.find_by_mandate_and_type(mandate, entity_type.INSTITUTE):
                     mandate.state = assistant_mandate_state.RESEARCH
                 elif mandate_entity.find_by_mandate_and_type(mandate, entity_type.POLE):
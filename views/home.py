@@ -29,6 +29,7 @@ from django.http.response import HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 
+from assistant.forms.mandate import MandatesYearsExportForm
 from assistant.models import academic_assistant, manager, reviewer
 from assistant.models import settings
 from assistant.utils import manager_access
@@ -52,7 +53,7 @@ def assistant_home(request):
 
 @user_passes_test(manager_access.user_is_manager, login_url='assistants_home')
 def manager_home(request):
-    return render(request, 'manager_home.html')
+    return render(request, 'manager_home.html', {'years_export_form': MandatesYearsExportForm()})
 
 
 def access_denied(request):
@@ -23,23 +23,32 @@
 #    see http://www.gnu.org/licenses/.
 #
 ##############################################################################
+import csv
+import itertools
+import json
+import tempfile
 import time
 
 from django.contrib.auth.decorators import user_passes_test
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import redirect, render
 from django.utils.translation import gettext as _
 from openpyxl import Workbook
-from openpyxl.writer.excel import save_virtual_workbook
 
 from assistant import models as assistant_mdl
-from assistant.forms.mandate import MandateForm, entity_inline_formset
-from assistant.models import assistant_mandate, review
-from assistant.models.enums import reviewer_role, assistant_mandate_state
-from assistant.utils.send_email import send_message
+from assistant.business.mandates_export_data import EXPORTED_ENTITY_TYPES, iter_mandates_export_data
+from assistant.business.mandates_import import ImportRun
+from assistant.business.mandates_summary import get_faculties_summary, get_summary_columns, get_year_summary
+from assistant.forms.mandate import MandateForm, MandatesYearsExportForm, entity_inline_formset
+from assistant.models import assistant_mandate, review, mandate_import_job
+from assistant.models.enums import reviewer_role, assistant_mandate_state, notification_event
+from assistant.models.outbox_item import enqueue_notification
 from base.models import academic_year, entity, person
 from base.models.enums import entity_type
+from base.views.common import display_error_messages
 
 
 def user_is_manager(user):
@@ -74,6 +83,7 @@ def mandate_edit(request):
 
 
 @user_passes_test(user_is_manager, login_url='access_denied')
+@transaction.atomic
 def mandate_save(request):
     mandate_id = request.POST.get("mandate_id")
     mandate = assistant_mdl.assistant_mandate.find_mandate_by_id(mandate_id)
@@ -88,8 +98,8 @@ def mandate_save(request):
                 mandate.assistant.save()
                 html_template_ref = 'assistant_phd_supervisor_html'
                 txt_template_ref = 'assistant_phd_supervisor_txt'
-                send_message(person=substitute_supervisor, html_template_ref=html_template_ref,
-                             txt_template_ref=txt_template_ref, assistant=mandate.assistant)
+                enqueue_notification(notification_event.SUBSTITUTE_PHD_SUPERVISOR, substitute_supervisor,
+                                     html_template_ref, txt_template_ref, mandate=mandate, assistant=mandate.assistant)
         except ObjectDoesNotExist:
             pass
     form = MandateForm(data=request.POST, instance=mandate, prefix='mand')
@@ -107,56 +117,166 @@ def mandate_save(request):
 
 @user_passes_test(user_is_manager, login_url='access_denied')
 def load_mandates(request):
-    return render(request, "load_mandates.html", {})
+    context = {}
+    job_id = request.GET.get('job', '')
+    job = mandate_import_job.find_by_id(job_id) if job_id.isdigit() else None
+    if job:
+        context['import_job'] = job
+        if job.result:
+            context.update(ImportRun.from_dict(job.result).as_context())
+    return render(request, "load_mandates.html", context)
 
 
 @user_passes_test(user_is_manager, login_url='access_denied')
 def export_mandates(request):
-    xls = generate_xls()
+    file = tempfile.TemporaryFile()
+    generate_xls(file)
+    file.seek(0)
     filename = '{}_{}.xlsx'.format(_('assistants_mandates'), time.strftime("%Y%m%d_%H%M"))
-    response = HttpResponse(xls, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return FileResponse(
+        file, as_attachment=True, filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def generate_xls(file):
+    """Write the mandates of the current academic year to file as a write-only workbook.
+
+    The rows are appended as the mandates are read chunk by chunk, so neither the cells nor the mandates of the whole
+    year are kept in memory. The response is not streamed though: the whole workbook is written to file before the
+    first byte is sent, because the archive of an xlsx file is only complete once it is saved.
+    """
+    workbook = Workbook(encoding='utf-8', write_only=True)
+    worksheet = workbook.create_sheet(title=_('Mandates'))
+    worksheet.append(get_titles())
+    mandates = assistant_mandate.find_by_academic_year(academic_year.starting_academic_year())
+    for mandate, data in iter_mandates_export_data(mandates):
+        worksheet.append(construct_line(mandate, data))
+    workbook.save(file)
+
+
+@user_passes_test(user_is_manager, login_url='access_denied')
+def export_mandates_years(request):
+    form = MandatesYearsExportForm(request.GET)
+    if not form.is_valid():
+        for error_msgs in form.errors.values():
+            for error_msg in error_msgs:
+                display_error_messages(request, error_msg)
+        return redirect('manager_home')
+    academic_years = list(form.get_academic_years())
+    file = tempfile.TemporaryFile()
+    generate_years_xls(file, academic_years)
+    file.seek(0)
+    filename = '{}_{}-{}_{}.xlsx'.format(
+        _('assistants_mandates'), academic_years[0].year, academic_years[-1].year, time.strftime("%Y%m%d_%H%M")
+    )
+    return FileResponse(
+        file, as_attachment=True, filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def generate_years_xls(file, academic_years):
+    """Write the mandates of the academic years to file, one row per mandate, followed by a summary sheet per
+    academic year with the counts per state, renewal type and advice of the vice-rector and the summed full-time
+    equivalent of each faculty. The summaries are aggregated by the database.
+    """
+    workbook = Workbook(encoding='utf-8', write_only=True)
+    worksheet = workbook.create_sheet(title=_('Mandates'))
+    worksheet.append([_('Academic year')] + get_titles())
+    mandates = assistant_mandate.AssistantMandate.objects.filter(
+        academic_year__in=academic_years
+    ).order_by('academic_year__year', 'assistant__person__last_name')
+    for mandate, data in iter_mandates_export_data(mandates):
+        worksheet.append([str(mandate.academic_year)] + construct_line(mandate, data))
+    columns = get_summary_columns()
+    for year in academic_years:
+        worksheet = workbook.create_sheet(title=str(year))
+        worksheet.append([_('Faculty')] + [str(title) for _key, title in columns])
+        for summary in get_faculties_summary(year):
+            worksheet.append([summary['faculty']] + [summary[key] for key, _title in columns])
+        year_summary = get_year_summary(year)
+        worksheet.append([_('Total')] + [year_summary[key] for key, _title in columns])
+    workbook.save(file)
+
+
+def get_titles():
+    return [_("Sector"),
+            _("Faculty"),
+            _("Logistics entity"),
+            _("Institute"),
+            _("Registration number"),
+            _("Name"),
+            _("Firstname"),
+            _("Email"),
+            "FGS",
+            _("Age"),
+            _("Status"),
+            _("Renewal type"),
+            _("Assistant type"),
+            _("Full-time equivalent"),
+            _("Full-time equivalent"),
+            _("Contract length"),
+            _("Contract start date"),
+            _("End date"),
+            _("Comment"),
+            _("Absences"),
+            _("Opinion of the sector vice-rector"),
+            _("Justification"),
+            _("Comment"),
+            _("Confidential"),
+            ]
+
+
+LINES_COLUMNS = ['sector', 'faculty', 'logistics_entity', 'institute', 'sap_id', 'last_name', 'first_name', 'email',
+                 'global_id', 'age', 'state', 'renewal_type', 'assistant_type', 'fulltime_equivalent',
+                 'contract_duration_fte', 'contract_duration', 'entry_date', 'end_date', 'comment', 'absences',
+                 'vice_rector_advice', 'vice_rector_justification', 'vice_rector_remark', 'vice_rector_confidential']
+CSV_FORMAT = 'csv'
+JSONL_FORMAT = 'jsonl'
+LINES_CONTENT_TYPES = {
+    CSV_FORMAT: 'text/csv; charset=utf-8',
+    JSONL_FORMAT: 'application/x-ndjson; charset=utf-8',
+}
+
+
+@user_passes_test(user_is_manager, login_url='access_denied')
+def export_mandates_lines(request, file_format):
+    """Stream the lines of the mandates export of the current academic year as CSV or as JSON lines."""
+    if file_format not in LINES_CONTENT_TYPES:
+        raise Http404
+    mandates = assistant_mandate.find_by_academic_year(academic_year.starting_academic_year())
+    lines = generate_csv(mandates) if file_format == CSV_FORMAT else generate_jsonl(mandates)
+    response = StreamingHttpResponse(lines, content_type=LINES_CONTENT_TYPES[file_format])
+    filename = '{}_{}.{}'.format(_('assistants_mandates'), time.strftime("%Y%m%d_%H%M"), file_format)
     response['Content-Disposition'] = "%s%s" % ("attachment; filename=", filename)
     return response
 
 
-def generate_xls():
-    workbook = Workbook(encoding='utf-8')
-    worksheet = workbook.active
-    worksheet.title = _('Mandates')
-    worksheet.append([_("Sector"),
-                      _("Faculty"),
-                      _("Logistics entity"),
-                      _("Institute"),
-                      _("Registration number"),
-                      _("Name"),
-                      _("Firstname"),
-                      _("Email"),
-                      "FGS",
-                      _("Age"),
-                      _("Status"),
-                      _("Renewal type"),
-                      _("Assistant type"),
-                      _("Full-time equivalent"),
-                      _("Full-time equivalent"),
-                      _("Contract length"),
-                      _("Contract start date"),
-                      _("End date"),
-                      _("Comment"),
-                      _("Absences"),
-                      _("Opinion of the sector vice-rector"),
-                      _("Justification"),
-                      _("Comment"),
-                      _("Confidential"),
-                      ])
-    mandates = assistant_mandate.find_by_academic_year(academic_year.starting_academic_year())
-    for mandate in mandates:
-        line = construct_line(mandate)
-        worksheet.append(line)
-    return save_virtual_workbook(workbook)
+def iter_padded_lines(mandates):
+    for mandate, data in iter_mandates_export_data(mandates):
+        line = construct_line(mandate, data)
+        yield line + [None] * (len(LINES_COLUMNS) - len(line))
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
 
 
-def construct_line(mandate):
-    line = get_entities_for_mandate(mandate)
+def generate_csv(mandates):
+    writer = csv.writer(EchoBuffer())
+    for line in itertools.chain([get_titles()], iter_padded_lines(mandates)):
+        yield writer.writerow(line)
+
+
+def generate_jsonl(mandates):
+    for line in iter_padded_lines(mandates):
+        yield json.dumps(dict(zip(LINES_COLUMNS, line)), cls=DjangoJSONEncoder) + '\n'
+
+
+def construct_line(mandate, data=None):
+    line = get_entities_for_mandate(mandate, data)
     line += [
         mandate.sap_id,
         str(mandate.assistant.person.last_name),
@@ -179,15 +299,17 @@ def construct_line(mandate):
         mandate.comment,
         mandate.absences if mandate.absences != 'None' else '',
     ]
-    line += get_reviews(mandate)
+    line += get_reviews(mandate, data)
     return line
 
 
-def get_entities_for_mandate(mandate):
-    ent_type = {entity_type.SECTOR, entity_type.FACULTY, entity_type.LOGISTICS_ENTITY, entity_type.INSTITUTE}
-    entities_id = mandate.mandateentity_set.all().order_by('id').values_list('entity', flat=True)
-    entities = (ent for ent in entity.find_versions_from_entites(entities_id, mandate.academic_year.start_date)
-                if ent.entity_type in ent_type)
+def get_entities_for_mandate(mandate, data=None):
+    if data:
+        entities = data.get_entities(mandate)
+    else:
+        entities_id = mandate.mandateentity_set.all().order_by('id').values_list('entity', flat=True)
+        entities = (ent for ent in entity.find_versions_from_entites(entities_id, mandate.academic_year.start_date)
+                    if ent.entity_type in EXPORTED_ENTITY_TYPES)
     mandate_entities = [''] * 4
     for ent in entities:
         if ent.entity_type == entity_type.SECTOR:
@@ -201,9 +323,12 @@ def get_entities_for_mandate(mandate):
     return mandate_entities
 
 
-def get_reviews(mandate):
+def get_reviews(mandate, data=None):
     reviews_details = []
-    vrs_review = review.find_review_for_mandate_by_role(mandate.id, reviewer_role.VICE_RECTOR)
+    if data:
+        vrs_review = data.get_vice_rector_review(mandate)
+    else:
+        vrs_review = review.find_review_for_mandate_by_role(mandate.id, reviewer_role.VICE_RECTOR)
     if vrs_review:
         reviews_details += [_(vrs_review.advice)] if vrs_review.advice is not None else ['']
         reviews_details += [vrs_review.justification] if vrs_review.justification is not None else ['']
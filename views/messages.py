@@ -28,9 +28,12 @@ from django.shortcuts import render
 
 from assistant.models.enums import message_type
 from assistant.models.message import find_all
+from assistant.models.outbox_item import annotate_progress
 from assistant.utils import manager_access
 
 
 @user_passes_test(manager_access.user_is_manager, login_url='access_denied')
 def show_history(request):
-    return render(request, 'messages.html', {'sent_messages': find_all(), 'message_type': message_type})
+    return render(request, 'messages.html', {
+        'sent_messages': annotate_progress(find_all().order_by('id')), 'message_type': message_type
+    })
@@ -0,0 +1,60 @@
+##############################################################################
+#
+#    OSIS stands for Open Student Information System. It's an application
+#    designed to manage the core business of higher education institutions,
+#    such as universities, faculties, institutes and professional schools.
+#    The core business involves the administration of students, teachers,
+#    courses, programs and so on.
+#
+#    Copyright (C) 2015-2019 Université catholique de Louvain (http://www.uclouvain.be)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    A copy of this license - GNU General Public License - is available
+#    at the root of the source code of this program.  If not,
+#    see http://www.gnu.org/licenses/.
+#
+##############################################################################
+import os
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import render
+
+from assistant.models import pdf_export_job
+from base.models.person import find_by_user
+
+
+def get_job_or_404(request, job_id):
+    job = pdf_export_job.find_by_id_and_person(job_id, find_by_user(request.user))
+    if job is None:
+        raise Http404
+    return job
+
+
+@login_required
+def job_view(request, job_id):
+    return render(request, "pdf_export_job.html", {'job': get_job_or_404(request, job_id)})
+
+
+@login_required
+def job_status(request, job_id):
+    return JsonResponse(get_job_or_404(request, job_id).get_status())
+
+
+@login_required
+def job_download(request, job_id):
+    job = get_job_or_404(request, job_id)
+    if not job.is_downloadable:
+        raise Http404
+    response = FileResponse(job.file.open('rb'))
+    response['Content-Disposition'] = 'attachment; filename="%s"' % os.path.basename(job.file_name)
+    return response
@@ -25,6 +25,7 @@
 ##############################################################################
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
 from django.db.models import Q, Prefetch
 from django.shortcuts import render, redirect
 from django.urls import reverse
@@ -37,7 +38,8 @@ from assistant.business.users_access import user_is_reviewer_and_procedure_is_op
 from assistant.forms.reviewer import ReviewerDelegationForm
 from assistant.models import reviewer
 from assistant.models.academic_assistant import is_supervisor
-from assistant.utils.send_email import send_message
+from assistant.models.enums import notification_event
+from assistant.models.outbox_item import enqueue_notification
 from base.models import academic_year, person, entity, entity_version
 
 
@@ -82,6 +84,7 @@ class StructuresListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
 @require_http_methods(["POST"])
 @user_passes_test(user_is_reviewer_and_procedure_is_open, login_url='assistants_home')
+@transaction.atomic
 def add_reviewer_for_structure(request):
     current_entity = entity.find_by_id(request.POST.get("entity"))
     year = academic_year.starting_academic_year().year
@@ -97,8 +100,9 @@ def add_reviewer_for_structure(request):
         new_reviewer = form.save(commit=False)
         new_reviewer.person = person.find_by_id(request.POST.get('person_id'))
         new_reviewer.save()
-        send_message(
-            person=new_reviewer.person,
+        enqueue_notification(
+            notification_event.REVIEWER_DELEGATION,
+            new_reviewer.person,
             html_template_ref='assistant_reviewers_startup_html',
             txt_template_ref='assistant_reviewers_startup_txt'
         )
@@ -34,7 +34,7 @@ from assistant.business.users_access import user_is_reviewer_and_procedure_is_op
 from assistant.forms.mandate import MandatesArchivesForm
 from assistant.models import assistant_mandate
 from assistant.models import reviewer, mandate_entity
-from assistant.models.enums import review_status, review_advice_choices
+from assistant.models.enums import assistant_mandate_state, assistant_type, review_status, review_advice_choices
 from base.models import academic_year, entity_version
 
 
@@ -106,6 +106,9 @@ class MandatesListView(LoginRequiredMixin, UserPassesTestMixin, ListView, FormMi
         context['year'] = academic_year.find_academic_year_by_id(
             self.request.session.get('selected_academic_year')).year
         context = add_entities_version_to_mandates_list(context)
+        context['export_states'] = assistant_mandate_state.ASSISTANT_MANDATE_STATES
+        context['export_assistant_types'] = assistant_type.ASSISTANT_TYPES
+        context['export_entities'] = get_entities_of_mandates(context['object_list'])
         return add_actions_to_mandates_list(context, self.request.user.person)
 
     def get_initial(self):
@@ -117,3 +120,11 @@ class MandatesListView(LoginRequiredMixin, UserPassesTestMixin, ListView, FormMi
             self.request.session[
                 'selected_academic_year'] = selected_academic_year.id
         return {'academic_year': selected_academic_year}
+
+
+def get_entities_of_mandates(mandates):
+    entities = {}
+    for mandate in mandates:
+        for version in mandate.entities:
+            entities.setdefault(version.pk, version)
+    return sorted(entities.values(), key=lambda version: version.acronym)